@@ -1,21 +1,31 @@
 from .code_generator_agent import code_generator_agent
+from .code_planner_agent import (
+    project_planner_agent,
+    file_generator_agent,
+    merge_generated_files_agent,
+)
 from .write_code_to_file_agent import write_code_to_file_agent
 from .debug_code_agent import debug_code_agent
 from .read_me_agent import read_me_agent
 from .dockerizer_agent import dockerizer_agent
 from .debug_code_execution_agent import debug_code_execution_agent
+from .speculative_fix_agent import speculative_debug_code_agent
 from .debug_docker_execution_agent import debug_docker_execution_agent
 from .docker_execution_agent import start_docker_container_agent
 from .gradio_agent import start_gradio_frontend_agent
 
 __all__ = [
     "code_generator_agent",
+    "project_planner_agent",
+    "file_generator_agent",
+    "merge_generated_files_agent",
     "write_code_to_file_agent",
     "debug_code_agent",
     "read_me_agent",
     "dockerizer_agent",
     "debug_code_execution_agent",
+    "speculative_debug_code_agent",
     "debug_docker_execution_agent",
     "start_docker_container_agent",
-    "start_gradio_frontend_agent"
+    "start_gradio_frontend_agent",
 ]
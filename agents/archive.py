@@ -0,0 +1,84 @@
+# agents/archive.py
+# ZIP archive of a finished project, built once when the run succeeds and served as is by
+# the download service (frontend/app.py). The archive is named by the content hash of the
+# project files (generated/<run_id>/archive/<hash>.zip), so the same files give the same
+# name and the hash doubles as the ETag of the download.
+import os
+import shutil
+import hashlib
+import zipfile
+from typing import List, Tuple
+from .workspace import get_workspace_dir, hash_file
+
+ARCHIVE_DIR_NAME = "archive"
+
+# Build, cache and UI folders are not part of the delivered project
+EXCLUDED_DIRS = {
+    "ui",
+    "__pycache__",
+    ".pytest_cache",
+    ".mypy_cache",
+    ".ruff_cache",
+    "node_modules",
+    ".venv",
+    "venv",
+    "build",
+    "dist",
+    ".git",
+}
+EXCLUDED_SUFFIXES = (".pyc", ".pyo", ".tmp", ".egg-info")
+
+# Fixed timestamp of the entries, the same files always give the same archive bytes
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def archive_files(src_dir: str) -> List[str]:
+    paths = []
+    for root, dirs, files in os.walk(src_dir):
+        dirs[:] = sorted(d for d in dirs if d not in EXCLUDED_DIRS and not d.endswith(EXCLUDED_SUFFIXES))
+        for name in files:
+            if not name.endswith(EXCLUDED_SUFFIXES):
+                paths.append(os.path.relpath(os.path.join(root, name), src_dir).replace(os.sep, "/"))
+    return sorted(paths)
+
+
+# Hash over the relative paths and contents of the archived files
+def archive_hash(src_dir: str, paths: List[str]) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode("utf-8") + b"\0")
+        digest.update(hash_file(os.path.join(src_dir, path)).encode("ascii") + b"\n")
+    return digest.hexdigest()[:32]
+
+
+def get_archive_dir(run_id: str) -> str:
+    return os.path.join(get_workspace_dir(run_id), ARCHIVE_DIR_NAME)
+
+
+# Returns (hash, path) of the run's archive, builds it only when the files changed.
+# Files are streamed into the archive, the previous archives of the run are removed.
+def build_project_archive(run_id: str) -> Tuple[str, str]:
+    src_dir = os.path.join(get_workspace_dir(run_id), "src")
+    paths = archive_files(src_dir)
+    digest = archive_hash(src_dir, paths)
+    archive_dir = get_archive_dir(run_id)
+    archive_path = os.path.join(archive_dir, f"{digest}.zip")
+    if os.path.exists(archive_path):
+        return digest, archive_path
+
+    os.makedirs(archive_dir, exist_ok=True)
+    tmp_path = f"{archive_path}.tmp"
+    with zipfile.ZipFile(tmp_path, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for path in paths:
+            info = zipfile.ZipInfo(path, date_time=ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            with open(os.path.join(src_dir, path), "rb") as src, zf.open(info, "w") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp_path, archive_path)
+
+    for name in os.listdir(archive_dir):
+        if name != os.path.basename(archive_path):
+            os.remove(os.path.join(archive_dir, name))
+    print(f"Archived {len(paths)} files to {archive_path}")
+    return digest, archive_path
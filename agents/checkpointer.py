@@ -0,0 +1,293 @@
+# agents/checkpointer.py
+# Durable LangGraph checkpoints in a local SQLite file (CHECKPOINTS_ENABLED, on by default).
+# Every graph run is a thread keyed by its run id, the state after each node is stored, so a
+# run survives a process restart and can be resumed from its last completed node or
+# re-entered at a chosen node (see POST /jobs/<id>/resume in main.py).
+# SQLite access runs in a thread so the event loop is never blocked, like the LLM cache.
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from .workspace import GENERATED_ROOT
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver):
+    def __init__(self, path: str, max_age_seconds: float = 7 * 24 * 3600):
+        super().__init__()
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                type TEXT NOT NULL,
+                checkpoint BLOB NOT NULL,
+                metadata_type TEXT NOT NULL,
+                metadata BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                type TEXT NOT NULL,
+                value BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            )"""
+        )
+        self._conn.commit()
+        self.delete_expired()
+
+    def _config(self, thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str]):
+        if checkpoint_id is None:
+            return None
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+
+    def _tuple(self, thread_id, checkpoint_ns, row, writes) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        return CheckpointTuple(
+            config=self._config(thread_id, checkpoint_ns, checkpoint_id),
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=self._config(thread_id, checkpoint_ns, parent_id),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        query = (
+            "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+            "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params: Tuple = (thread_id, checkpoint_ns)
+        if checkpoint_id:
+            query += " AND checkpoint_id = ?"
+            params += (checkpoint_id,)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+            if row is None:
+                return None
+            writes = self._conn.execute(
+                "SELECT task_id, channel, type, value FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+                "ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, row[0]),
+            ).fetchall()
+        return self._tuple(thread_id, checkpoint_ns, row, writes)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, "
+            "checkpoint, metadata_type, metadata FROM checkpoints"
+        )
+        conditions, params = [], []
+        if config:
+            conditions += ["thread_id = ?", "checkpoint_ns = ?"]
+            params += [
+                config["configurable"]["thread_id"],
+                config["configurable"].get("checkpoint_ns", ""),
+            ]
+        if before and get_checkpoint_id(before):
+            conditions.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        for thread_id, checkpoint_ns, *row in rows:
+            result = self._tuple(thread_id, checkpoint_ns, row, [])
+            if filter and not all(result.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield result
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(metadata)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+                "parent_checkpoint_id, type, checkpoint, metadata_type, metadata, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    serialized,
+                    metadata_type,
+                    serialized_metadata,
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+        return self._config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(self, config: RunnableConfig, writes: List[Tuple[str, Any]], task_id: str):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type_, serialized))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, "
+                "idx, channel, type, value) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        results = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for result in results:
+            yield result
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: List[Tuple[str, Any]], task_id: str):
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id)
+
+    # Resuming and re-entering only need the latest checkpoint of a run, older ones are
+    # dropped once a run has finished so the file doesn't grow with every node
+    def prune_thread(self, thread_id: str):
+        with self._lock:
+            latest = self._conn.execute(
+                "SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ?", (thread_id,)
+            ).fetchone()[0]
+            if latest is None:
+                return
+            self._conn.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id != ?",
+                (thread_id, latest),
+            )
+            self._conn.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_id != ?",
+                (thread_id, latest),
+            )
+            self._conn.commit()
+
+    def delete_expired(self):
+        cutoff = time.time() - self.max_age_seconds
+        with self._lock:
+            expired = [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT DISTINCT thread_id FROM checkpoints GROUP BY thread_id "
+                    "HAVING MAX(created_at) < ?",
+                    (cutoff,),
+                )
+            ]
+            for thread_id in expired:
+                self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+
+
+# Shared checkpointer, None when checkpointing is disabled
+def create_checkpointer() -> Optional[SqliteCheckpointSaver]:
+    if os.getenv("CHECKPOINTS_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    return SqliteCheckpointSaver(
+        path=os.getenv("CHECKPOINTS_PATH") or os.path.join(GENERATED_ROOT, ".checkpoints.sqlite"),
+        max_age_seconds=float(os.getenv("CHECKPOINTS_MAX_AGE_HOURS", 168)) * 3600,
+    )
+
+
+# Re-entering a run at a node = updating its state as if a node with a plain edge to it
+# had just finished. Returns node -> that predecessor; nodes only reached through
+# conditional edges can't be chosen.
+def entry_predecessors(workflow) -> Dict[str, str]:
+    predecessors = {}
+    for start, end in sorted(workflow.edges):
+        if start in workflow.nodes and end in workflow.nodes:
+            predecessors.setdefault(end, start)
+    return predecessors
+
+
+# Prepares a checkpointed run to continue with None as the graph input: from its last
+# checkpoint, or at entry_node with a fresh debug budget
+async def prepare_resume(
+    app, config: RunnableConfig, predecessors: Dict[str, str], entry_node: Optional[str] = None
+):
+    if entry_node:
+        await app.aupdate_state(config, {"iterations": 0}, as_node=predecessors[entry_node])
+
@@ -1,42 +1,71 @@
 import os
-import shutil
-from .common import llm_code
-from schemas import GraphState, Codes
+from .message_compaction import code_message
+from .model_router import route_model
+from .common import ainvoke_structured, astream_structured
+from .workspace import reset_src_dir
+from .write_code_to_file_agent import write_code_file
+from schemas import GraphState, Codes, Code
 from prompts.prompts import CODE_GENERATOR_AGENT_PROMPT
 from langchain_core.messages import AIMessage
+from langchain_core.pydantic_v1 import ValidationError
+
+# Streaming mode writes every file to disk as soon as the LLM has finished it
+STREAM_CODE_GENERATION = os.getenv("STREAM_CODE_GENERATION", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
 
 
 # First step in graph flow
 # -> Generate code based on user inputs
 async def code_generator_agent(state: GraphState) -> GraphState:
     print("\n**CODE GENERATOR AGENT**")
-    # This deletes all files and subdirectories except the "UI" folder.
-    src_folder = os.path.join("generated", "src")
-    if os.path.exists(src_folder):
-        for item in os.listdir(src_folder):
-            item_path = os.path.join(src_folder, item)
-            if item != "ui":  # Preserve the UI folder
-                if os.path.isdir(item_path):
-                    shutil.rmtree(item_path)
-                else:
-                    os.remove(item_path)
+    # This deletes all files and subdirectories of this run's workspace except the "UI" folder.
+    src_dir = reset_src_dir(state)
 
     requirement = state["messages"][0].content
-    prompt = CODE_GENERATOR_AGENT_PROMPT.format(requirement=requirement)
-    structured_llm = llm_code.with_structured_output(Codes)
+    prompt = CODE_GENERATOR_AGENT_PROMPT.format_prompt(requirement=requirement)
 
-    generated_code = structured_llm.invoke(prompt)
+    model = route_model(state, "programmer", prompt)
+    if STREAM_CODE_GENERATION:
+        generated_code = await stream_code_files(model, prompt, src_dir)
+    else:
+        generated_code = await ainvoke_structured(model, Codes, prompt)
 
     state["codes"] = generated_code
     state["messages"] += [AIMessage(content=f"{generated_code.description}")]
 
     for code in state["codes"].codes:
-        state["messages"] += [
-            AIMessage(
-                content=f"Description of code: {code.description} \n"
-                f"Programming language used: {code.programming_language} \n"
-                f"{code.code}"
-            )
-        ]
+        state["messages"] += [code_message(code)]
 
     return state
+
+
+# Streams the Codes object and saves each Code entry once the next one has started,
+# so the first files are on disk long before the whole project has been generated.
+# If the stream ends without a valid Codes object (e.g. no complete chunk at all),
+# the project is generated again with a normal call.
+async def stream_code_files(model, prompt, src_dir: str) -> Codes:
+    saved = []
+    partial = {}
+    try:
+        async for partial in astream_structured(model, Codes, prompt):
+            files = partial.get("codes") or []
+            # Every entry except the last one in the list is complete
+            while len(saved) < len(files) - 1:
+                code = Code.parse_obj(files[len(saved)])
+                write_code_file(src_dir, code)
+                saved.append(code.filename)
+                print(f"Saved {code.filename} ({len(saved)} files ready)")
+        generated_code = Codes.parse_obj(partial)
+    except ValidationError as e:
+        print(f"Streamed code generation gave no complete project, falling back: {e}")
+        generated_code = await ainvoke_structured(model, Codes, prompt)
+        # Every file is written again, the saver deletes streamed files the answer doesn't have
+        saved = []
+
+    for code in generated_code.codes[len(saved):]:
+        write_code_file(src_dir, code)
+        print(f"Saved {code.filename}")
+    return generated_code
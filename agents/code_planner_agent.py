@@ -0,0 +1,89 @@
+from .message_compaction import code_message
+from .model_router import route_model
+from .common import ainvoke_structured
+from .workspace import reset_src_dir
+from schemas import GraphState, Codes, Code, ProjectPlan, PlannedFile
+from prompts.prompts import PROJECT_PLANNER_AGENT_PROMPT, FILE_GENERATOR_AGENT_PROMPT
+from langchain_core.messages import AIMessage
+
+
+# First step in graph flow when files are generated in parallel
+# -> Plan the file manifest, each file is then generated by its own file_generator_agent
+async def project_planner_agent(state: GraphState) -> GraphState:
+    print("\n**PROJECT PLANNER AGENT**")
+    # This deletes all files and subdirectories of this run's workspace except the "UI" folder.
+    reset_src_dir(state)
+
+    requirement = state["messages"][0].content
+    prompt = PROJECT_PLANNER_AGENT_PROMPT.format_prompt(requirement=requirement)
+    plan = await ainvoke_structured(route_model(state, "planner", prompt), ProjectPlan, prompt)
+
+    print(f"Planned {len(plan.files)} files: {', '.join(f.filename for f in plan.files)}")
+    state["plan"] = plan
+    state["generated_files"] = []
+    return state
+
+
+# Runs once per planned file (LangGraph Send), all files of the plan concurrently.
+# Input is the Send payload, not the whole graph state.
+async def file_generator_agent(payload: dict) -> dict:
+    planned_file: PlannedFile = payload["file"]
+    print(f"\n**FILE GENERATOR AGENT** ({planned_file.filename})")
+
+    prompt = FILE_GENERATOR_AGENT_PROMPT.format_prompt(
+        requirement=payload["requirement"],
+        project_plan=format_project_plan(payload["plan"]),
+        file=format_planned_file(planned_file),
+    )
+    # Only the Send payload here: the route is returned to the merger, which adds it to
+    # route_report so the first execution settles it
+    routes = {}
+    model = route_model(routes, "file_programmer", prompt, file_count=1)
+    code = await ainvoke_structured(model, Code, prompt)
+    file_routes = [{**route, "file": planned_file.filename} for route in routes["route_report"]]
+
+    # The plan is the source of truth for names, other files import them
+    code.filename = planned_file.filename
+    code.executable_code = planned_file.executable_code
+    return {"generated_files": [code], "file_routes": file_routes}
+
+
+# Collects the generated files back into one Codes object in the planned order
+async def merge_generated_files_agent(state: GraphState) -> GraphState:
+    print("\n**MERGE GENERATED FILES**")
+    plan = state["plan"]
+    files = {code.filename: code for code in state["generated_files"]}
+
+    state["codes"] = Codes(
+        description=plan.description,
+        codes=[files[f.filename] for f in plan.files if f.filename in files],
+        execution_command=plan.execution_command,
+    )
+    state["messages"] += [AIMessage(content=f"{plan.description}")]
+    state["route_report"] = (state.get("route_report") or []) + [
+        route for route in state.get("file_routes") or [] if route["file"] in files
+    ]
+
+    for code in state["codes"].codes:
+        state["messages"] += [code_message(code)]
+
+    return state
+
+
+def format_planned_file(planned_file: PlannedFile) -> str:
+    executable_note = "(Executable)" if planned_file.executable_code else ""
+    return (
+        f"**{planned_file.filename}** {executable_note}\n"
+        f"Language: {planned_file.programming_language}\n"
+        f"Role: {planned_file.role}\n"
+        f"Interface: {planned_file.interface}"
+    )
+
+
+def format_project_plan(plan: ProjectPlan) -> str:
+    files = "\n\n".join(format_planned_file(f) for f in plan.files)
+    return (
+        f"Description: {plan.description}\n"
+        f"Execution command: {plan.execution_command}\n\n"
+        f"{files}"
+    )
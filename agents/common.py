@@ -2,9 +2,16 @@
 # This file contains common objects and functions that can be shared across multiple agents or modules.
 # Just for reducing redundacy
 import os
+import asyncio
+import httpx
+from typing import AsyncIterator, Dict, Tuple, Type
 from langchain.output_parsers import PydanticOutputParser
+from langchain_core.output_parsers.openai_tools import JsonOutputKeyToolsParser
+from langchain_core.runnables import Runnable
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
+from .llm_cache import create_llm_cache
+from .metrics import llm_metrics_callback, count_llm_retries, note_retryable_response
 
 # Load environment variables once
 load_dotenv()
@@ -14,8 +21,114 @@ api_key = os.getenv("OPENAI_API_KEY")
 openai_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 openai_model_code = os.getenv("OPENAI_MODEL_CODE", "gpt-4o")
 
-llm = ChatOpenAI(api_key=api_key, model=openai_model)
-llm_code = ChatOpenAI(api_key=api_key, model=openai_model_code)
+# One connection pool shared by every agent and every graph run.
+# All graph runs execute on the job workers' event loop, so a single async client is enough.
+http_limits = httpx.Limits(
+    max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", 50)),
+    max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 20)),
+)
+http_timeout = httpx.Timeout(float(os.getenv("OPENAI_TIMEOUT", 600)), connect=10.0)
+http_client = httpx.Client(limits=http_limits, timeout=http_timeout)
+http_async_client = httpx.AsyncClient(
+    limits=http_limits,
+    timeout=http_timeout,
+    event_hooks={"request": [count_llm_retries], "response": [note_retryable_response]},
+)
+
+llm = ChatOpenAI(
+    api_key=api_key,
+    model=openai_model,
+    http_client=http_client,
+    http_async_client=http_async_client,
+    stream_usage=True,  # token usage of streamed calls, for the metrics
+)
+llm_code = ChatOpenAI(
+    api_key=api_key,
+    model=openai_model_code,
+    http_client=http_client,
+    http_async_client=http_async_client,
+    stream_usage=True,
+)
+
+# Structured output runnables are built once per (model, schema) and reused by every call
+_structured_llms: Dict[Tuple[int, type, bool], Tuple[ChatOpenAI, Runnable]] = {}
+
+
+def get_structured_llm(model: ChatOpenAI, schema: Type, streaming: bool = False) -> Runnable:
+    key = (id(model), schema, streaming)
+    if key not in _structured_llms:
+        if streaming:
+            # Yields the tool call arguments as a growing (partially parsed) dict
+            runnable = model.bind_tools(
+                [schema], tool_choice=schema.__name__, parallel_tool_calls=False
+            ) | JsonOutputKeyToolsParser(key_name=schema.__name__, first_tool_only=True)
+        else:
+            runnable = model.with_structured_output(schema)
+        # The model is kept in the value so its id can't be reused by another object
+        _structured_llms[key] = (model, runnable)
+    return _structured_llms[key][1]
+
+
+# Every LLM call reports its duration and token usage to the metrics
+llm_config = {"callbacks": [llm_metrics_callback]}
+
+# Opt-in persistent response cache (LLM_CACHE_ENABLED=true), None when disabled
+llm_cache = create_llm_cache()
+
+
+# Non-blocking LLM call returning an instance of the given pydantic schema
+# use_cache=False for calls that must not share an answer, e.g. speculative fix candidates
+async def ainvoke_structured(model: ChatOpenAI, schema: Type, prompt, use_cache: bool = True):
+    if llm_cache is None or not use_cache:
+        return await get_structured_llm(model, schema).ainvoke(prompt, config=llm_config)
+
+    # SQLite access runs in a thread so the event loop is never blocked
+    key = llm_cache.make_key(model.model_name, prompt, schema)
+    cached = await asyncio.to_thread(llm_cache.get, key, schema)
+    if cached is not None:
+        print(f"LLM cache hit for {schema.__name__} ({model.model_name})")
+        return cached
+
+    result = await get_structured_llm(model, schema).ainvoke(prompt, config=llm_config)
+    await asyncio.to_thread(llm_cache.put, key, model.model_name, schema, result)
+    return result
+
+
+# Streaming LLM call. Yields the partially parsed output as a dict while it is generated,
+# the last yielded dict is the complete output and is validated against the schema.
+async def astream_structured(model: ChatOpenAI, schema: Type, prompt) -> AsyncIterator[dict]:
+    key = None
+    if llm_cache is not None:
+        key = llm_cache.make_key(model.model_name, prompt, schema)
+        cached = await asyncio.to_thread(llm_cache.get, key, schema)
+        if cached is not None:
+            print(f"LLM cache hit for {schema.__name__} ({model.model_name})")
+            yield cached.dict()
+            return
+
+    partial = {}
+    async for partial in get_structured_llm(model, schema, streaming=True).astream(
+        prompt, config=llm_config
+    ):
+        yield partial
+
+    result = schema.parse_obj(partial)
+    if key is not None:
+        await asyncio.to_thread(llm_cache.put, key, model.model_name, schema, result)
+
+
+# Admission control: at most this many docker builds/runs at once, however many jobs are running
+max_concurrent_docker_builds = int(os.getenv("MAX_CONCURRENT_DOCKER_BUILDS", 2))
+docker_slots = asyncio.Semaphore(max_concurrent_docker_builds)
 
 # Export common objects or functions
-__all__ = ["PydanticOutputParser", "llm", "llm_code"]
+__all__ = [
+    "PydanticOutputParser",
+    "llm",
+    "llm_code",
+    "get_structured_llm",
+    "ainvoke_structured",
+    "astream_structured",
+    "llm_cache",
+    "docker_slots",
+]
@@ -1,7 +1,9 @@
-from .common import llm
+from .message_compaction import code_message
+from .model_router import route_model
+from .common import ainvoke_structured
+from .symbol_index import build_fix_context
 from schemas import GraphState, Codes
 from prompts.prompts import CODE_FIXER_AGENT_PROMPT
-from langchain_core.messages import AIMessage
 
 
 # Debug codes if error occurs
@@ -9,20 +11,34 @@ async def debug_code_agent(state: GraphState):
     print("\n **DEBUG CODE**")
     error = state["error"]
     code = state["codes"].codes
-    structured_llm = llm.with_structured_output(Codes)
-    prompt = CODE_FIXER_AGENT_PROMPT.format(original_code=code, error_message=error)
-    fixed_code = structured_llm.invoke(prompt)
+    symbol_index = state.get("symbol_index")
+
+    # When the error points to project files, only those files are sent in full together
+    # with the related functions of the other files. Files missing from the answer are kept.
+    failing_files = list(dict.fromkeys(frame.file for frame in error.frames))
+    failing_code = [c for c in code if c.filename in failing_files]
+    if symbol_index and failing_code:
+        original_code = f"{failing_code}"
+        related = build_fix_context(
+            symbol_index, code, error.file, error.line, error.frames, full_files=failing_files
+        )
+        if related:
+            original_code += f"\n**Related code from other files (read only)**:\n{related}"
+        prompt = CODE_FIXER_AGENT_PROMPT.format_prompt(original_code=original_code, error_message=error)
+        model = route_model(state, "debugger", prompt, file_count=len(failing_code), error=error)
+        fixed_code = await ainvoke_structured(model, Codes, prompt)
+
+        fixed_files = {c.filename: c for c in fixed_code.codes if c.filename in failing_files}
+        fixed_code.codes = [fixed_files.get(c.filename, c) for c in code]
+    else:
+        prompt = CODE_FIXER_AGENT_PROMPT.format_prompt(original_code=code, error_message=error)
+        model = route_model(state, "debugger", prompt, file_count=len(code), error=error)
+        fixed_code = await ainvoke_structured(model, Codes, prompt)
 
     state["codes"] = fixed_code
 
     for code in state["codes"].codes:
-        state["messages"] += [
-            AIMessage(
-                content=f"Description of code: {code.description} \n"
-                f"Programming language used: {code.programming_language} \n"
-                f"{code.code}"
-            )
-        ]
+        state["messages"] += [code_message(code)]
 
     state["iterations"] += 1
 
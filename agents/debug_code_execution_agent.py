@@ -1,56 +1,219 @@
 import os
 import re
-from .common import llm
-from schemas import GraphState, Code
-from prompts.prompts import CODE_FIXER_AGENT_PROMPT
+from typing import Dict, List, Tuple
+from .model_router import route_model
+from .common import ainvoke_structured
+from .workspace import get_src_dir, write_files_atomically
+from .symbol_index import build_fix_context, index_file
+from .patching import apply_patch_set
+from .docker_image_cache import DEPENDENCY_MANIFESTS
+from schemas import GraphState, Code, FixedCodes, PatchSet
+from prompts.prompts import CODE_FIXER_AGENT_PROMPT, CODE_PATCH_AGENT_PROMPT
+
+# Ask for search/replace hunks instead of the complete files, the full files are only
+# requested when a patch does not apply
+PATCH_FIXES = os.getenv("PATCH_FIXES", "true").lower() in ("1", "true", "yes")
+
+# Dependency manifests sent in full with the failing files (lock files are too large and
+# are regenerated by the package manager anyway)
+EDITABLE_MANIFESTS = [
+    name for name in DEPENDENCY_MANIFESTS if not name.endswith(("lock", "lock.json", "lock.yaml", ".sum"))
+]
+
+# Module an import error names: Python's ImportError / ModuleNotFoundError and Node's
+# "Cannot find module" / missing export
+FAILED_IMPORT_PATTERNS = [
+    r"No module named '([\w.]+)'",
+    r"cannot import name '\w+' from (?:partially initialized module )?'([\w.]+)'",
+    r"Cannot find module '([^']+)'",
+    r"The requested module '([^']+)' does not provide an export named",
+]
 
 #with done update we want only append the code that need to be fixed to prompt
 
 async def debug_code_execution_agent(state: GraphState):
     print("\n **DEBUG CODE EXECUTION AGENT**")
+    full_files, original_code = fix_context(state)
+    # Fast model first, the strong one after a fix that didn't pass (see model_router)
+    model = route_model(
+        state,
+        "debug_code",
+        f"{original_code}\n{state['error']}",
+        file_count=len(full_files),
+        error=state["error"],
+    )
+    updates, patch_report = await generate_fix(
+        state["codes"].codes, full_files, original_code, state["error"], model
+    )
+    state["patch_report"] = (state.get("patch_report") or []) + patch_report
+    state["iterations"] += 1
+
+    if not updates:
+        print("Fixer returned no file that can be saved")
+        return state
+
+    apply_fix(state, updates)
+    return state
+
+
+# Files the fixer may rewrite and the code sent to it
+def fix_context(state: GraphState) -> Tuple[List[str], object]:
     error = state["error"]
     code_list = state["codes"].codes
-    structured_llm = llm.with_structured_output(Code)
 
-    # Since the code is executed in a Docker environment, error messages always contain the '/app/' path.
-    # Modify the regex to recognize any file extension (e.g., .py, .js, .java, etc.).
-    error_details = error.details
-    files_in_error = re.findall(r"/app/([^/]+\.\w+)", error_details)
-
-    if files_in_error:
-        # Filter the code list to include only the files mentioned in the error message.
-        # This optimization prevents unnecessary processing of large, unrelated files.
-        filtered_code_list = [
-            code for code in code_list if code.filename in files_in_error
-        ]
-    else:
+    # Files of the parsed stack frames (Python, Node, Java, Go), innermost frame first
+    files_in_error = list(dict.fromkeys(frame.file for frame in error.frames))
+    if not files_in_error:
+        # Since the code is executed in a Docker environment, error messages always contain the '/app/' path.
+        # Modify the regex to recognize any file extension (e.g., .py, .js, .java, etc.).
+        files_in_error = re.findall(r"/app/([^/]+\.\w+)", error.details)
+
+    # Filter the code list to include only the files mentioned in the error message.
+    # This optimization prevents unnecessary processing of large, unrelated files.
+    filtered_code_list = [code for code in code_list if code.filename in files_in_error]
+    if not filtered_code_list:
         # If no specific files are mentioned, process all files (fallback scenario).
         filtered_code_list = code_list
 
-    # Format the prompt with only the relevant erroneous files to optimize performance.
-    prompt = CODE_FIXER_AGENT_PROMPT.format(
-        original_code=filtered_code_list, error_message=error
+    # With a symbol index the failing files, the module whose import failed and the
+    # dependency manifests are sent in full. The other files the failing code uses contribute
+    # just the related functions (build_fix_context, within FIX_CONTEXT_MAX_LINES).
+    original_code = filtered_code_list
+    full_files = [code.filename for code in filtered_code_list]
+    symbol_index = state.get("symbol_index")
+    if symbol_index and any(code.filename == error.file for code in code_list):
+        full_files = editable_files(symbol_index, code_list, filtered_code_list, error.details)
+        related = build_fix_context(
+            symbol_index, code_list, error.file, error.line, error.frames, full_files=full_files
+        )
+        original_code = f"{[code for code in code_list if code.filename in full_files]}"
+        if related:
+            original_code += f"\n**Related code from other files (read only)**:\n{related}"
+    return full_files, original_code
+
+
+# Asks the model for a fix: a patch set first, the complete files when it doesn't apply.
+# Returns the changed Codes (copies, the state is not touched) and the patch report.
+async def generate_fix(
+    code_list: List[Code], full_files, original_code, error, model, use_cache: bool = True
+) -> Tuple[List[Code], List[dict]]:
+    patch_report = []
+    updates = None
+    if PATCH_FIXES:
+        updates, patch_report = await patch_fix(
+            code_list, full_files, original_code, error, model, use_cache
+        )
+
+    if updates is None:
+        # Format the prompt with only the relevant erroneous files to optimize performance.
+        prompt = CODE_FIXER_AGENT_PROMPT.format_prompt(
+            original_code=original_code, error_message=error
+        )
+        fixed_codes = await ainvoke_structured(model, FixedCodes, prompt, use_cache=use_cache)
+        updates = full_file_fix(code_list, full_files, fixed_codes)
+    return updates, patch_report
+
+
+# Writes the changed files to the run's workspace and updates the codes and symbol index
+def apply_fix(state: GraphState, updates: List[Code]):
+    # All changed files are written together, a fix is never half applied
+    write_files_atomically(
+        get_src_dir(state), {code.filename: code.code.replace("\\n", "\n") for code in updates}
     )
-    fixed_code = structured_llm.invoke(prompt)
 
-    # Update only the corrected file while keeping other files unchanged.
-    for code in code_list:
-        if code.filename == fixed_code.filename:
-            code.description = fixed_code.description
-            code.code = fixed_code.code
-            break
+    # Update only the corrected files while keeping other files unchanged.
+    updated = {code.filename: code for code in updates}
+    code_list = [updated.pop(code.filename, code) for code in state["codes"].codes]
+    code_list += list(updated.values())
 
-    # Store the updated code list back in the state and increment the iteration counter.
+    # Store the updated code list back in the state.
     state["codes"].codes = code_list
-    state["iterations"] += 1
-
-    # Write the fixed code to a file in the 'generated/src' directory.
-    full_file_path = os.path.join("generated/src", fixed_code.filename)
-    formatted_code = fixed_code.code.replace("\\n", "\n")
-    with open(full_file_path, "w") as f:
-        f.write(formatted_code)
-
-    return state
+    symbol_index = state.get("symbol_index")
+    for code in updates:
+        print(f"Fixed {code.filename}")
+        if symbol_index is not None:
+            index_file(symbol_index, code.filename, code.code)
+
+
+# Files the fixer may change: the files of the error, the project module whose import
+# failed and the dependency manifests
+def editable_files(
+    symbol_index: dict, code_list: List[Code], failing: List[Code], error_details: str = ""
+) -> List[str]:
+    wanted = {code.filename for code in failing}
+    wanted.update(failed_import_sources(symbol_index, failing, error_details))
+    wanted.update(
+        code.filename for code in code_list if os.path.basename(code.filename) in EDITABLE_MANIFESTS
+    )
+    return [code.filename for code in code_list if code.filename in wanted]
+
+
+def _module_key(module: str) -> str:
+    # "./lib/cart.js", "/app/lib/cart" and "./cart" -> "cart", Python modules stay dotted
+    if "/" in module or module.startswith("."):
+        return os.path.splitext(os.path.basename(module))[0]
+    return module
+
+
+# Project files of the failing files' imports that the error log says could not be imported
+def failed_import_sources(symbol_index: dict, failing: List[Code], error_details: str) -> List[str]:
+    modules = {
+        _module_key(module)
+        for pattern in FAILED_IMPORT_PATTERNS
+        for module in re.findall(pattern, error_details or "")
+    }
+    sources = []
+    for code in failing:
+        for entry in symbol_index.get(code.filename, {}).get("imports", []):
+            key = _module_key(entry["module"])
+            # Relative imports name the module without its package ("from .ops import ...")
+            if entry["source"] and any(
+                key == module or module.endswith("." + key) for module in modules
+            ):
+                sources.append(entry["source"])
+    return sources
+
+
+# Asks for a patch set and applies it to the current files. Returns the patched Codes, or
+# None when any patch was rejected and the complete files have to be requested.
+async def patch_fix(code_list, full_files, original_code, error, model, use_cache: bool = True):
+    prompt = CODE_PATCH_AGENT_PROMPT.format_prompt(original_code=original_code, error_message=error)
+    patch_set = await ainvoke_structured(model, PatchSet, prompt, use_cache=use_cache)
+
+    current: Dict[str, Code] = {code.filename: code for code in code_list if code.filename in full_files}
+    patched, results = apply_patch_set({name: code.code for name, code in current.items()}, patch_set)
+    patch_report = [result.report() for result in results]
+    if patched is None:
+        rejected = {result.filename: result.rejected for result in results if not result.ok}
+        print(f"Patch rejected {rejected or 'no patches'}, requesting the full files")
+        return None, patch_report
+
+    print(f"Patched {', '.join(patched)}: {sum(len(r.applied) for r in results)} hunk(s) applied")
+    updates = [
+        current[name].copy(update={"description": patch_set.description, "code": code})
+        for name, code in patched.items()
+    ]
+    return updates, patch_report
+
+
+# Complete files returned by the fixer. A file the LLM only saw a slice of can't be
+# replaced by its answer, new files (e.g. a missing module) are added to the project.
+def full_file_fix(code_list, full_files, fixed_codes: FixedCodes) -> List[Code]:
+    known_files = {code.filename: code for code in code_list}
+    updates = []
+    for fixed in fixed_codes.codes:
+        if fixed.filename in known_files and fixed.filename not in full_files:
+            print(f"Fixer returned {fixed.filename} but only saw part of it, not saving it")
+            continue
+        if fixed.filename in known_files:
+            updates.append(
+                known_files[fixed.filename].copy(
+                    update={"description": fixed.description, "code": fixed.code}
+                )
+            )
+        else:
+            updates.append(Code(**fixed.dict()))
+    return updates
 
 
 # OLD ONE... before 19.2.2025
@@ -1,6 +1,9 @@
 import os
-from .common import llm
-from schemas import GraphState, DockerFile
+from .message_compaction import history_for_node
+from .model_router import route_model
+from .common import ainvoke_structured
+from schemas import GraphState, DockerFile, DockerFiles
+from .workspace import get_src_dir, write_compose_files
 from prompts.prompts import DEBUG_DOCKER_FILES_AGENT_PROMPT
 
 
@@ -10,22 +13,26 @@ async def debug_docker_execution_agent(state: GraphState):
     docker_files = state["docker_files"]
     dockerFile = docker_files.dockerfile
     dockerCompose = docker_files.docker_compose
-    structured_llm = llm.with_structured_output(DockerFile)
 
-    prompt = DEBUG_DOCKER_FILES_AGENT_PROMPT.format(
+    prompt = DEBUG_DOCKER_FILES_AGENT_PROMPT.format_prompt(
         dockerfile=dockerFile,
         docker_compose=dockerCompose,
         error_messages=error.details,
-        messages=state["messages"],
+        history=history_for_node(state, "debug_docker"),
     )
-    fixed_docker_files = structured_llm.invoke(prompt)
+    model = route_model(state, "debug_docker", prompt, error=error)
+    fixed_docker_files = await ainvoke_structured(model, DockerFile, prompt)
 
     state["iterations"] += 1
 
-    dockerfile_path = os.path.join("generated/src", "Dockerfile")
-    docker_compose_path = os.path.join("generated/src", "compose.yaml")
+    state["docker_files"] = DockerFiles(
+        dockerfile=fixed_docker_files.dockerfile,
+        docker_compose=fixed_docker_files.docker_compose,
+    )
+
+    src_dir = get_src_dir(state)
+    dockerfile_path = os.path.join(src_dir, "Dockerfile")
     with open(dockerfile_path, "w", encoding="utf-8") as f:
         f.write(fixed_docker_files.dockerfile)
-    with open(docker_compose_path, "w", encoding="utf-8") as f:
-        f.write(fixed_docker_files.docker_compose)
+    write_compose_files(src_dir, fixed_docker_files.docker_compose, state["run_id"])
     return state
@@ -0,0 +1,160 @@
+# agents/docker_driver.py
+# Async driver for the docker / docker-compose CLIs. Nothing here blocks the event loop:
+# every command runs as an asyncio subprocess, output can be streamed line by line and
+# commands are terminated on timeout or when the calling task is cancelled.
+# DOCKER_BIN and DOCKER_COMPOSE_BIN can point to a local fake engine for testing.
+import os
+import shlex
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, List, Optional
+
+DOCKER_BIN = shlex.split(os.getenv("DOCKER_BIN", "docker"))
+DOCKER_COMPOSE_BIN = shlex.split(os.getenv("DOCKER_COMPOSE_BIN", "docker-compose"))
+
+# Timeouts in seconds, 0 disables the timeout
+DOCKER_BUILD_TIMEOUT = float(os.getenv("DOCKER_BUILD_TIMEOUT", 900))
+DOCKER_COMMAND_TIMEOUT = float(os.getenv("DOCKER_COMMAND_TIMEOUT", 120))
+
+
+def print_line(line: str):
+    print(line, end="")
+
+
+@dataclass
+class CommandResult:
+    returncode: Optional[int]
+    output: str
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+
+class StreamingProcess:
+    """A running command whose combined stdout/stderr is read line by line."""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.process.returncode
+
+    # Next output line, "" at end of output, None if nothing arrived within the timeout
+    async def readline(self, timeout: Optional[float] = None) -> Optional[str]:
+        try:
+            raw = await asyncio.wait_for(self.process.stdout.readline(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return raw.decode("utf-8", errors="replace")
+
+    async def lines(self) -> AsyncIterator[str]:
+        while True:
+            line = await self.readline()
+            if not line:
+                return
+            yield line
+
+    async def wait(self, timeout: Optional[float] = None) -> Optional[int]:
+        try:
+            return await asyncio.wait_for(self.process.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    # Terminate the process, kill it if it does not exit in time
+    async def stop(self, grace_period: float = 5):
+        if self.process.returncode is not None:
+            return
+        try:
+            self.process.terminate()
+            await asyncio.wait_for(self.process.wait(), grace_period)
+        except ProcessLookupError:
+            pass
+        except asyncio.TimeoutError:
+            self.process.kill()
+            await self.process.wait()
+
+
+async def start_process(args: List[str], cwd: Optional[str] = None) -> StreamingProcess:
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+    )
+    return StreamingProcess(process)
+
+
+# Run a command to completion, streaming each output line to on_line
+async def run_command(
+    args: List[str],
+    cwd: Optional[str] = None,
+    timeout: Optional[float] = DOCKER_COMMAND_TIMEOUT,
+    on_line: Optional[Callable[[str], None]] = None,
+) -> CommandResult:
+    process = await start_process(args, cwd=cwd)
+    output = []
+
+    async def read_all():
+        async for line in process.lines():
+            output.append(line)
+            if on_line:
+                on_line(line)
+        await process.wait()
+
+    try:
+        await asyncio.wait_for(read_all(), timeout or None)
+    except asyncio.TimeoutError:
+        await process.stop()
+        return CommandResult(process.returncode, "".join(output), timed_out=True)
+    except asyncio.CancelledError:
+        # The caller was cancelled: don't leave the docker command running
+        await asyncio.shield(process.stop())
+        raise
+    return CommandResult(process.returncode, "".join(output))
+
+
+async def docker(*args: str, timeout: Optional[float] = DOCKER_COMMAND_TIMEOUT) -> CommandResult:
+    return await run_command(DOCKER_BIN + list(args), timeout=timeout)
+
+
+class ComposeProject:
+    """build / up / logs / down of one compose project (one graph run)."""
+
+    def __init__(self, project_name: str, cwd: str, compose_file: Optional[str] = None):
+        self.project_name = project_name
+        self.cwd = cwd
+        # Compose file outside cwd (the run-scoped copy), paths in it stay relative to cwd
+        self.compose_file = compose_file
+
+    def command(self, *args: str, files: Optional[List[str]] = None) -> List[str]:
+        command = DOCKER_COMPOSE_BIN + ["-p", self.project_name]
+        if self.compose_file:
+            command += ["-f", self.compose_file, "--project-directory", self.cwd]
+        for compose_file in files or []:
+            command += ["-f", compose_file]
+        return command + list(args)
+
+    async def build(
+        self,
+        files: Optional[List[str]] = None,
+        on_line: Optional[Callable[[str], None]] = print_line,
+        timeout: Optional[float] = DOCKER_BUILD_TIMEOUT,
+    ) -> CommandResult:
+        return await run_command(
+            self.command("build", files=files), cwd=self.cwd, timeout=timeout, on_line=on_line
+        )
+
+    # Starts `up` and returns at once, the caller reads the output and decides when to stop
+    async def up(self, *args: str) -> StreamingProcess:
+        return await start_process(self.command("up", *args), cwd=self.cwd)
+
+    async def down(self, timeout: Optional[float] = DOCKER_COMMAND_TIMEOUT) -> CommandResult:
+        return await run_command(
+            self.command("down"), cwd=self.cwd, timeout=timeout, on_line=print_line
+        )
+
+    async def logs(self, container_name: str) -> CommandResult:
+        return await docker("logs", container_name)
@@ -1,134 +1,228 @@
-import os
-import re
-import subprocess
+import time
 import inspect
 import asyncio
-import time
 from schemas import GraphState, ErrorMessage
+from .common import docker_slots
+from .docker_driver import ComposeProject
+from .runtime_pool import runtime_pool, match_template
+from .run_outcome import (
+    LogCollector,
+    published_ports,
+    wait_until_ready,
+    container_exit_codes,
+    SERVICE_READY_TIMEOUT,
+    SERVICE_OBSERVATION_WINDOW,
+    ONE_SHOT_TIMEOUT,
+)
+from .metrics import record_docker
+from .docker_image_cache import image_cache, dependency_manifest_hash
+from .workspace import (
+    get_src_dir,
+    compose_file_of,
+    compose_project_name,
+    snapshot_hashes,
+    list_project_files,
+)
+from .error_parsers import annotate_error
+from .model_router import settle_routes
+from .incremental_build import (
+    BuildPlan,
+    FULL_BUILD,
+    SOURCE_REFRESH,
+    plan_build,
+    images_exist,
+    refresh_source_layer,
+    build_report_entry,
+)
 
 
 async def start_docker_container_agent(state: GraphState):
+    result = await execute_project(state)
+    # The model routes of the LLM calls since the last execution passed or failed with it
+    return {**result, **settle_routes(state, result)}
+
+
+# Builds and runs the project, returns the state update with the error (None when it passed)
+async def execute_project(state: GraphState):
     print("*** START DOCKER CONTAINER AGENT ***")
+    # A speculative fix candidate already built and ran exactly these files
+    validated = state.get("validated_run")
+    if validated and validated["hashes"] == snapshot_hashes(get_src_dir(state)):
+        print("Files were already built and run by a fix candidate, reusing its outcome")
+        return {**validated["result"], "validated_run": None}
+
+    # Wait for a free docker slot so the host never runs more builds than it can handle
+    async with docker_slots:
+        return await run_docker_container(state)
+
+
+async def run_docker_container(state: GraphState):
     error = None
     current_function = inspect.currentframe().f_code.co_name
     current_file = __file__
 
     container_name = state["docker_container_name"]
-    original_dir = os.getcwd()
-    os.chdir("generated/src")
+    # Commands run inside the run's own workspace; os.chdir would affect every run in the process
+    src_dir = get_src_dir(state)
+
+    # Simple one-shot projects run in a warm pooled container, no image build needed
+    if runtime_pool is not None:
+        plan = match_template(src_dir)
+        if plan is not None:
+            result = await run_in_runtime_pool(plan, src_dir)
+            if result is not None:
+                return result
+            print("Runtime pool not available, falling back to a full build")
+
+    project = ComposeProject(compose_project_name(state), src_dir, compose_file_of(src_dir))
 
+    up_process = None
     full_output = ""
-    error_output = ""
-    error_capture = []
-    traceback_started = False
+    build_state = {}
 
     try:
         # Build image
-        print(f"Building Docker image for container: {container_name}...")
-        build_command = ["docker-compose", "build"]
-        build_process = subprocess.Popen(
-            build_command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            encoding="utf-8",
+        # Only a full build when something else than source files changed since the last build
+        build_started = time.monotonic()
+        current_hashes = snapshot_hashes(src_dir)
+        plan = plan_build(
+            src_dir, state.get("build_hashes"), current_hashes, project.project_name
         )
-        # Read logs from the build process
-        for line in build_process.stdout:
-            print(line, end="")
-            full_output += line
+        if plan.mode != FULL_BUILD and not await images_exist(src_dir, project.project_name):
+            plan = BuildPlan(FULL_BUILD, "previous image no longer exists", plan.changed_files)
 
-        build_process.wait()
-        if build_process.returncode != 0:
+        build_ok = True
+        if plan.mode == SOURCE_REFRESH:
+            print(f"Refreshing source files in the previous image: {plan.changed_files}")
+            build_ok = await refresh_source_layer(src_dir, plan, project.project_name)
+            record_docker("source_refresh", time.monotonic() - build_started)
+            if not build_ok:
+                plan = BuildPlan(FULL_BUILD, "source refresh failed", plan.changed_files)
+
+        if plan.mode == FULL_BUILD:
+            print(f"Building Docker image for container: {container_name}...")
+            # Reuse the image built earlier for the same dependency manifests when there is one
+            manifest_hash = dependency_manifest_hash(src_dir)
+            cache_override = image_cache.write_cache_override(
+                src_dir, manifest_hash, project.project_name
+            )
+            compose_files = [cache_override] if cache_override else None
+
+            # Build logs are streamed while the build runs
+            full_build_started = time.monotonic()
+            build_result = await project.build(files=compose_files)
+            record_docker("build", time.monotonic() - full_build_started)
+            full_output += build_result.output
+            build_ok = build_result.ok
+
+        # Per-iteration build time and the reason for a full rebuild
+        build_state["build_report"] = (state.get("build_report") or []) + [
+            build_report_entry(state.get("iterations", 0), plan, build_started)
+        ]
+        if not build_ok:
+            details = full_output.strip()
+            if plan.mode == FULL_BUILD and build_result.timed_out:
+                details += "\nThe Docker build timed out."
             error = ErrorMessage(
                 type="Docker Configuration Error",
                 message="Error during Docker setup or build process.",
-                details=full_output.strip(),
+                details=details,
                 code_reference=f"{current_file} - {current_function}",
             )
-            return {"error": error}
+            return {"error": error, **build_state}
+
+        build_state["build_hashes"] = current_hashes
+        if plan.mode == FULL_BUILD:
+            # Keep this build's images (and their dependency layers) for later builds
+            await image_cache.remember_build(src_dir, manifest_hash, project.project_name)
 
         # Run container
-        print(f"Running Docker container: {container_name}...")
-        up_command = [
-            "docker-compose",
-            "up",
+        # Projects that publish ports are services: they succeed once their ports answer.
+        # Other projects are one-shot programs: they succeed when they exit with code 0.
+        ports = published_ports(src_dir)
+        window = SERVICE_READY_TIMEOUT if ports else ONE_SHOT_TIMEOUT
+        print(
+            f"Running Docker container: {container_name} "
+            f"({'service on ports ' + str(sorted(ports)) if ports else 'one-shot program'})..."
+        )
+        run_started = time.monotonic()
+        up_process = await project.up(
             "--abort-on-container-exit",
             "--no-log-prefix",  # Cleaner log output
-        ]
-        up_process = subprocess.Popen(
-            up_command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            encoding="utf-8",
         )
+        logs = LogCollector()
+
+        async def read_logs():
+            async for line in up_process.lines():
+                print(line, end="")
+                logs.feed(line)
+                if logs.exited_with_error:
+                    return
 
-        # Read logs with a timer; break out after 3 seconds
-        start_time = time.time()
-        while True:
-            line = up_process.stdout.readline()
-            if not line:
-                break
-            print(line, end="")
-            full_output += line
-
-            # Capture error output based on traceback patterns
-            if re.match(r'\s*File\s+".+",\s+line\s+\d+', line):
-                traceback_started = True
-                error_capture.append(line)
-            elif traceback_started:
-                error_capture.append(line)
-            elif "Traceback" in line or "SyntaxError" in line or "Exception" in line:
-                traceback_started = True
-                error_capture.append(line)
-
-            # Check if the container exited with an error message
-            if "exited with code" in line:
-                error_output = "".join(error_capture)
-                break
-
-            # Check if 3 seconds have elapsed; if so, break out of the loop
-            if time.time() - start_time > 3:
-                print("3 seconds passed, stopping log capture...")
-                break
-
-        # Kill the container process if it's still running
-        # Reads the container logs, and if the container does not stop on its own (e.g., a live service), log reading is interrupted after 3 seconds.
+        reader = asyncio.create_task(read_logs())
+        probe = asyncio.create_task(wait_until_ready(ports)) if ports else None
         try:
-            up_process.kill()
-        except Exception:
-            pass
+            # Finish as soon as the outcome is known: the containers exit or the ports answer
+            done, _ = await asyncio.wait(
+                [task for task in (reader, probe) if task],
+                timeout=window,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            ready = probe is not None and probe in done
+            if ready and reader not in done:
+                # Give a freshly started service a moment to crash before calling it a success
+                done, _ = await asyncio.wait([reader], timeout=SERVICE_OBSERVATION_WINDOW)
+            exited = reader in done
+        finally:
+            for task in (reader, probe):
+                if task and not task.done():
+                    task.cancel()
+        full_output += logs.output
+        error_output = logs.error_output
+
+        returncode = None
+        exit_codes = {}
+        if exited:
+            returncode = await up_process.wait(timeout=5)
+            # Exit status straight from the engine, the compose exit code alone is not reliable
+            exit_codes = await container_exit_codes(project)
+            print(f"Containers exited: {exit_codes}")
+        elif ready:
+            print(f"Service is ready on ports {sorted(ports)}")
+        elif ports:
+            error_output = (
+                f"{logs.output}\nThe service did not answer on ports {sorted(ports)} "
+                f"within {window:.0f} seconds."
+            )
+        else:
+            print(f"Program still running after {window:.0f} seconds, treating it as long-running")
 
-        # If errors were captured or the container exited with a failure code,
+        # Stop the compose process if it's still running
+        await up_process.stop()
+        record_docker("run", time.monotonic() - run_started)
+
+        failed_containers = {
+            name: code for name, code in exit_codes.items() if code not in (None, 0)
+        }
+        # If errors were captured or a container exited with a failure code,
         # fetch more detailed logs from the container.
         if (
-            up_process.returncode is not None and up_process.returncode != 0
-        ) or error_output:
+            failed_containers
+            or (not exit_codes and returncode not in (None, 0))
+            or error_output
+        ):
             print(f"Fetching logs from the container: {container_name}...")
-            log_process = await asyncio.create_subprocess_exec(
-                "docker",
-                "logs",
-                container_name,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            log_stdout, log_stderr = await log_process.communicate()
-            log_output = (
-                log_stdout.decode().strip()
-                if isinstance(log_stdout, bytes)
-                else log_stdout
-            )
+            log_result = await project.logs(container_name)
 
             error = ErrorMessage(
                 type="Docker Execution Error",
                 message="The code inside the container encountered an error or failed execution.",
-                details=error_output or log_output,
+                details=error_output or log_result.output.strip() or logs.output.strip(),
                 code_reference=f"{current_file} - {current_function}",
             )
-            return {"error": error}
-
-        state["docker_output"] = full_output
+            # File, line and stack frames of the error, so only the failing files are debugged
+            annotate_error(error, current_hashes)
+            return {"error": error, **build_state}
 
     except Exception as e:
         # Catch any unexpected errors
@@ -138,13 +232,53 @@ async def start_docker_container_agent(state: GraphState):
             details=str(e),
             code_reference=f"{current_file} - {current_function}",
         )
-        return {"error": error}
+        return {"error": error, **build_state}
 
     finally:
-        # Clean up: bring down containers and prune images if no error occurred
+        # Clean up: bring down containers if no error occurred.
+        # Images are not pruned, old ones are evicted by the image cache (LRU).
+        # Also runs when the task is cancelled, so no containers are left behind.
+        if up_process is not None:
+            await asyncio.shield(up_process.stop())
         if error is None:
-            subprocess.run(["docker-compose", "down"])
-            subprocess.run(["docker", "image", "prune", "-f"])
-        os.chdir(original_dir)  # Restore working directory
+            await asyncio.shield(project.down())
+
+    return {"error": None, "docker_output": full_output, **build_state}
+
+
+async def run_in_runtime_pool(plan, src_dir: str):
+    current_function = inspect.currentframe().f_code.co_name
+    current_file = __file__
+
+    started = time.monotonic()
+    pool_result = await runtime_pool.run(plan, src_dir, timeout=ONE_SHOT_TIMEOUT)
+    record_docker("pool_run", time.monotonic() - started)
+    if pool_result is None:
+        return None
+
+    if not pool_result.setup_ok:
+        # Same as a failing dependency install during docker build
+        error = ErrorMessage(
+            type="Docker Configuration Error",
+            message="Error during Docker setup or build process.",
+            details=pool_result.output.strip(),
+            code_reference=f"{current_file} - {current_function}",
+        )
+        return {"error": error}
+
+    logs = LogCollector()
+    for line in pool_result.output.splitlines(keepends=True):
+        logs.feed(line)
+    if pool_result.exit_code not in (None, 0) or logs.error_capture:
+        error = ErrorMessage(
+            type="Docker Execution Error",
+            message="The code inside the container encountered an error or failed execution.",
+            details="".join(logs.error_capture) or pool_result.output.strip(),
+            code_reference=f"{current_file} - {current_function}",
+        )
+        annotate_error(error, list_project_files(src_dir))
+        return {"error": error}
 
-    return {"error": None}
+    if pool_result.exit_code is None:
+        print(f"Program still running after {ONE_SHOT_TIMEOUT:.0f} seconds, treating it as long-running")
+    return {"error": None, "docker_output": pool_result.output}
@@ -0,0 +1,213 @@
+# agents/docker_image_cache.py
+# Keeps the images of earlier builds (and so their dependency install layers) around,
+# tagged by the hash of the project's dependency manifests. Unused images are removed
+# least recently used first instead of an unconditional `docker image prune`.
+import os
+import re
+import json
+import time
+import hashlib
+import fnmatch
+import threading
+from typing import Dict, List, Optional
+import yaml
+from .workspace import GENERATED_ROOT, compose_file_of
+from .docker_driver import docker
+
+# Files that decide what `pip install`, `npm install` etc. do
+DEPENDENCY_MANIFESTS = [
+    "requirements.txt",
+    "Pipfile",
+    "Pipfile.lock",
+    "pyproject.toml",
+    "poetry.lock",
+    "package.json",
+    "package-lock.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "pom.xml",
+    "build.gradle",
+    "go.mod",
+    "go.sum",
+    "Cargo.toml",
+    "Cargo.lock",
+    "Gemfile",
+    "Gemfile.lock",
+    "composer.json",
+    "composer.lock",
+]
+
+DEPENDENCY_IMAGE_REPOSITORY = "timeless-deps"
+
+
+# Hash of the dependency manifests and the base images of the Dockerfile.
+# Changing only source files keeps the hash, so the cached dependency layers stay valid.
+def dependency_manifest_hash(src_dir: str) -> str:
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(src_dir):
+        dirs[:] = sorted(d for d in dirs if d not in ("ui", "node_modules", ".git"))
+        for name in sorted(files):
+            if name in DEPENDENCY_MANIFESTS:
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, src_dir).encode("utf-8"))
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+
+    dockerfile = os.path.join(src_dir, "Dockerfile")
+    if os.path.exists(dockerfile):
+        with open(dockerfile, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if line.strip().upper().startswith("FROM "):
+                    digest.update(line.strip().encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+# Instructions of the Dockerfile split into words, one list per build stage
+def dockerfile_stages(src_dir: str) -> List[List[List[str]]]:
+    try:
+        with open(os.path.join(src_dir, "Dockerfile"), encoding="utf-8") as f:
+            dockerfile = f.read()
+    except OSError:
+        return []
+
+    stages: List[List[List[str]]] = []
+    for line in re.sub(r"\\\s*\n", " ", dockerfile).splitlines():
+        parts = line.strip().split()
+        if len(parts) < 2 or parts[0].startswith("#"):
+            continue
+        if parts[0].upper() == "FROM":
+            stages.append([])
+        if stages:
+            stages[-1].append(parts)
+    return stages
+
+
+def copies_from_context(parts: List[str]) -> bool:
+    return parts[0].upper() in ("COPY", "ADD") and not any(p.startswith("--from") for p in parts)
+
+
+def _is_manifest_source(source: str) -> bool:
+    name = os.path.basename(source.strip('[]",').rstrip("/"))
+    return any(fnmatch.fnmatch(manifest, name) for manifest in DEPENDENCY_MANIFESTS)
+
+
+# The Dockerfile copies dependency manifests and installs them (a RUN) before it copies any
+# source file. Only then does the image hold a dependency layer that a build with other
+# sources can start from; with `COPY . .` first every source change invalidates the install.
+def installs_dependencies_first(src_dir: str) -> bool:
+    for stage in dockerfile_stages(src_dir):
+        manifests_copied = False
+        for parts in stage:
+            if copies_from_context(parts):
+                sources = [p for p in parts[1:-1] if not p.startswith("--")]
+                if not sources or not all(_is_manifest_source(s) for s in sources):
+                    break
+                manifests_copied = True
+            elif parts[0].upper() == "RUN" and manifests_copied:
+                return True
+    return False
+
+
+# Service name -> image name for the services compose builds itself
+def built_service_images(src_dir: str, project_name: str) -> Dict[str, str]:
+    try:
+        with open(compose_file_of(src_dir), encoding="utf-8") as f:
+            compose = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+
+    images = {}
+    for service_name, service in (compose.get("services") or {}).items():
+        if isinstance(service, dict) and "build" in service:
+            images[service_name] = service.get("image") or f"{project_name}-{service_name}"
+    return images
+
+
+def dependency_image_tag(manifest_hash: str, service_name: str) -> str:
+    return f"{DEPENDENCY_IMAGE_REPOSITORY}:{manifest_hash}-{service_name}"
+
+
+class DockerImageCache:
+    def __init__(self, index_path: str, max_images: int = 10):
+        self.index_path = index_path
+        self.max_images = max_images
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, float]:
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, index: Dict[str, float]):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def contains(self, image: str) -> bool:
+        with self._lock:
+            return image in self._load()
+
+    # Mark images as used now, returns the images that fell out of the cache
+    def touch(self, images: List[str]) -> List[str]:
+        with self._lock:
+            index = self._load()
+            now = time.time()
+            for image in images:
+                index[image] = now
+            by_age = sorted(index, key=index.get)
+            evicted = by_age[: max(0, len(by_age) - self.max_images)]
+            for image in evicted:
+                del index[image]
+            self._save(index)
+        return evicted
+
+    # Compose override for the build of every service image. The cache metadata is always
+    # embedded (remember_build tags these images, later builds can only start from a tag
+    # that has it), the build starts from the cached dependency image when there is one.
+    # None when the project builds no image.
+    def write_cache_override(
+        self, src_dir: str, manifest_hash: str, project_name: str
+    ) -> Optional[str]:
+        services = {}
+        for service_name in built_service_images(src_dir, project_name):
+            build = {"args": {"BUILDKIT_INLINE_CACHE": "1"}}
+            tag = dependency_image_tag(manifest_hash, service_name)
+            if self.contains(tag):
+                print(f"Using cached dependency image {tag}")
+                build["cache_from"] = [tag]
+            services[service_name] = {"build": build}
+        if not services:
+            return None
+
+        override_path = os.path.join(os.path.dirname(src_dir), "compose.cache.yaml")
+        with open(override_path, "w", encoding="utf-8") as f:
+            yaml.safe_dump({"services": services}, f)
+        return override_path
+
+    # After a successful build: tag the images by manifest hash and evict old images.
+    # Images whose Dockerfile copies the sources before installing the dependencies are not
+    # kept, no later build could reuse their layers.
+    async def remember_build(self, src_dir: str, manifest_hash: str, project_name: str):
+        if not installs_dependencies_first(src_dir):
+            print("Dockerfile copies the sources before installing dependencies, not caching the image")
+            return
+        images = []
+        for service_name, image in built_service_images(src_dir, project_name).items():
+            tag = dependency_image_tag(manifest_hash, service_name)
+            if (await docker("tag", image, tag)).ok:
+                images += [image, tag]
+
+        for image in self.touch(images):
+            print(f"Evicting cached docker image: {image}")
+            await docker("image", "rm", image)
+
+
+# Shared cache for all runs in this process
+image_cache = DockerImageCache(
+    index_path=os.path.join(GENERATED_ROOT, ".docker_image_cache.json"),
+    max_images=int(os.getenv("DOCKER_IMAGE_CACHE_SIZE", 20)),
+)
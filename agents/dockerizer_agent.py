@@ -1,5 +1,8 @@
 import os
-from .common import llm
+from .message_compaction import history_for_node
+from .model_router import route_model
+from .common import ainvoke_structured
+from .workspace import get_src_dir, scoped_name, write_compose_files
 from schemas import GraphState, DockerFile, DockerFiles, Code
 from prompts.prompts import DOCKERFILE_GENERATOR_AGENT_PROMPT
 from langchain_core.messages import AIMessage
@@ -9,25 +12,27 @@ from typing import List
 async def dockerizer_agent(state: GraphState):
     print("\n **DOCKERIZER AGENT **")
 
-    structured_llm = llm.with_structured_output(DockerFile)
     code_descriptions = generate_code_descriptions(state["codes"].codes)
-    prompt = DOCKERFILE_GENERATOR_AGENT_PROMPT.format(
+    prompt = DOCKERFILE_GENERATOR_AGENT_PROMPT.format_prompt(
         executable_file_name=state["executable_file_name"],
         code_descriptions=code_descriptions,
-        messages=state["messages"],
+        history=history_for_node(state, "dockerizer"),
     )
 
-    docker_things = structured_llm.invoke(prompt)
+    model = route_model(state, "dockerizer", prompt, file_count=len(state["codes"].codes))
+    docker_things = await ainvoke_structured(model, DockerFile, prompt)
     docker_files_instance = DockerFiles(
         dockerfile=docker_things.dockerfile, docker_compose=docker_things.docker_compose
     )
 
     state["docker_files"] = docker_files_instance
     state["docker_image_name"] = docker_things.docker_image_name
-    state["docker_container_name"] = docker_things.docker_container_name
+    state["docker_container_name"] = scoped_name(
+        docker_things.docker_container_name, state["run_id"]
+    )
 
-    dockerfile_path = os.path.join("generated/src", "Dockerfile")
-    docker_compose_path = os.path.join("generated/src", "compose.yaml")
+    src_dir = get_src_dir(state)
+    dockerfile_path = os.path.join(src_dir, "Dockerfile")
 
     state["messages"] += [
         AIMessage(content=f"Description of dockerfile: {docker_things.description}"),
@@ -41,8 +46,9 @@ async def dockerizer_agent(state: GraphState):
 
     with open(dockerfile_path, "w", encoding="utf-8") as f:
         f.write(docker_things.dockerfile)
-    with open(docker_compose_path, "w", encoding="utf-8") as f:
-        f.write(docker_things.docker_compose)
+    # Container and image names and host ports are made unique per run in the copy docker
+    # runs, so parallel runs don't collide
+    write_compose_files(src_dir, docker_things.docker_compose, state["run_id"])
 
     return state
 
@@ -0,0 +1,282 @@
+# agents/error_parsers.py
+# Turns container logs into structured errors: the error class, its message and the stack
+# frames that point into project files (innermost frame first). One parser per language,
+# new languages are added with register_parser().
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+from schemas import ErrorFrame, ErrorMessage
+
+# Working directories the generated Dockerfiles copy the project to
+CONTAINER_ROOTS = ("/app/", "/usr/src/app/", "/workspace/", "/src/", "/code/")
+
+
+@dataclass
+class ParsedError:
+    language: str
+    error_class: Optional[str] = None
+    message: Optional[str] = None
+    frames: List[ErrorFrame] = field(default_factory=list)
+
+
+# Path of a project file for a path in a log, None for library and runtime frames
+def project_path(path: str, project_files: Optional[Iterable[str]] = None) -> Optional[str]:
+    path = path.strip()
+    if "node_modules/" in path or "site-packages/" in path:
+        return None
+    if path.startswith(("node:", "internal/")):
+        return None
+    relative = path
+    for root in CONTAINER_ROOTS:
+        if path.startswith(root):
+            relative = path[len(root):]
+            break
+    relative = relative[2:] if relative.startswith("./") else relative
+
+    if project_files is None:
+        return relative if relative != path or not path.startswith("/") else None
+    files = list(project_files)
+    if relative in files:
+        return relative
+    # Java and Go logs often only show the file name
+    matches = [f for f in files if f.endswith("/" + relative) or relative.endswith("/" + f)]
+    return matches[0] if len(matches) == 1 else None
+
+
+class ErrorParser(ABC):
+    """Base class: start_patterns find the first line of an error, parse() extracts it."""
+
+    language = ""
+    start_patterns: List[str] = []
+
+    def is_error_start(self, line: str) -> bool:
+        return any(re.search(pattern, line) for pattern in self.start_patterns)
+
+    @abstractmethod
+    def parse(self, log: str, project_files=None) -> Optional[ParsedError]:
+        ...
+
+
+class PythonErrorParser(ErrorParser):
+    language = "python"
+    start_patterns = [
+        r'\s*File\s+".+",\s+line\s+\d+',
+        r"Traceback",
+        r"SyntaxError",
+        r"Exception",
+    ]
+    frame_pattern = re.compile(r'^\s*File\s+"(.+?)",\s+line\s+(\d+)(?:,\s+in\s+(.+))?\s*$')
+    error_pattern = re.compile(
+        r"^([A-Za-z_][\w.]*(?:Error|Exception|Exit|Interrupt|Warning))(?::\s*(.*))?$"
+    )
+
+    def parse(self, log, project_files=None):
+        lines = log.splitlines()
+        frames, error_class, message = [], None, None
+        for index, line in enumerate(lines):
+            match = self.frame_pattern.match(line)
+            if match:
+                path = project_path(match.group(1), project_files)
+                if path:
+                    frames.append(
+                        ErrorFrame(file=path, line=int(match.group(2)), function=match.group(3))
+                    )
+                continue
+            # SyntaxError: a caret under the offending column two lines after the frame
+            if frames and re.match(r"^\s*\^+\s*$", line) and frames[-1].column is None:
+                source = lines[index - 1] if index else ""
+                indent = len(source) - len(source.lstrip())
+                frames[-1].column = line.index("^") - indent + 1
+                continue
+            match = self.error_pattern.match(line.strip())
+            if match:
+                error_class, message = match.group(1), match.group(2)
+        if not frames and error_class is None:
+            return None
+        # Python prints the innermost frame last
+        return ParsedError(self.language, error_class, message, frames[::-1])
+
+
+class NodeErrorParser(ErrorParser):
+    language = "javascript"
+    start_patterns = [
+        r"^\s*\S+\.(?:c|m)?[jt]sx?:\d+\s*$",
+        r"^(?:Uncaught\s+)?\w*Error(?::|$)",
+        r"^\s+at\s.+:\d+:\d+\)?\s*$",
+    ]
+    frame_pattern = re.compile(r"^\s+at\s+(?:(.+?)\s+\()?(?:file://)?(.+?):(\d+):(\d+)\)?\s*$")
+    location_pattern = re.compile(r"^\s*(\S+\.(?:c|m)?[jt]sx?):(\d+)\s*$")
+    error_pattern = re.compile(r"^(?:Uncaught\s+)?((?:[A-Z]\w*)?(?:Error|Exception))(?::\s*(.*))?$")
+
+    def parse(self, log, project_files=None):
+        frames, error_class, message = [], None, None
+        for line in log.splitlines():
+            match = self.frame_pattern.match(line)
+            if match:
+                path = project_path(match.group(2), project_files)
+                if path:
+                    frames.append(
+                        ErrorFrame(
+                            file=path,
+                            line=int(match.group(3)),
+                            column=int(match.group(4)),
+                            function=match.group(1),
+                        )
+                    )
+                continue
+            # Syntax errors start with "file:line" before the stack
+            match = self.location_pattern.match(line)
+            if match:
+                path = project_path(match.group(1), project_files)
+                if path:
+                    frames.insert(0, ErrorFrame(file=path, line=int(match.group(2))))
+                continue
+            match = self.error_pattern.match(line.strip())
+            if match and error_class is None:
+                error_class, message = match.group(1), match.group(2)
+        if not frames:
+            return None
+        return ParsedError(self.language, error_class, message, _unique(frames))
+
+
+class JavaErrorParser(ErrorParser):
+    language = "java"
+    start_patterns = [
+        r"Exception in thread",
+        r"^[\w.$]+(?:Exception|Error)(?::|\s*$)",
+        r"\.java:\d+: error:",
+        r"^\s+at\s+[\w.$<>]+\([\w$]+\.java:\d+\)",
+    ]
+    frame_pattern = re.compile(r"^\s+at\s+([\w.$<>]+)\(([\w$]+\.java):(\d+)\)")
+    compile_pattern = re.compile(r"^(.+\.java):(\d+): error: (.*)$")
+    error_pattern = re.compile(
+        r'^(?:Exception in thread "[^"]*"\s+)?(?:Caused by:\s+)?([\w.$]+(?:Exception|Error))(?::\s*(.*))?$'
+    )
+
+    def parse(self, log, project_files=None):
+        frames, error_class, message = [], None, None
+        for line in log.splitlines():
+            match = self.compile_pattern.match(line.strip())
+            if match:
+                path = project_path(match.group(1), project_files)
+                if path:
+                    frames.append(ErrorFrame(file=path, line=int(match.group(2))))
+                    error_class = error_class or "CompilationError"
+                    message = message or match.group(3)
+                continue
+            match = self.frame_pattern.match(line)
+            if match:
+                path = project_path(_java_source(match.group(1), match.group(2)), project_files)
+                if path:
+                    frames.append(
+                        ErrorFrame(file=path, line=int(match.group(3)), function=match.group(1))
+                    )
+                continue
+            match = self.error_pattern.match(line.strip())
+            if match and error_class is None:
+                error_class, message = match.group(1).split(".")[-1], match.group(2)
+        if not frames:
+            return None
+        return ParsedError(self.language, error_class, message, _unique(frames))
+
+
+class GoErrorParser(ErrorParser):
+    language = "go"
+    start_patterns = [r"^panic: ", r"^fatal error: ", r"\.go:\d+:\d+: "]
+    frame_pattern = re.compile(r"^\s+(.+\.go):(\d+)(?:\s+\+0x[0-9a-f]+)?\s*$")
+    compile_pattern = re.compile(r"^(?:\./)?(.+\.go):(\d+):(\d+): (.*)$")
+
+    def parse(self, log, project_files=None):
+        frames, error_class, message = [], None, None
+        function = None
+        for line in log.splitlines():
+            if line.startswith(("panic: ", "fatal error: ")):
+                error_class, _, message = line.partition(": ")
+                continue
+            match = self.compile_pattern.match(line.strip())
+            if match and not line.startswith((" ", "\t")):
+                path = project_path(match.group(1), project_files)
+                if path:
+                    frames.append(
+                        ErrorFrame(file=path, line=int(match.group(2)), column=int(match.group(3)))
+                    )
+                    error_class = error_class or "compile error"
+                    message = message or match.group(4)
+                continue
+            match = self.frame_pattern.match(line)
+            if match:
+                path = project_path(match.group(1), project_files)
+                if path:
+                    frames.append(ErrorFrame(file=path, line=int(match.group(2)), function=function))
+                continue
+            # A goroutine frame is the function line followed by the file:line line
+            function = line.strip().split("(")[0] or None
+        if not frames:
+            return None
+        return ParsedError(self.language, error_class, message, _unique(frames))
+
+
+def _java_source(method: str, filename: str) -> str:
+    # com.example.App.main + App.java -> com/example/App.java
+    package = method.rsplit(".", 2)[0] if method.count(".") >= 2 else ""
+    return f"{package.replace('.', '/')}/{filename}" if package else filename
+
+
+# Drops repeated frames, keeping the details (column, function) any of the copies had
+def _unique(frames: List[ErrorFrame]) -> List[ErrorFrame]:
+    unique = {}
+    for frame in frames:
+        key = (frame.file, frame.line)
+        if key not in unique:
+            unique[key] = frame
+        else:
+            unique[key].column = unique[key].column or frame.column
+            unique[key].function = unique[key].function or frame.function
+    return list(unique.values())
+
+
+ERROR_PARSERS: List[ErrorParser] = [
+    PythonErrorParser(),
+    NodeErrorParser(),
+    JavaErrorParser(),
+    GoErrorParser(),
+]
+
+
+# Parsers without parse() can't be created, see ErrorParser
+def register_parser(parser: ErrorParser):
+    if not isinstance(parser, ErrorParser):
+        raise TypeError(f"{type(parser).__name__} is not an ErrorParser")
+    ERROR_PARSERS.append(parser)
+
+
+def is_error_start(line: str) -> bool:
+    return any(parser.is_error_start(line) for parser in ERROR_PARSERS)
+
+
+# The parse with the most project frames wins, so a Python app printing "Error" doesn't hide its traceback
+def parse_error_log(log: str, project_files=None) -> Optional[ParsedError]:
+    best = None
+    for parser in ERROR_PARSERS:
+        parsed = parser.parse(log, project_files)
+        if parsed and (best is None or len(parsed.frames) > len(best.frames)):
+            best = parsed
+    return best
+
+
+# Fills in file, line, error_class and frames of an error from its details
+def annotate_error(error: ErrorMessage, project_files=None) -> ErrorMessage:
+    parsed = parse_error_log(error.details or "", project_files)
+    if parsed is None:
+        return error
+    error.error_class = parsed.error_class
+    error.frames = parsed.frames
+    if parsed.frames:
+        error.file = parsed.frames[0].file
+        error.line = parsed.frames[0].line
+    print(
+        f"Parsed {parsed.language} error: {parsed.error_class} "
+        f"at {error.file}:{error.line} ({len(parsed.frames)} project frames)"
+    )
+    return error
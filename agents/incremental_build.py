@@ -0,0 +1,165 @@
+# agents/incremental_build.py
+# Decides whether a debug iteration needs a full `docker-compose build`. When only source
+# files changed since the last successful build, the previous image is reused: either the
+# source is bind mounted into the container anyway, or the changed files are copied on top
+# of the previous image in one cheap layer. Images that compile the source (a RUN after the
+# source is copied, e.g. `go build`, `mvn package`, `npm run build`) are always rebuilt, the
+# binary or bundle in the previous image was built from the old files.
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import yaml
+from .docker_driver import docker, run_command, print_line, DOCKER_BIN, DOCKER_BUILD_TIMEOUT
+from .docker_image_cache import (
+    DEPENDENCY_MANIFESTS,
+    built_service_images,
+    copies_from_context,
+    dockerfile_stages,
+)
+
+FULL_BUILD = "full"
+SOURCE_REFRESH = "source-refresh"  # changed files copied on top of the previous image
+BIND_MOUNT = "bind-mount"  # source is mounted into the container, no build needed
+REUSE_IMAGE = "reuse-image"  # nothing changed, the previous image is run as is
+
+
+@dataclass
+class BuildPlan:
+    mode: str
+    reason: str
+    changed_files: List[str] = field(default_factory=list)
+
+
+def _changed_files(previous: Dict[str, str], current: Dict[str, str]) -> List[str]:
+    return sorted(path for path, digest in current.items() if previous.get(path) != digest)
+
+
+def _load_compose(src_dir: str) -> dict:
+    try:
+        with open(os.path.join(src_dir, "compose.yaml"), encoding="utf-8") as f:
+            return yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+
+
+# Every built service mounts the whole project folder into the container
+def _source_is_bind_mounted(compose: dict) -> bool:
+    services = [
+        s for s in (compose.get("services") or {}).values() if isinstance(s, dict) and "build" in s
+    ]
+    if not services:
+        return False
+    for service in services:
+        mounts = [str(v).split(":")[0] for v in service.get("volumes") or [] if not isinstance(v, dict)]
+        if not any(source in (".", "./") for source in mounts):
+            return False
+    return True
+
+
+# Where `COPY . <dest>` puts the build context inside the image, None if the Dockerfile copies
+# only parts of the context (then a changed file's location in the image is unknown)
+def context_destination(src_dir: str) -> Optional[str]:
+    stages = dockerfile_stages(src_dir)
+    if not stages:
+        return None
+
+    workdir = "/"
+    destination = None
+    for parts in stages[-1]:  # only the last stage matters
+        keyword = parts[0].upper()
+        if keyword == "WORKDIR":
+            workdir = os.path.join(workdir, parts[1])
+        elif copies_from_context(parts):
+            sources = [p for p in parts[1:-1] if not p.startswith("--")]
+            if sources in (["."], ["./"]):
+                destination = os.path.normpath(os.path.join(workdir, parts[-1]))
+    return destination
+
+
+# A stage runs commands after its last copy from the build context: the image holds build
+# output of the source (binary, bundle, compiled classes), copying or mounting changed
+# files doesn't update it
+def compiles_source(src_dir: str) -> bool:
+    for stage in dockerfile_stages(src_dir):
+        copies = [i for i, parts in enumerate(stage) if copies_from_context(parts)]
+        if copies and any(parts[0].upper() == "RUN" for parts in stage[copies[-1] + 1:]):
+            return True
+    return False
+
+
+def plan_build(
+    src_dir: str,
+    previous: Optional[Dict[str, str]],
+    current: Dict[str, str],
+    project_name: str,
+) -> BuildPlan:
+    if not previous:
+        return BuildPlan(FULL_BUILD, "no earlier successful build")
+
+    changed = _changed_files(previous, current)
+    removed = sorted(set(previous) - set(current))
+    if not changed and not removed:
+        return BuildPlan(REUSE_IMAGE, "no files changed")
+    if removed:
+        return BuildPlan(FULL_BUILD, f"files removed: {', '.join(removed)}", changed)
+
+    for path in changed:
+        name = os.path.basename(path)
+        if name in ("Dockerfile", "compose.yaml", ".dockerignore"):
+            return BuildPlan(FULL_BUILD, f"{name} changed", changed)
+        if name in DEPENDENCY_MANIFESTS:
+            return BuildPlan(FULL_BUILD, f"dependency manifest {path} changed", changed)
+
+    if compiles_source(src_dir):
+        return BuildPlan(FULL_BUILD, "Dockerfile builds the source after copying it", changed)
+    if _source_is_bind_mounted(_load_compose(src_dir)):
+        return BuildPlan(BIND_MOUNT, "only source files changed, source is bind mounted", changed)
+    if context_destination(src_dir) is None:
+        return BuildPlan(FULL_BUILD, "Dockerfile does not copy the whole build context", changed)
+    if not built_service_images(src_dir, project_name):
+        return BuildPlan(FULL_BUILD, "no built services found in compose.yaml", changed)
+    return BuildPlan(SOURCE_REFRESH, "only source files changed", changed)
+
+
+async def images_exist(src_dir: str, project_name: str) -> bool:
+    for image in built_service_images(src_dir, project_name).values():
+        if not (await docker("image", "inspect", image)).ok:
+            return False
+    return True
+
+
+# Copies the changed files on top of the previous images and tags them with the same names
+async def refresh_source_layer(src_dir: str, plan: BuildPlan, project_name: str) -> bool:
+    if not plan.changed_files:
+        return True
+    destination = context_destination(src_dir)
+    refresh_dockerfile = os.path.join(os.path.dirname(src_dir), "Dockerfile.refresh")
+    for image in built_service_images(src_dir, project_name).values():
+        lines = [f"FROM {image}"] + [
+            f'COPY ["{path}", "{destination.rstrip("/")}/{path}"]' for path in plan.changed_files
+        ]
+        with open(refresh_dockerfile, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        result = await run_command(
+            DOCKER_BIN + ["build", "-f", refresh_dockerfile, "-t", image, src_dir],
+            timeout=DOCKER_BUILD_TIMEOUT,
+            on_line=print_line,
+        )
+        if not result.ok:
+            return False
+    return True
+
+
+def build_report_entry(iteration: int, plan: BuildPlan, started: float) -> dict:
+    entry = {
+        "iteration": iteration,
+        "mode": plan.mode,
+        "reason": plan.reason,
+        "changed_files": plan.changed_files,
+        "seconds": round(time.monotonic() - started, 2),
+    }
+    print(
+        f"Build for iteration {iteration}: {plan.mode} in {entry['seconds']}s ({plan.reason})"
+    )
+    return entry
@@ -0,0 +1,153 @@
+# agents/llm_cache.py
+# Opt-in on-disk cache for structured LLM responses (LLM_CACHE_ENABLED=true).
+# Entries are keyed on the model, the rendered prompt and the target pydantic schema,
+# so replaying the same requirement returns the stored Codes/DockerFile/Documentation at once.
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Optional, Type
+from .workspace import GENERATED_ROOT
+
+
+def render_prompt(prompt) -> str:
+    # ChatPromptValue -> list of (role, content), plain strings as they are
+    if hasattr(prompt, "to_messages"):
+        return json.dumps(
+            [[message.type, message.content] for message in prompt.to_messages()],
+            ensure_ascii=False,
+        )
+    return str(prompt)
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age_seconds: float = 7 * 24 * 3600,
+        max_entries: int = 10000,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                schema_name TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model_name: str, prompt, schema: Type) -> str:
+        payload = json.dumps(
+            {
+                "model": model_name,
+                "prompt": render_prompt(prompt),
+                "schema": schema.__name__,
+                "schema_json": schema.schema(),
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, schema: Type):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return schema.parse_raw(row[0])
+
+    def put(self, key: str, model_name: str, schema: Type, value):
+        data = value.json()
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, model, schema_name, value, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model_name, schema.__name__, data, len(data), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    # Drop expired entries first, then least recently used ones until size and count fit
+    def _evict(self, now: float):
+        cursor = self._conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (now - self.max_age_seconds,)
+        )
+        self.evictions += cursor.rowcount
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM llm_cache ORDER BY last_access ASC"
+        ).fetchall()
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": count,
+            "bytes": total,
+        }
+
+
+# Shared cache instance, None when caching is disabled
+def create_llm_cache() -> Optional[LLMResponseCache]:
+    if os.getenv("LLM_CACHE_ENABLED", "false").lower() not in ("1", "true", "yes"):
+        return None
+    return LLMResponseCache(
+        path=os.getenv("LLM_CACHE_PATH") or os.path.join(GENERATED_ROOT, ".llm_cache.sqlite"),
+        max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", 256)) * 1024 * 1024),
+        max_age_seconds=float(os.getenv("LLM_CACHE_MAX_AGE_HOURS", 168)) * 3600,
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 10000)),
+    )
@@ -0,0 +1,203 @@
+# agents/message_compaction.py
+# Keeps the message history that is put into prompts within a per-node token budget.
+# Every code generation / debug pass appends the full source of every file to
+# state["messages"], so without compaction the prompts grow with each debug iteration.
+# Compaction steps, each one only runs while the history is still over the budget:
+#   1. only the latest version of each file is kept
+#   2. older conversation turns are folded into a short summary
+#   3. file contents are replaced by a dependency manifest entry (largest files first)
+# The prompts get the compacted history as text in one human message (history_for_node),
+# not as a message list, so the summaries and manifests are plain text and cost no LLM call.
+import os
+import re
+from typing import List
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from schemas import GraphState, Code
+from .common import openai_model
+
+try:
+    import tiktoken
+except ImportError:  # Rough estimate below
+    tiktoken = None
+
+# Default token budget for the message history of every node, MESSAGE_TOKEN_BUDGET_<NODE> overrides it
+MESSAGE_TOKEN_BUDGET = int(os.getenv("MESSAGE_TOKEN_BUDGET", 6000))
+NODE_BUDGETS = {
+    "dockerizer": MESSAGE_TOKEN_BUDGET,
+    "debug_docker": MESSAGE_TOKEN_BUDGET,
+    # The README needs descriptions rather than source code
+    "readme": MESSAGE_TOKEN_BUDGET // 2,
+}
+# Number of latest non-file turns that are never folded into the summary
+KEEP_RECENT_TURNS = 4
+SUMMARY_LINE_LENGTH = 160
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded and tiktoken is not None:
+        _encoding_loaded = True
+        try:
+            try:
+                _encoding = tiktoken.encoding_for_model(openai_model)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # tiktoken downloads the encoding on first use, which fails on offline hosts
+            print(f"Token counting falls back to an estimate: {e}")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[BaseMessage]) -> int:
+    return sum(count_tokens(str(m.content)) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def node_budget(node: str) -> int:
+    default = NODE_BUDGETS.get(node, MESSAGE_TOKEN_BUDGET)
+    return int(os.getenv(f"MESSAGE_TOKEN_BUDGET_{node.upper()}", default))
+
+
+# Message holding the full source of one file, tagged with its filename so older versions can be dropped
+def code_message(code: Code) -> AIMessage:
+    return AIMessage(
+        content=f"Filename: {code.filename} \n"
+        f"Description of code: {code.description} \n"
+        f"Programming language used: {code.programming_language} \n"
+        f"{code.code}",
+        additional_kwargs={
+            "filename": code.filename,
+            "description": code.description,
+            "programming_language": code.programming_language,
+            "imports": find_imports(code.code),
+        },
+    )
+
+
+def _filename(message: BaseMessage):
+    return message.additional_kwargs.get("filename")
+
+
+# Modules and packages a file imports (Python and JavaScript/TypeScript)
+def find_imports(source: str) -> List[str]:
+    patterns = [
+        r"^\s*from\s+([\w.]+)\s+import\b",
+        r"^\s*import\s+([\w.]+)",
+        r"""\brequire\(\s*['"]([^'"]+)['"]\s*\)""",
+        r"""^\s*import\s+(?:.+?\s+from\s+)?['"]([^'"]+)['"]""",
+    ]
+    imports = []
+    for pattern in patterns:
+        for name in re.findall(pattern, source, flags=re.MULTILINE):
+            if name not in imports:
+                imports.append(name)
+    return imports
+
+
+def _manifest_entry(message: BaseMessage) -> str:
+    kwargs = message.additional_kwargs
+    entry = (
+        f"- {kwargs['filename']} ({kwargs.get('programming_language', '')}): "
+        f"{kwargs.get('description', '')}"
+    )
+    if kwargs.get("imports"):
+        entry += f" Imports: {', '.join(kwargs['imports'])}"
+    return entry
+
+
+def _summary_line(message: BaseMessage) -> str:
+    text = " ".join(str(message.content).split())
+    if len(text) > SUMMARY_LINE_LENGTH:
+        text = text[:SUMMARY_LINE_LENGTH] + "..."
+    return f"- {message.type}: {text}"
+
+
+def compact_messages(messages: List[BaseMessage], budget: int) -> List[BaseMessage]:
+    # 1. Only the latest version of each file
+    latest = {}
+    for index, message in enumerate(messages):
+        if _filename(message):
+            latest[_filename(message)] = index
+    messages = [
+        m for i, m in enumerate(messages) if not _filename(m) or latest[_filename(m)] == i
+    ]
+    if count_message_tokens(messages) <= budget:
+        return messages
+
+    # The user's requirement always stays
+    head = messages[:1] if messages and isinstance(messages[0], HumanMessage) else []
+    rest = messages[len(head):]
+
+    # 2. Fold older turns into a summary
+    turns = [i for i, m in enumerate(rest) if not _filename(m)]
+    folded = set(turns[:-KEEP_RECENT_TURNS]) if len(turns) > KEEP_RECENT_TURNS else set()
+    summary = []
+    if folded:
+        summary = [
+            AIMessage(
+                content="Summary of earlier steps:\n"
+                + "\n".join(_summary_line(rest[i]) for i in sorted(folded))
+            )
+        ]
+        rest = [m for i, m in enumerate(rest) if i not in folded]
+    if count_message_tokens(head + summary + rest) <= budget:
+        return head + summary + rest
+
+    # 3. Replace file contents by manifest entries, largest files first
+    by_size = sorted(
+        (m for m in rest if _filename(m)), key=lambda m: count_tokens(str(m.content)), reverse=True
+    )
+    replaced, manifest = [], []
+    for message in by_size:
+        replaced.append(message)
+        rest = [m for m in rest if m is not message]
+        manifest = [
+            AIMessage(
+                content="Project files (source not shown):\n"
+                + "\n".join(_manifest_entry(m) for m in replaced)
+            )
+        ]
+        if count_message_tokens(head + summary + manifest + rest) <= budget:
+            break
+    return head + summary + manifest + rest
+
+
+# Compacted message history for one node's prompt, the tokens saved are recorded in the state
+def compact_for_node(state: GraphState, node: str) -> List[BaseMessage]:
+    messages = state["messages"]
+    budget = node_budget(node)
+    compacted = compact_messages(messages, budget)
+
+    stats = {
+        "node": node,
+        "budget": budget,
+        "tokens_before": count_message_tokens(messages),
+        "tokens_after": count_message_tokens(compacted),
+    }
+    stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+    state["message_compaction"] = (state.get("message_compaction") or []) + [stats]
+    print(
+        f"Message history for {node}: {stats['tokens_before']} -> {stats['tokens_after']} tokens "
+        f"({stats['tokens_saved']} saved, budget {budget})"
+    )
+    return compacted
+
+
+# One block per message, labelled with the speaker
+def format_history(messages: List[BaseMessage]) -> str:
+    return "\n\n".join(f"[{message.type}]\n{message.content}" for message in messages)
+
+
+# Compacted message history of one node's prompt as text, for the {history} variable
+def history_for_node(state: GraphState, node: str) -> str:
+    return format_history(compact_for_node(state, node))
@@ -0,0 +1,334 @@
+# agents/metrics.py
+# Process wide metrics (rendered in Prometheus text format on /metrics) and a per-run
+# timing summary returned with the job result. The run a measurement belongs to is taken
+# from a context variable, which asyncio copies into every task a graph run starts.
+import time
+import asyncio
+import hashlib
+import functools
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+
+DEFAULT_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.type = "counter"
+        self.values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(k)} {v}" for k, v in self.values.items()]
+
+
+class Gauge(Counter):
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self.type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.values[_labels(labels)] = value
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.type = "histogram"
+        self.buckets = buckets
+        # labels -> (count per bucket, sum, count)
+        self.values: Dict[Labels, Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            counts, total, count = self.values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            counts = [c + (value <= bucket) for c, bucket in zip(counts, self.buckets)]
+            self.values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in self.values.items():
+                for bucket, bucket_count in zip(self.buckets, counts):
+                    lines.append(
+                        f"{self.name}_bucket{_format_labels(key, ('le', str(bucket)))} {bucket_count}"
+                    )
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+        # Called before rendering, to refresh gauges that are read from other objects
+        self.collectors: List[Callable[[], None]] = []
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        for collect in self.collectors:
+            collect()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+node_seconds = registry.histogram("timeless_node_duration_seconds", "Wall time of a graph node")
+llm_seconds = registry.histogram("timeless_llm_duration_seconds", "Duration of an LLM call")
+llm_calls = registry.counter("timeless_llm_calls_total", "LLM calls")
+llm_tokens = registry.counter(
+    "timeless_llm_tokens_total", "LLM tokens by type (prompt/cached/completion)"
+)
+llm_retries = registry.counter(
+    "timeless_llm_retries_total", "OpenAI requests the client retried after a 429/5xx response"
+)
+docker_seconds = registry.histogram(
+    "timeless_docker_duration_seconds", "Duration of docker builds and runs by phase"
+)
+run_iterations = registry.histogram(
+    "timeless_run_iterations", "Debug iterations per graph run", buckets=(0, 1, 2, 3, 5, 10, 20)
+)
+runs_total = registry.counter("timeless_runs_total", "Finished graph runs by status")
+model_routes = registry.counter(
+    "timeless_model_routes_total", "Model routing decisions by node, tier and reason"
+)
+model_route_outcomes = registry.counter(
+    "timeless_model_route_outcomes_total",
+    "Executions after a routed LLM call by node, tier and outcome (passed/failed)",
+)
+model_route_success = registry.gauge(
+    "timeless_model_route_success_ratio",
+    "Share of routed LLM calls followed by a passing execution, by node and tier",
+)
+
+
+class RunMetrics:
+    """Timings of one graph run, returned with the job result."""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.started = time.monotonic()
+        self.nodes: List[Dict[str, Any]] = []
+        self.llm_calls: List[Dict[str, Any]] = []
+        self.docker: List[Dict[str, Any]] = []
+        self.llm_retries = 0
+
+    def summary(self) -> Dict[str, Any]:
+        per_node: Dict[str, float] = {}
+        for node in self.nodes:
+            per_node[node["node"]] = round(per_node.get(node["node"], 0) + node["seconds"], 3)
+        per_model: Dict[str, Dict[str, float]] = {}
+        for call in self.llm_calls:
+            totals = per_model.setdefault(
+                call["model"],
+                {"calls": 0, "seconds": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0},
+            )
+            totals["calls"] += 1
+            totals["seconds"] = round(totals["seconds"] + call["seconds"], 3)
+            totals["prompt_tokens"] += call["prompt_tokens"]
+            totals["cached_tokens"] += call["cached_tokens"]
+            totals["completion_tokens"] += call["completion_tokens"]
+        per_phase: Dict[str, float] = {}
+        for entry in self.docker:
+            per_phase[entry["phase"]] = round(per_phase.get(entry["phase"], 0) + entry["seconds"], 3)
+        return {
+            "total_seconds": round(time.monotonic() - self.started, 3),
+            "nodes": per_node,
+            "llm": per_model,
+            "llm_calls": self.llm_calls,
+            "llm_retries": self.llm_retries,
+            "docker": per_phase,
+            "timeline": self.nodes,
+        }
+
+
+current_run: ContextVar[Optional[RunMetrics]] = ContextVar("current_run", default=None)
+
+
+def start_run(run_id: str) -> RunMetrics:
+    run = RunMetrics(run_id)
+    current_run.set(run)
+    return run
+
+
+def finish_run(status: str, iterations: int):
+    runs_total.inc(status=status)
+    run_iterations.observe(iterations)
+    # The job worker runs the next job in the same context
+    current_run.set(None)
+
+
+def record_node(node: str, seconds: float):
+    node_seconds.observe(seconds, node=node)
+    run = current_run.get()
+    if run is not None:
+        run.nodes.append({"node": node, "seconds": round(seconds, 3)})
+
+
+def record_docker(phase: str, seconds: float):
+    docker_seconds.observe(seconds, phase=phase)
+    run = current_run.get()
+    if run is not None:
+        run.docker.append({"phase": phase, "seconds": round(seconds, 3)})
+
+
+# Wraps a graph node so its wall time is recorded, sync and async nodes alike
+def instrument_node(node: str, func: Callable) -> Callable:
+    if asyncio.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def timed_async(state):
+            started = time.monotonic()
+            try:
+                return await func(state)
+            finally:
+                record_node(node, time.monotonic() - started)
+
+        return timed_async
+
+    @functools.wraps(func)
+    def timed(state):
+        started = time.monotonic()
+        try:
+            return func(state)
+        finally:
+            record_node(node, time.monotonic() - started)
+
+    return timed
+
+
+class LLMMetricsCallback(AsyncCallbackHandler):
+    """Records duration, model name and token usage of every chat model call."""
+
+    def __init__(self):
+        self._started: Dict[Any, Tuple[float, str, Optional[str]]] = {}
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or "unknown"
+        node = (kwargs.get("metadata") or {}).get("langgraph_node")
+        self._started[run_id] = (time.monotonic(), model, node)
+
+    async def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        started, model, node = self._started.pop(run_id, (time.monotonic(), "unknown", None))
+        seconds = time.monotonic() - started
+        prompt_tokens, cached_tokens, completion_tokens = _token_usage(response)
+
+        llm_calls.inc(model=model)
+        llm_seconds.observe(seconds, model=model)
+        llm_tokens.inc(prompt_tokens, model=model, type="prompt")
+        llm_tokens.inc(cached_tokens, model=model, type="cached")
+        llm_tokens.inc(completion_tokens, model=model, type="completion")
+        run = current_run.get()
+        if run is not None:
+            run.llm_calls.append(
+                {
+                    "model": model,
+                    "node": node,
+                    "seconds": round(seconds, 3),
+                    "prompt_tokens": prompt_tokens,
+                    "cached_tokens": cached_tokens,
+                    "completion_tokens": completion_tokens,
+                }
+            )
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+
+# (prompt, cached, completion) tokens. Cached tokens are the part of the prompt the provider
+# served from its prompt prefix cache, see the prompt layout in prompts/prompts.py.
+def _token_usage(response: LLMResult) -> Tuple[int, int, int]:
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        return usage.get("prompt_tokens", 0), cached, usage.get("completion_tokens", 0)
+    # Streamed calls report usage on the message instead (cached tokens only with newer
+    # langchain-openai versions)
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                cached = (metadata.get("input_token_details") or {}).get("cache_read") or 0
+                return metadata.get("input_tokens", 0), cached, metadata.get("output_tokens", 0)
+    return 0, 0, 0
+
+
+llm_metrics_callback = LLMMetricsCallback()
+
+
+# Status and (url, body hash) of the last retryable response in this task. The OpenAI client
+# resends the same request on retry, so only a request matching it is a retry: the final
+# failed response of a call is not followed by one and is never counted.
+_retryable_response: ContextVar[Optional[Tuple[int, str, str]]] = ContextVar(
+    "retryable_response", default=None
+)
+
+
+def _request_key(request) -> Tuple[str, str]:
+    return str(request.url), hashlib.sha256(request.content).hexdigest()
+
+
+# httpx response hook: the OpenAI client retries these status codes by itself
+async def note_retryable_response(response):
+    if response.status_code in (408, 409, 429) or response.status_code >= 500:
+        _retryable_response.set((response.status_code, *_request_key(response.request)))
+
+
+# httpx request hook: counts the requests that retry an earlier attempt (attempt index > 0)
+async def count_llm_retries(request):
+    previous = _retryable_response.get()
+    if previous is None:
+        return
+    _retryable_response.set(None)
+    status, *key = previous
+    if tuple(key) == _request_key(request):
+        llm_retries.inc(status=status)
+        run = current_run.get()
+        if run is not None:
+            run.llm_retries += 1
@@ -0,0 +1,136 @@
+# agents/model_router.py
+# Picks the model of an LLM call per node instead of hard-wiring one (MODEL_ROUTING, on by
+# default). Two tiers: "fast" (OPENAI_MODEL) and "strong" (OPENAI_MODEL_CODE).
+#   - every node starts at its default tier: code generation strong, the rest fast
+#   - the strong model is used when the task is large (prompt tokens, number of files) or
+#     the error class is known to be hard for the fast model
+#   - after ROUTER_ESCALATE_AFTER failed iterations of a node the run escalates to strong
+#   - generation prompts below ROUTER_SMALL_TASK_TOKENS go to the fast model (0 = never)
+# Every decision is kept in state["route_report"]. The executor settles it: the route
+# passed when the next execution had no error. Routes recorded after the last execution
+# (readme) are settled with the outcome of the run when it ends. Success rates per node and
+# tier are exported as metrics, so the thresholds can be tuned for latency and cost.
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from schemas import GraphState
+from .common import llm, llm_code
+from .message_compaction import count_tokens
+from .metrics import model_routes, model_route_outcomes, model_route_success
+
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "true").lower() in ("1", "true", "yes")
+ROUTER_FAST_MAX_PROMPT_TOKENS = int(os.getenv("ROUTER_FAST_MAX_PROMPT_TOKENS", 12000))
+ROUTER_FAST_MAX_FILES = int(os.getenv("ROUTER_FAST_MAX_FILES", 8))
+ROUTER_ESCALATE_AFTER = int(os.getenv("ROUTER_ESCALATE_AFTER", 1))
+ROUTER_SMALL_TASK_TOKENS = int(os.getenv("ROUTER_SMALL_TASK_TOKENS", 0))
+ROUTER_STRONG_ERROR_CLASSES = {
+    name.strip()
+    for name in os.getenv(
+        "ROUTER_STRONG_ERROR_CLASSES", "RecursionError,StackOverflowError,MemoryError,OutOfMemoryError"
+    ).split(",")
+    if name.strip()
+}
+
+# Default tier of the nodes that generate code from scratch, other nodes start fast
+GENERATION_NODES = {"programmer", "planner", "file_programmer"}
+
+# Passed/failed counts per (node, tier) over the life of the process
+_outcomes: Dict[Tuple[str, str], Dict[str, int]] = {}
+_outcomes_lock = threading.Lock()
+
+
+def tier_model(tier: str):
+    # Looked up at call time: benchmarks/fake_llm.py replaces the llm / llm_code names this
+    # module imports from agents.common
+    return llm_code if tier == "strong" else llm
+
+
+def prompt_tokens(prompt) -> int:
+    if hasattr(prompt, "to_messages"):
+        return sum(count_tokens(str(message.content)) for message in prompt.to_messages())
+    return count_tokens(str(prompt))
+
+
+# Failed iterations of the node in this run, from the settled routes
+def failed_iterations(state: Optional[GraphState], node: str) -> int:
+    report = (state or {}).get("route_report") or []
+    return sum(1 for entry in report if entry["node"] == node and entry["passed"] is False)
+
+
+def choose_tier(node: str, tokens: int, file_count: int, error_class: Optional[str], failures: int):
+    default = "strong" if node in GENERATION_NODES else "fast"
+    if not MODEL_ROUTING:
+        return default, "default"
+    if default == "strong":
+        if ROUTER_SMALL_TASK_TOKENS and tokens < ROUTER_SMALL_TASK_TOKENS:
+            return "fast", "small_task"
+        return "strong", "default"
+    if failures >= ROUTER_ESCALATE_AFTER:
+        return "strong", "escalated"
+    if error_class and error_class in ROUTER_STRONG_ERROR_CLASSES:
+        return "strong", "error_class"
+    if tokens > ROUTER_FAST_MAX_PROMPT_TOKENS:
+        return "strong", "prompt_tokens"
+    if file_count > ROUTER_FAST_MAX_FILES:
+        return "strong", "file_count"
+    return "fast", "default"
+
+
+# Returns the model for the node's LLM call and records the decision in the run's state.
+# Nodes that only get a payload (file_programmer) pass a dict of their own and return the
+# recorded route; with state None the decision is counted but not settled.
+def route_model(state: Optional[GraphState], node: str, prompt, file_count: int = 0, error=None):
+    tokens = prompt_tokens(prompt)
+    error_class = getattr(error, "error_class", None)
+    failures = failed_iterations(state, node)
+    tier, reason = choose_tier(node, tokens, file_count, error_class, failures)
+
+    model = tier_model(tier)
+    model_routes.inc(node=node, tier=tier, reason=reason)
+    print(f"Model route for {node}: {tier} ({reason}, {tokens} prompt tokens, {failures} failed iterations)")
+    if state is not None:
+        state["route_report"] = (state.get("route_report") or []) + [
+            {
+                "node": node,
+                "tier": tier,
+                "model": getattr(model, "model_name", str(model)),
+                "reason": reason,
+                "prompt_tokens": tokens,
+                "file_count": file_count,
+                "error_class": error_class,
+                "passed": None,  # Settled by the executor
+            }
+        ]
+    return model
+
+
+# Called with the executor's result (or the final state of the run), returns the state
+# update that settles the open routes
+def settle_routes(state: GraphState, result: dict) -> dict:
+    report = state.get("route_report") or []
+    if not any(entry["passed"] is None for entry in report):
+        return {}
+    passed = result.get("error") is None
+    settled = []
+    for entry in report:
+        if entry["passed"] is None:
+            entry = {**entry, "passed": passed}
+            record_outcome(entry["node"], entry["tier"], passed)
+        settled.append(entry)
+    return {"route_report": settled}
+
+
+# Route report of a finished run. Routes recorded after the last execution (readme) pass
+# or fail with the outcome of the run.
+def settle_final_routes(state: GraphState) -> List[dict]:
+    update = settle_routes(state, state)
+    return update.get("route_report", state.get("route_report") or [])
+
+
+def record_outcome(node: str, tier: str, passed: bool):
+    model_route_outcomes.inc(node=node, tier=tier, outcome="passed" if passed else "failed")
+    with _outcomes_lock:
+        counts = _outcomes.setdefault((node, tier), {"passed": 0, "failed": 0})
+        counts["passed" if passed else "failed"] += 1
+        ratio = counts["passed"] / (counts["passed"] + counts["failed"])
+    model_route_success.set(round(ratio, 4), node=node, tier=tier)
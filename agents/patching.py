@@ -0,0 +1,118 @@
+# agents/patching.py
+# Applies the search/replace hunks of a CodePatch to the current content of a file.
+# Every hunk must match exactly one place in the file; a hunk that matches nowhere or in
+# several places is rejected. A patch is all or nothing: if any hunk is rejected the file
+# is left unchanged and the fixer falls back to returning the complete file.
+# A PatchSet (several files) is all or nothing as well, so a fix is never half applied.
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from schemas import CodePatch, PatchHunk, PatchSet
+
+
+@dataclass
+class PatchResult:
+    filename: str
+    code: Optional[str] = None  # Patched content, None when the patch was rejected
+    applied: List[int] = field(default_factory=list)  # Indexes of the applied hunks
+    rejected: List[Tuple[int, str]] = field(default_factory=list)  # (hunk index, reason)
+
+    @property
+    def ok(self) -> bool:
+        return self.code is not None
+
+    def report(self) -> dict:
+        return {
+            "filename": self.filename,
+            "applied": len(self.applied),
+            "rejected": [{"hunk": index, "reason": reason} for index, reason in self.rejected],
+            "fallback": not self.ok,
+        }
+
+
+def _normalize(text: str) -> str:
+    # Code fields may contain escaped newlines, see write_code_to_file_agent
+    return text.replace("\\n", "\n")
+
+
+# Start and end line of the only place the search lines match when trailing whitespace
+# is ignored, or the reason why there is no such place
+def _match_lines(lines: List[str], search: List[str]) -> Tuple[Optional[Tuple[int, int]], str]:
+    wanted = [line.rstrip() for line in search]
+    stripped = [line.rstrip() for line in lines]
+    matches = [
+        start
+        for start in range(len(lines) - len(wanted) + 1)
+        if stripped[start:start + len(wanted)] == wanted
+    ]
+    if not matches:
+        return None, "search text not found"
+    if len(matches) > 1:
+        return None, f"search text matches {len(matches)} places"
+    return (matches[0], matches[0] + len(wanted)), ""
+
+
+def apply_hunk(source: str, hunk: PatchHunk) -> Tuple[Optional[str], str]:
+    search, replace = _normalize(hunk.search), _normalize(hunk.replace)
+    if not search.strip():
+        return None, "empty search text"
+
+    count = source.count(search)
+    if count == 1:
+        return source.replace(search, replace, 1), ""
+    if count > 1:
+        return None, f"search text matches {count} places"
+
+    # LLMs often get trailing whitespace or the final newline wrong, retry line by line
+    lines = source.splitlines(keepends=True)
+    span, reason = _match_lines(lines, search.strip("\n").splitlines())
+    if span is None:
+        return None, reason
+    start, end = span
+    replacement = replace.strip("\n")
+    if replacement:
+        replacement += "\n" if lines[end - 1].endswith("\n") else ""
+    return "".join(lines[:start]) + replacement + "".join(lines[end:]), ""
+
+
+# Hunks are applied in order, each one against the result of the previous ones
+def apply_patch(source: str, patch: CodePatch) -> PatchResult:
+    result = PatchResult(filename=patch.filename)
+    patched = _normalize(source)
+    if not patch.hunks:
+        result.rejected.append((0, "no hunks"))
+        return result
+
+    for index, hunk in enumerate(patch.hunks):
+        updated, reason = apply_hunk(patched, hunk)
+        if updated is None:
+            result.rejected.append((index, reason))
+        else:
+            patched = updated
+            result.applied.append(index)
+
+    if not result.rejected:
+        result.code = patched
+    return result
+
+
+# Patches every file of the set against sources (filename -> content). Returns the new
+# content of the changed files, or None when any patch was rejected, and the per-file results.
+def apply_patch_set(
+    sources: Dict[str, str], patch_set: PatchSet
+) -> Tuple[Optional[Dict[str, str]], List[PatchResult]]:
+    patched: Dict[str, str] = {}
+    results = []
+    for patch in patch_set.patches:
+        if patch.filename not in sources:
+            result = PatchResult(filename=patch.filename)
+            result.rejected.append((0, "file was not sent in full"))
+        else:
+            # Two patches of the same file are applied one after the other
+            result = apply_patch(patched.get(patch.filename, sources[patch.filename]), patch)
+            if result.ok:
+                patched[patch.filename] = result.code
+        results.append(result)
+
+    if not results or any(not result.ok for result in results):
+        return None, results
+    return patched, results
@@ -1,5 +1,8 @@
 import os
-from .common import llm
+from .message_compaction import history_for_node
+from .model_router import route_model
+from .common import ainvoke_structured
+from .workspace import get_src_dir
 from schemas import GraphState, Documentation, Code
 from prompts.prompts import README_DEVELOPER_WRITER_AGENT_PROMPT
 from typing import List
@@ -7,18 +10,18 @@ from typing import List
 
 async def read_me_agent(state: GraphState):
     print("\n **GENERATING README & DEVELOPER FILES **")
-    structured_llm = llm.with_structured_output(Documentation)
     code_descriptions = generate_code_descriptions(state["codes"].codes)
-    prompt = README_DEVELOPER_WRITER_AGENT_PROMPT.format(
-        messages=state["messages"], code_descriptions=code_descriptions
+    prompt = README_DEVELOPER_WRITER_AGENT_PROMPT.format_prompt(
+        history=history_for_node(state, "readme"), code_descriptions=code_descriptions
     )
 
-    docs = structured_llm.invoke(prompt)
+    model = route_model(state, "readme", prompt, file_count=len(state["codes"].codes))
+    docs = await ainvoke_structured(model, Documentation, prompt)
     readme = docs.readme
     developer = docs.developer
 
     # Define directory and ensure it exists
-    base_dir = os.path.abspath("generated/src")  
+    base_dir = get_src_dir(state)
     os.makedirs(base_dir, exist_ok=True)
 
     readme_path = os.path.join(base_dir, "README.md")
@@ -0,0 +1,146 @@
+# agents/run_outcome.py
+# Helpers for deciding when a started compose project has succeeded or failed:
+# which ports it publishes, whether those ports answer, the exit codes of its containers
+# and collecting error output from the logs.
+import os
+import asyncio
+from typing import Dict, Optional
+import httpx
+import yaml
+from .docker_driver import ComposeProject, docker, run_command
+from .error_parsers import is_error_start
+from .workspace import compose_file_of
+
+# Services (projects that publish ports) must answer within this many seconds
+SERVICE_READY_TIMEOUT = float(os.getenv("SERVICE_READY_TIMEOUT", 60))
+# After a service answers it is observed this long to catch crashes right after start
+SERVICE_OBSERVATION_WINDOW = float(os.getenv("SERVICE_OBSERVATION_WINDOW", 2))
+# One-shot programs still running after this many seconds are treated as long-running
+ONE_SHOT_TIMEOUT = float(os.getenv("ONE_SHOT_TIMEOUT", 15))
+# Default readiness probe of a published port, "tcp": an accepted connection that stays open,
+# "http": any HTTP response. A service picks its own with the label timeless.readiness.
+READINESS_PROBE = os.getenv("READINESS_PROBE", "tcp").lower()
+READINESS_LABEL = "timeless.readiness"
+READINESS_PROBE_INTERVAL = 0.5
+# How long an accepted TCP connection must stay open to count as ready
+READINESS_TCP_HOLD = 0.2
+
+
+def _readiness_probe(service: dict) -> str:
+    labels = service.get("labels") or {}
+    if isinstance(labels, list):
+        # ["timeless.readiness=http", ...]
+        labels = dict(str(label).partition("=")[::2] for label in labels)
+    probe = str(labels.get(READINESS_LABEL, READINESS_PROBE)).strip().lower()
+    return probe if probe in ("tcp", "http") else READINESS_PROBE
+
+
+# Host ports published by the services of the run's compose file, with the readiness probe of each
+def published_ports(src_dir: str) -> Dict[int, str]:
+    try:
+        with open(compose_file_of(src_dir), encoding="utf-8") as f:
+            compose = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+
+    ports = {}
+    for service in (compose.get("services") or {}).values():
+        if not isinstance(service, dict):
+            continue
+        probe = _readiness_probe(service)
+        for port in service.get("ports") or []:
+            if isinstance(port, dict):
+                published = str(port.get("published", ""))
+            else:
+                # "8080", "8080:80", "127.0.0.1:8080:80", "8080:80/tcp"
+                parts = str(port).split("/")[0].split(":")
+                published = parts[-2] if len(parts) > 1 else parts[0]
+            if published.isdigit():
+                ports[int(published)] = probe
+    return ports
+
+
+async def _port_ready(port: int, probe: str = "tcp") -> bool:
+    if probe == "http":
+        try:
+            async with httpx.AsyncClient(timeout=READINESS_PROBE_INTERVAL * 2) as client:
+                await client.get(f"http://127.0.0.1:{port}/")
+            return True
+        except httpx.HTTPError:
+            return False
+
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection("127.0.0.1", port), READINESS_PROBE_INTERVAL * 2
+        )
+    except (OSError, asyncio.TimeoutError):
+        return False
+    try:
+        # docker-proxy accepts the connection before the app listens and closes it right
+        # away when the app doesn't, so the connection has to stay open (or get data)
+        return await asyncio.wait_for(reader.read(1), READINESS_TCP_HOLD) != b""
+    except asyncio.TimeoutError:
+        return True
+    except OSError:
+        return False
+    finally:
+        writer.close()
+
+
+# Returns once every port answers its probe. Runs until cancelled otherwise.
+async def wait_until_ready(ports: Dict[int, str]) -> bool:
+    pending = dict(ports)
+    while pending:
+        for port, probe in list(pending.items()):
+            if await _port_ready(port, probe):
+                print(f"Port {port} is ready ({probe})")
+                del pending[port]
+        if pending:
+            await asyncio.sleep(READINESS_PROBE_INTERVAL)
+    return True
+
+
+# Exit code of every container of the project, None for containers still running
+async def container_exit_codes(project: ComposeProject) -> Dict[str, Optional[int]]:
+    result = await run_command(project.command("ps", "-a", "-q"), cwd=project.cwd)
+    container_ids = [line.strip() for line in result.output.splitlines() if line.strip()]
+    if not result.ok or not container_ids:
+        return {}
+
+    inspect = await docker(
+        "inspect", "-f", "{{.Name}} {{.State.Status}} {{.State.ExitCode}}", *container_ids
+    )
+    exit_codes = {}
+    for line in inspect.output.splitlines():
+        parts = line.split()
+        if len(parts) != 3 or not parts[2].lstrip("-").isdigit():
+            continue
+        name, status, exit_code = parts
+        exit_codes[name.lstrip("/")] = int(exit_code) if status == "exited" else None
+    return exit_codes
+
+
+class LogCollector:
+    """Collects container output and the lines that look like an error."""
+
+    def __init__(self):
+        self.output = ""
+        self.error_capture = []
+        self.traceback_started = False
+        self.exited_with_error = False
+
+    def feed(self, line: str):
+        self.output += line
+
+        # Capture error output from the first line that starts an error (any language)
+        if self.traceback_started or is_error_start(line):
+            self.traceback_started = True
+            self.error_capture.append(line)
+
+        # The container exited after printing an error
+        if "exited with code" in line and self.error_capture:
+            self.exited_with_error = True
+
+    @property
+    def error_output(self) -> str:
+        return "".join(self.error_capture) if self.exited_with_error else ""
@@ -0,0 +1,401 @@
+# agents/runtime_pool.py
+# Pool of pre-started, resource-limited runtime containers (python, node). When the generated
+# Dockerfile is a plain "base image + install dependencies + run" template, the executor copies
+# the project into a pooled container's workspace mount and runs it with `docker exec` instead of
+# building an image and starting a fresh container. Anything else falls back to a full build.
+import os
+import re
+import json
+import posixpath
+import time
+import shlex
+import shutil
+import atexit
+import asyncio
+import hashlib
+import subprocess
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import yaml
+from .workspace import GENERATED_ROOT
+from .docker_driver import DOCKER_BIN, docker, run_command, print_line
+from .docker_image_cache import DEPENDENCY_MANIFESTS
+
+RUNTIME_POOL_ENABLED = os.getenv("RUNTIME_POOL_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+RUNTIME_POOL_IMAGES = [
+    image.strip()
+    for image in os.getenv("RUNTIME_POOL_IMAGES", "python:3.12-slim,node:lts-slim,node:alpine").split(",")
+    if image.strip()
+]
+RUNTIME_POOL_SIZE = int(os.getenv("RUNTIME_POOL_SIZE", 2))  # containers per image
+RUNTIME_POOL_IDLE_TIMEOUT = float(os.getenv("RUNTIME_POOL_IDLE_TIMEOUT", 600))
+# How the workspace is reset before a run: "dependencies" keeps the installed dependencies
+# when the manifests are unchanged, "full" empties it and installs them again every run
+RUNTIME_POOL_RESET = os.getenv("RUNTIME_POOL_RESET", "dependencies").lower()
+RUNTIME_POOL_MEMORY = os.getenv("RUNTIME_POOL_MEMORY", "512m")
+RUNTIME_POOL_CPUS = os.getenv("RUNTIME_POOL_CPUS", "1")
+
+WORKSPACE = "/app"
+# Pooled containers run as the host user, so the files they write into the workspace mount
+# can be removed on the host. HOME points to a writable folder for pip/npm caches.
+CONTAINER_USER = f"{os.getuid()}:{os.getgid()}" if hasattr(os, "getuid") else None
+PYTHON_DEPS_DIR = ".pydeps"  # pip installs go here so they can be reset with the workspace
+DEPENDENCY_DIRS = (PYTHON_DEPS_DIR, "node_modules")
+
+# RUN instructions a template may contain, everything else needs a real image build
+ALLOWED_RUN = re.compile(
+    r"^(pip3?|python3? -m pip) install\b|^npm (install|ci)\b|^(yarn|pnpm) install\b"
+)
+
+
+@dataclass
+class TemplatePlan:
+    image: str  # pooled image that replaces FROM
+    setup_commands: List[str]  # dependency installs
+    command: str  # the program itself
+    environment: Dict[str, str] = field(default_factory=dict)
+
+
+def _normalize_image(image: str):
+    # python:3.12-slim -> ("python", "3.12"), node:lts-slim -> ("node", "lts")
+    repository, _, tag = image.partition(":")
+    return repository.split("/")[-1], (tag or "latest").split("-")[0]
+
+
+def _instructions(dockerfile: str) -> List[tuple]:
+    text = re.sub(r"\\\s*\n", " ", dockerfile)
+    instructions = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        keyword, _, argument = line.partition(" ")
+        instructions.append((keyword.upper(), argument.strip()))
+    return instructions
+
+
+def _command_from(argument) -> str:
+    # Exec form ["node", "index.js"] or shell form
+    if isinstance(argument, list):
+        return " ".join(shlex.quote(str(part)) for part in argument)
+    try:
+        parsed = json.loads(argument)
+        if isinstance(parsed, list):
+            return " ".join(shlex.quote(str(part)) for part in parsed)
+    except ValueError:
+        pass
+    return str(argument)
+
+
+def _setup_command(command: str) -> str:
+    # Keep pip installs inside the workspace instead of the container's site-packages
+    if re.match(r"^(pip3?|python3? -m pip) install\b", command):
+        return f"{command} --target {WORKSPACE}/{PYTHON_DEPS_DIR}"
+    return command
+
+
+# Returns how to run the project in a pooled container, None if it needs a real build
+def match_template(src_dir: str) -> Optional[TemplatePlan]:
+    try:
+        with open(os.path.join(src_dir, "Dockerfile"), encoding="utf-8") as f:
+            instructions = _instructions(f.read())
+        with open(os.path.join(src_dir, "compose.yaml"), encoding="utf-8") as f:
+            compose = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError):
+        return None
+
+    services = compose.get("services") or {}
+    if len(services) != 1:
+        return None
+    service = next(iter(services.values()))
+    # Pooled containers can't publish ports, services need their own container
+    if not isinstance(service, dict) or service.get("ports") or "build" not in service:
+        return None
+
+    # Pooled containers mount the project at /app and run every command there
+    if service.get("working_dir") not in (None, WORKSPACE):
+        return None
+
+    image = None
+    setup_commands = []
+    command = None
+    entrypoint = None
+    environment = {}
+    workdir = "/"
+    for keyword, argument in instructions:
+        if keyword == "FROM":
+            if image is not None or " as " in argument.lower():
+                return None  # multi-stage builds are not a template
+            image = next(
+                (
+                    pooled
+                    for pooled in RUNTIME_POOL_IMAGES
+                    if _normalize_image(pooled) == _normalize_image(argument)
+                ),
+                None,
+            )
+            if image is None:
+                return None
+        elif keyword == "WORKDIR":
+            workdir = posixpath.normpath(posixpath.join(workdir, argument.strip("\"'")))
+        elif keyword in ("EXPOSE", "LABEL"):
+            continue
+        elif keyword in ("COPY", "ADD"):
+            # Only copies of the build context into the working directory
+            destination = posixpath.normpath(posixpath.join(workdir, argument.split()[-1]))
+            if "--from" in argument or not (
+                destination == WORKSPACE or destination.startswith(f"{WORKSPACE}/")
+            ):
+                return None
+        elif keyword == "RUN":
+            for part in argument.split("&&"):
+                part = part.strip()
+                if not ALLOWED_RUN.match(part):
+                    return None
+                setup_commands.append(_setup_command(part))
+        elif keyword == "ENV":
+            for key, value in re.findall(r'(\w+)[= ]"?([^"\s]*)"?', argument):
+                environment[key] = value
+        elif keyword == "CMD":
+            command = _command_from(argument)
+        elif keyword == "ENTRYPOINT":
+            entrypoint = _command_from(argument)
+        else:
+            return None
+
+    if service.get("command"):
+        command = _command_from(service["command"])
+    if entrypoint:
+        command = f"{entrypoint} {command or ''}".strip()
+    # Relative paths in the command and the RUN steps are relative to WORKDIR
+    if image is None or not command or workdir != WORKSPACE:
+        return None
+
+    service_environment = service.get("environment") or {}
+    if isinstance(service_environment, list):
+        service_environment = dict(item.split("=", 1) for item in service_environment if "=" in item)
+    environment.update({key: str(value) for key, value in service_environment.items()})
+    # The installed dependencies go after any PYTHONPATH of the project
+    environment["PYTHONPATH"] = ":".join(
+        path for path in (environment.get("PYTHONPATH"), f"{WORKSPACE}/{PYTHON_DEPS_DIR}") if path
+    )
+    return TemplatePlan(image, setup_commands, command, environment)
+
+
+def _dependency_hash(src_dir: str, plan: TemplatePlan) -> str:
+    digest = hashlib.sha256(plan.image.encode("utf-8"))
+    digest.update("\n".join(plan.setup_commands).encode("utf-8"))
+    for name in sorted(os.listdir(src_dir)):
+        if name in DEPENDENCY_MANIFESTS:
+            with open(os.path.join(src_dir, name), "rb") as f:
+                digest.update(name.encode("utf-8") + f.read())
+    return digest.hexdigest()
+
+
+@dataclass
+class PooledContainer:
+    name: str
+    image: str
+    host_dir: str
+    last_used: float = field(default_factory=time.time)
+    busy: bool = False
+    dependency_hash: Optional[str] = None  # dependencies currently installed in the workspace
+
+
+@dataclass
+class PoolRunResult:
+    setup_ok: bool
+    exit_code: Optional[int]  # None when the program was still running at the deadline
+    output: str
+
+
+class RuntimePool:
+    def __init__(
+        self, images: List[str], size: int, idle_timeout: float, reset: str = RUNTIME_POOL_RESET
+    ):
+        self.images = images
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.keep_dependencies = reset != "full"
+        # Idle containers are also removed when no run acquires one
+        self.sweep_interval = min(idle_timeout, 60)
+        self._sweeper: Optional[asyncio.Task] = None
+        self.root = os.path.join(GENERATED_ROOT, ".runtime_pool")
+        self._containers: Dict[str, List[PooledContainer]] = {image: [] for image in images}
+        self._lock = asyncio.Lock()
+        # Slots reserved per runtime for containers that are being started
+        self._starting: Dict[str, int] = {}
+        self._counter = 0
+
+    async def _start_container(self, image: str) -> Optional[PooledContainer]:
+        self._counter += 1
+        slug = re.sub(r"[^a-z0-9]+", "-", image.lower())
+        name = f"timeless-pool-{slug}-{os.getpid()}-{self._counter}"
+        host_dir = os.path.join(self.root, name)
+        os.makedirs(host_dir, exist_ok=True)
+        user_args = ["--user", CONTAINER_USER, "-e", "HOME=/tmp"] if CONTAINER_USER else []
+        result = await docker(
+            "run", "-d", "--rm",
+            "--name", name,
+            "--memory", RUNTIME_POOL_MEMORY,
+            "--cpus", RUNTIME_POOL_CPUS,
+            "-v", f"{host_dir}:{WORKSPACE}",
+            "-w", WORKSPACE,
+            *user_args,
+            image,
+            "sleep", "infinity",
+            timeout=600,  # may have to pull the image
+        )
+        if not result.ok:
+            print(f"Could not start pooled container for {image}: {result.output}")
+            shutil.rmtree(host_dir, ignore_errors=True)
+            return None
+        return PooledContainer(name=name, image=image, host_dir=host_dir)
+
+    async def _remove_container(self, container: PooledContainer):
+        await docker("rm", "-f", container.name)
+        shutil.rmtree(container.host_dir, ignore_errors=True)
+
+    # Pre-start the configured number of containers for every runtime and the idle sweep
+    async def warm_up(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_idle())
+        for image in self.images:
+            while len(self._containers[image]) < self.size:
+                container = await self._start_container(image)
+                if container is None:
+                    break
+                self._containers[image].append(container)
+        print(f"Runtime pool ready: { {image: len(c) for image, c in self._containers.items()} }")
+
+    async def _sweep_idle(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            async with self._lock:
+                evicted = self._evict_idle()
+            for container in evicted:
+                await self._remove_container(container)
+
+    # Takes the idle containers out of the pool, the caller removes them (outside the lock)
+    def _evict_idle(self) -> List[PooledContainer]:
+        now = time.time()
+        evicted = []
+        for image, containers in self._containers.items():
+            for container in list(containers):
+                if not container.busy and now - container.last_used > self.idle_timeout:
+                    print(f"Evicting idle pooled container {container.name}")
+                    containers.remove(container)
+                    evicted.append(container)
+        return evicted
+
+    # The lock is only held to pick or reserve a slot, starting a container (which may pull
+    # the image) happens outside it so runs on other runtimes are not held up
+    async def acquire(self, image: str) -> Optional[PooledContainer]:
+        reserved = False
+        async with self._lock:
+            evicted = self._evict_idle()
+            containers = self._containers.setdefault(image, [])
+            container = next((c for c in containers if not c.busy), None)
+            if container is not None:
+                container.busy = True
+            elif len(containers) + self._starting.get(image, 0) < self.size:
+                self._starting[image] = self._starting.get(image, 0) + 1
+                reserved = True
+        for old in evicted:
+            await self._remove_container(old)
+        if not reserved:
+            return container
+
+        try:
+            container = await self._start_container(image)
+        finally:
+            async with self._lock:
+                self._starting[image] -= 1
+                if container is not None:
+                    container.busy = True
+                    containers.append(container)
+        return container
+
+    # Empty the workspace before a run (dependencies may be kept)
+    async def _reset(self, container: PooledContainer, keep_dependencies: bool):
+        keep = "".join(f" ! -name {name}" for name in DEPENDENCY_DIRS) if keep_dependencies else ""
+        await docker(
+            "exec", container.name, "sh", "-c",
+            f"find {WORKSPACE} -mindepth 1 -maxdepth 1{keep} -exec rm -rf {{}} +",
+        )
+        if not keep_dependencies:
+            container.dependency_hash = None
+
+    # Kill everything the run started, its files are removed by the next run's reset
+    async def release(self, container: PooledContainer):
+        await docker("exec", container.name, "sh", "-c", "kill -9 -1 2>/dev/null; true")
+        container.busy = False
+        container.last_used = time.time()
+
+    async def run(self, plan: TemplatePlan, src_dir: str, timeout: float) -> Optional[PoolRunResult]:
+        container = await self.acquire(plan.image)
+        if container is None:
+            return None  # pool is busy or the runtime could not be started
+        print(f"Running in pooled container {container.name} ({plan.image})")
+        try:
+            dependency_hash = _dependency_hash(src_dir, plan)
+            keep_dependencies = (
+                self.keep_dependencies and dependency_hash == container.dependency_hash
+            )
+            await self._reset(container, keep_dependencies=keep_dependencies)
+            await asyncio.to_thread(
+                shutil.copytree,
+                src_dir,
+                container.host_dir,
+                dirs_exist_ok=True,
+                ignore=shutil.ignore_patterns("ui", "node_modules", PYTHON_DEPS_DIR),
+            )
+
+            env_args = []
+            for key, value in plan.environment.items():
+                env_args += ["-e", f"{key}={value}"]
+            exec_command = DOCKER_BIN + ["exec", "-w", WORKSPACE] + env_args + [container.name]
+
+            output = ""
+            if plan.setup_commands and not keep_dependencies:
+                setup = await run_command(
+                    exec_command + ["sh", "-c", " && ".join(plan.setup_commands)],
+                    timeout=600,
+                    on_line=print_line,
+                )
+                output += setup.output
+                if not setup.ok:
+                    return PoolRunResult(setup_ok=False, exit_code=setup.returncode, output=output)
+                container.dependency_hash = dependency_hash
+            elif plan.setup_commands:
+                print("Dependencies unchanged, skipping install")
+
+            result = await run_command(
+                exec_command + ["sh", "-c", plan.command], timeout=timeout, on_line=print_line
+            )
+            output += result.output
+            return PoolRunResult(
+                setup_ok=True,
+                exit_code=None if result.timed_out else result.returncode,
+                output=output,
+            )
+        finally:
+            await asyncio.shield(self.release(container))
+
+    # Synchronous cleanup when the process exits
+    def shutdown(self):
+        for containers in self._containers.values():
+            for container in containers:
+                subprocess.run(DOCKER_BIN + ["rm", "-f", container.name], capture_output=True)
+                shutil.rmtree(container.host_dir, ignore_errors=True)
+
+
+# Shared pool for all runs in this process, None when disabled
+runtime_pool = None
+if RUNTIME_POOL_ENABLED:
+    runtime_pool = RuntimePool(RUNTIME_POOL_IMAGES, RUNTIME_POOL_SIZE, RUNTIME_POOL_IDLE_TIMEOUT)
+    atexit.register(runtime_pool.shutdown)
@@ -0,0 +1,220 @@
+# agents/speculative_fix_agent.py
+# Opt-in replacement of debug_code (SPECULATIVE_FIXES=K, K > 1): the fixer generates K
+# candidate fixes concurrently, each with its own temperature/model. The candidates are
+# variants of the model the router picks for debug_code, so escalation still applies. Every candidate is
+# built and run in its own copy of the workspace (generated/<run_id>-cand<i>) with its own
+# compose project and container names. The first candidate that runs without errors is
+# promoted to the run's workspace and the others are cancelled. The executor then reuses
+# the candidate's outcome instead of building the same files again.
+import os
+import re
+import time
+import shutil
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from schemas import GraphState, Code
+from .model_router import route_model
+from .docker_driver import ComposeProject, docker, run_command, print_line
+from .docker_image_cache import built_service_images
+from .docker_execution_agent import execute_project
+from .debug_code_execution_agent import fix_context, generate_fix, apply_fix
+from .workspace import (
+    get_src_dir,
+    get_workspace_dir,
+    ensure_workspace,
+    compose_file_of,
+    compose_project_name,
+    snapshot_hashes,
+    write_files_atomically,
+    write_compose_files,
+)
+
+# Number of candidate fixes per debug pass, 0 or 1 disables speculative fixing
+SPECULATIVE_FIXES = int(os.getenv("SPECULATIVE_FIXES", 0))
+# Temperatures and models of the candidates, cycled when there are more candidates.
+# The models replace the routed fast model, a route escalated to the strong model keeps it.
+SPECULATIVE_FIX_TEMPERATURES = [
+    float(t) for t in os.getenv("SPECULATIVE_FIX_TEMPERATURES", "0,0.6,1.0").split(",") if t.strip()
+]
+SPECULATIVE_FIX_MODELS = [
+    m.strip() for m in os.getenv("SPECULATIVE_FIX_MODELS", "").split(",") if m.strip()
+]
+
+
+@dataclass
+class Candidate:
+    index: int
+    run_id: str
+    model: object
+    updates: List[Code] = field(default_factory=list)
+    patch_report: List[dict] = field(default_factory=list)
+    result: Optional[dict] = None  # What the executor returned for the candidate's files
+    started_docker: bool = False
+
+    @property
+    def passed(self) -> bool:
+        return self.result is not None and self.result.get("error") is None
+
+
+# Copies of the routed model with other temperatures/models, created once per base model
+_candidate_models: Dict[Tuple[int, float, str], object] = {}
+
+
+def candidate_model(index: int, base, tier: str = "fast"):
+    temperature = SPECULATIVE_FIX_TEMPERATURES[index % len(SPECULATIVE_FIX_TEMPERATURES)]
+    update = {"temperature": temperature}
+    if SPECULATIVE_FIX_MODELS and tier != "strong":
+        update["model_name"] = SPECULATIVE_FIX_MODELS[index % len(SPECULATIVE_FIX_MODELS)]
+    key = (id(base), temperature, update.get("model_name", ""))
+    if key not in _candidate_models:
+        # copy() would drop the fields excluded from serialization (callbacks, ...)
+        values = {name: getattr(base, name) for name in type(base).__fields__}
+        # The base model is kept in the value so its id can't be reused by another object
+        _candidate_models[key] = (base, type(base)(**{**values, **update}))
+    return _candidate_models[key][1]
+
+
+# Copy of the run's workspace for one candidate. The candidate gets its own run-scoped
+# compose file (see scope_compose_file): container and image names end with the candidate's
+# id and the published host ports are its own, the candidates run at the same time.
+def clone_workspace(state: GraphState, candidate_id: str) -> str:
+    src_dir = get_src_dir(state)
+    candidate_src = ensure_workspace(candidate_id)
+    shutil.copytree(src_dir, candidate_src, dirs_exist_ok=True, ignore=shutil.ignore_patterns("ui"))
+    compose_path = os.path.join(candidate_src, "compose.yaml")
+    if os.path.exists(compose_path):
+        with open(compose_path, encoding="utf-8") as f:
+            compose = f.read()
+        write_compose_files(candidate_src, compose, candidate_id)
+    return candidate_src
+
+
+async def run_candidate(state: GraphState, candidate: Candidate, full_files, original_code):
+    candidate.updates, candidate.patch_report = await generate_fix(
+        state["codes"].codes, full_files, original_code, state["error"], candidate.model,
+        use_cache=False,  # The candidates must not all get the same cached answer
+    )
+    if not candidate.updates:
+        return candidate
+
+    candidate_src = await asyncio.to_thread(clone_workspace, state, candidate.run_id)
+    write_files_atomically(
+        candidate_src, {code.filename: code.code.replace("\\n", "\n") for code in candidate.updates}
+    )
+    candidate_state = {
+        **state,
+        "run_id": candidate.run_id,
+        "docker_container_name": re.sub(
+            rf"-{re.escape(state['run_id'])}$", f"-{candidate.run_id}", state["docker_container_name"]
+        ),
+        "build_hashes": None,  # The candidate project has no images yet
+        "build_report": [],
+        "validated_run": None,
+    }
+    candidate.started_docker = True
+    print(f"Running fix candidate {candidate.index} ({', '.join(c.filename for c in candidate.updates)})")
+    candidate.result = await execute_project(candidate_state)
+    return candidate
+
+
+# Stops the candidates' containers, removes the images they built and their workspaces.
+# Runs in the background. `down --rmi local` would keep the images, they have the explicit
+# names given by clone_workspace; pulled images are shared and are not removed.
+async def cleanup_candidates(candidates: List[Candidate]):
+    for candidate in candidates:
+        workspace_dir = get_workspace_dir(candidate.run_id)
+        src_dir = os.path.join(workspace_dir, "src")
+        if candidate.started_docker and os.path.exists(os.path.join(src_dir, "compose.yaml")):
+            project = ComposeProject(
+                compose_project_name({"run_id": candidate.run_id}), src_dir, compose_file_of(src_dir)
+            )
+            await run_command(
+                project.command("down", "--remove-orphans"), cwd=src_dir, on_line=print_line
+            )
+            images = built_service_images(src_dir, project.project_name)
+            if images:
+                await docker("image", "rm", *images.values())
+        await asyncio.to_thread(shutil.rmtree, workspace_dir, True)
+
+
+# Background cleanups are kept referenced until they are done
+_cleanup_tasks = set()
+
+
+async def speculative_debug_code_agent(state: GraphState):
+    print(f"\n **SPECULATIVE DEBUG CODE AGENT ({SPECULATIVE_FIXES} candidates)**")
+    started = time.monotonic()
+    full_files, original_code = fix_context(state)
+    # One route for the pass, the executor settles it with the promoted candidate's outcome.
+    # It names the model the promoted candidate ran on, which may be a SPECULATIVE_FIX_MODELS one.
+    base = route_model(
+        state,
+        "debug_code",
+        f"{original_code}\n{state['error']}",
+        file_count=len(full_files),
+        error=state["error"],
+    )
+    route = state["route_report"][-1]
+    tier = route["tier"]
+    candidates = [
+        Candidate(index=i, run_id=f"{state['run_id']}-cand{i}", model=candidate_model(i, base, tier))
+        for i in range(SPECULATIVE_FIXES)
+    ]
+    tasks = [
+        asyncio.create_task(run_candidate(state, candidate, full_files, original_code))
+        for candidate in candidates
+    ]
+
+    # First passing candidate wins, the others are cancelled
+    winner = None
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                candidate = await next_done
+            except Exception as e:
+                print(f"Fix candidate failed: {e}")
+                continue
+            if candidate.passed:
+                winner = candidate
+                break
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        cleanup = asyncio.create_task(cleanup_candidates(candidates))
+        _cleanup_tasks.add(cleanup)
+        cleanup.add_done_callback(_cleanup_tasks.discard)
+
+    # Without a passing candidate the lowest temperature one continues the debug loop
+    if winner is None:
+        winner = next((c for c in candidates if c.updates and c.result is not None), None)
+    state["iterations"] += 1
+    state["speculative_report"] = (state.get("speculative_report") or []) + [
+        {
+            "iteration": state["iterations"],
+            "candidates": len(candidates),
+            "winner": winner.index if winner else None,
+            "passed": bool(winner and winner.passed),
+            "seconds": round(time.monotonic() - started, 3),
+        }
+    ]
+    if winner is None:
+        route["model"] = ",".join(dict.fromkeys(c.model.model_name for c in candidates))
+        print("No fix candidate produced files that could be run")
+        return state
+    route["model"] = winner.model.model_name
+
+    print(f"Promoting fix candidate {winner.index} ({'passed' if winner.passed else 'failed'})")
+    state["patch_report"] = (state.get("patch_report") or []) + winner.patch_report
+    apply_fix(state, winner.updates)
+    state["validated_run"] = {
+        "hashes": snapshot_hashes(get_src_dir(state)),
+        "result": {
+            key: value
+            for key, value in winner.result.items()
+            if key in ("error", "docker_output")
+        },
+    }
+    return state
@@ -0,0 +1,327 @@
+# agents/symbol_index.py
+# Symbol index of the generated project: function/class spans, the names each of them calls
+# and the imports of every file (Python with `ast`, JavaScript/TypeScript with a small
+# brace-matching parser). Given the file and line of an error it assembles a minimal context
+# for the fixer: the failing function, its callers and the definitions it imports.
+# The index is a plain dict so it can be kept in the graph state:
+#   {filename: {"language": ..., "symbols": [{"name", "kind", "start", "end", "calls"}],
+#               "imports": [{"module", "source", "names", "aliases"}]}}
+# "names" are the imported definitions (empty when the whole module is bound to one name),
+# "aliases" maps the local names of renamed imports to them.
+import os
+import re
+import ast
+from typing import Dict, List, Optional, Tuple
+from schemas import Code
+
+# Upper limit for the lines of related code sent with the failing file
+FIX_CONTEXT_MAX_LINES = int(os.getenv("FIX_CONTEXT_MAX_LINES", 300))
+
+PYTHON_EXTENSIONS = (".py",)
+JS_EXTENSIONS = (".js", ".mjs", ".cjs", ".jsx", ".ts", ".tsx")
+JS_KEYWORDS = {
+    "if", "for", "while", "switch", "catch", "function", "return", "typeof", "new",
+    "await", "super", "constructor", "else", "do", "try", "with", "import", "require",
+}
+
+
+# Python
+
+
+def _python_calls(node: ast.AST) -> List[str]:
+    calls = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Call):
+            if isinstance(child.func, ast.Name):
+                calls.add(child.func.id)
+            elif isinstance(child.func, ast.Attribute):
+                calls.add(child.func.attr)
+    return sorted(calls)
+
+
+def _python_module_source(module: str, level: int, filename: str, files: List[str]) -> Optional[str]:
+    if level:
+        base = os.path.dirname(filename)
+        for _ in range(level - 1):
+            base = os.path.dirname(base)
+    else:
+        base = ""
+    path = os.path.join(base, *module.split(".")) if module else base
+    for candidate in (f"{path}.py", os.path.join(path, "__init__.py")):
+        candidate = os.path.normpath(candidate).replace(os.sep, "/")
+        if candidate in files:
+            return candidate
+    return None
+
+
+def index_python(filename: str, source: str, files: List[str]) -> dict:
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return {"language": "python", "symbols": [], "imports": []}
+
+    symbols = []
+
+    def visit(node, prefix=""):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                kind = "class" if isinstance(child, ast.ClassDef) else "function"
+                start = min([child.lineno] + [d.lineno for d in child.decorator_list])
+                symbols.append(
+                    {
+                        "name": f"{prefix}{child.name}",
+                        "kind": kind,
+                        "start": start,
+                        "end": child.end_lineno,
+                        "calls": _python_calls(child),
+                    }
+                )
+                visit(child, prefix=f"{prefix}{child.name}.")
+
+    visit(tree)
+
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.append(
+                    {
+                        "module": alias.name,
+                        "source": _python_module_source(alias.name, 0, filename, files),
+                        "names": [],
+                        "aliases": {},
+                    }
+                )
+        elif isinstance(node, ast.ImportFrom):
+            imports.append(
+                {
+                    "module": node.module or "",
+                    "source": _python_module_source(node.module or "", node.level, filename, files),
+                    "names": [alias.name for alias in node.names],
+                    "aliases": {alias.asname: alias.name for alias in node.names if alias.asname},
+                }
+            )
+    return {"language": "python", "symbols": symbols, "imports": imports}
+
+
+# JavaScript / TypeScript
+
+
+def _strip_js_line(line: str) -> str:
+    line = re.sub(r"(['\"`])(?:\\.|(?!\1).)*\1", '""', line)
+    return line.split("//")[0]
+
+
+def _block_end(lines: List[str], start: int) -> int:
+    depth, opened = 0, False
+    for index in range(start, len(lines)):
+        for char in _strip_js_line(lines[index]):
+            if char == "{":
+                depth += 1
+                opened = True
+            elif char == "}":
+                depth -= 1
+        if opened and depth <= 0:
+            return index
+        # Arrow function without a body block ends on its own line
+        if not opened and index == start and "=>" in lines[index] and "{" not in lines[index]:
+            return index
+    return len(lines) - 1
+
+
+JS_DECLARATIONS = [
+    (
+        "function",
+        re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(\w+)\s*\("),
+    ),
+    ("class", re.compile(r"^\s*(?:export\s+)?(?:default\s+)?class\s+(\w+)")),
+    (
+        "function",
+        re.compile(
+            r"^\s*(?:export\s+)?(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s+)?"
+            r"(?:function\b|\([^)]*\)\s*=>|\w+\s*=>)"
+        ),
+    ),
+]
+JS_METHOD = re.compile(r"^\s+(?:async\s+)?(?:static\s+)?(?:get\s+|set\s+)?(\w+)\s*\([^)]*\)\s*\{")
+
+
+def _js_module_source(module: str, filename: str, files: List[str]) -> Optional[str]:
+    if not module.startswith("."):
+        return None
+    path = os.path.normpath(os.path.join(os.path.dirname(filename), module)).replace(os.sep, "/")
+    candidates = [path] + [path + ext for ext in JS_EXTENSIONS]
+    candidates += [f"{path}/index{ext}" for ext in JS_EXTENSIONS]
+    return next((c for c in candidates if c in files), None)
+
+
+def index_javascript(filename: str, source: str, files: List[str]) -> dict:
+    lines = source.splitlines()
+    symbols = []
+    classes: List[Tuple[str, int]] = []  # (name, end line index)
+
+    for index, line in enumerate(lines):
+        classes = [(name, end) for name, end in classes if end >= index]
+        kind, name, is_method = None, None, False
+        for declaration_kind, pattern in JS_DECLARATIONS:
+            match = pattern.match(line)
+            if match:
+                kind, name = declaration_kind, match.group(1)
+                break
+        else:
+            match = JS_METHOD.match(line)
+            if match and classes and match.group(1) not in JS_KEYWORDS - {"constructor"}:
+                kind, name, is_method = "function", match.group(1), True
+        if kind is None:
+            continue
+
+        end = _block_end(lines, index)
+        body = "\n".join(_strip_js_line(l) for l in lines[index:end + 1])
+        calls = sorted(set(re.findall(r"\b(\w+)\s*\(", body)) - JS_KEYWORDS - {name})
+        symbols.append(
+            {
+                "name": f"{classes[-1][0]}.{name}" if is_method else name,
+                "kind": kind,
+                "start": index + 1,
+                "end": end + 1,
+                "calls": calls,
+            }
+        )
+        if kind == "class":
+            classes.append((name, end))
+
+    imports = []
+    for match in re.finditer(r"^\s*import\s+(.+?)\s+from\s+['\"]([^'\"]+)['\"]", source, re.MULTILINE):
+        imports.append(_js_import(match.group(2), match.group(1), filename, files))
+    for match in re.finditer(
+        r"(?:const|let|var)\s+(.+?)\s*=\s*require\(\s*['\"]([^'\"]+)['\"]\s*\)", source
+    ):
+        imports.append(_js_import(match.group(2), match.group(1), filename, files))
+    return {"language": "javascript", "symbols": symbols, "imports": imports}
+
+
+def _js_import(module: str, clause: str, filename: str, files: List[str]) -> dict:
+    # "x", "{ a, b as c }", "x, { a }", "* as x", "{ a, b: c }" (require)
+    names, aliases = [], {}
+    braces = re.search(r"\{(.*)\}", clause)
+    # A default or namespace binding holds the whole module, its members are called as x.a()
+    if braces and not re.sub(r"\{.*\}", "", clause).strip(" ,"):
+        for name, local in re.findall(r"(\w+)(?:\s*(?:\bas\b|:)\s*(\w+))?", braces.group(1)):
+            names.append(name)
+            if local:
+                aliases[local] = name
+    return {
+        "module": module,
+        "source": _js_module_source(module, filename, files),
+        "names": names,
+        "aliases": aliases,
+    }
+
+
+# Index
+
+
+def build_symbol_index(codes: List[Code]) -> Dict[str, dict]:
+    files = [code.filename for code in codes]
+    index = {}
+    for code in codes:
+        index_file(index, code.filename, code.code, files)
+    return index
+
+
+# (Re)indexes one file, e.g. after the fixer rewrote it
+def index_file(
+    index: Dict[str, dict], filename: str, source: str, files: Optional[List[str]] = None
+):
+    files = files if files is not None else list(index) + [filename]
+    source = source.replace("\\n", "\n")
+    if filename.endswith(PYTHON_EXTENSIONS):
+        index[filename] = index_python(filename, source, files)
+    elif filename.endswith(JS_EXTENSIONS):
+        index[filename] = index_javascript(filename, source, files)
+
+
+def enclosing_symbol(index: Dict[str, dict], filename: str, line: Optional[int]) -> Optional[dict]:
+    if line is None or filename not in index:
+        return None
+    containing = [
+        s
+        for s in index[filename]["symbols"]
+        if s["kind"] == "function" and s["start"] <= line <= s["end"]
+    ]
+    return min(containing, key=lambda s: s["end"] - s["start"], default=None)
+
+
+def _short_name(name: str) -> str:
+    return name.rsplit(".", 1)[-1]
+
+
+# (file, symbol) pairs the fixer needs to see besides the failing file
+def related_symbols(
+    index: Dict[str, dict], filename: str, line: Optional[int], frames=()
+) -> List[Tuple[str, dict]]:
+    related: List[Tuple[str, dict]] = []
+    failing = enclosing_symbol(index, filename, line)
+    file_index = index.get(filename, {"symbols": [], "imports": []})
+    used = set(failing["calls"]) if failing else {c for s in file_index["symbols"] for c in s["calls"]}
+
+    # Definitions the failing code imports from other project files
+    for entry in file_index["imports"]:
+        source = entry["source"]
+        if not source or source == filename or source not in index:
+            continue
+        # Calls use the local name of a renamed import
+        called = {entry.get("aliases", {}).get(name, name) for name in used}
+        wanted = set(entry["names"]) & called if entry["names"] else called
+        for symbol in index[source]["symbols"]:
+            if _short_name(symbol["name"]) in wanted or symbol["name"] in wanted:
+                related.append((source, symbol))
+
+    # Callers of the failing function in other files
+    if failing:
+        name = _short_name(failing["name"])
+        for other, other_index in index.items():
+            if other == filename:
+                continue
+            for symbol in other_index["symbols"]:
+                if symbol["kind"] == "function" and name in symbol["calls"]:
+                    related.append((other, symbol))
+
+    # Functions of the outer stack frames
+    for frame in frames:
+        if frame.file != filename:
+            symbol = enclosing_symbol(index, frame.file, frame.line)
+            if symbol:
+                related.append((frame.file, symbol))
+
+    unique, seen = [], set()
+    for other, symbol in related:
+        key = (other, symbol["start"], symbol["end"])
+        if key not in seen:
+            seen.add(key)
+            unique.append((other, symbol))
+    return unique
+
+
+# Source of the related functions, grouped by file, within FIX_CONTEXT_MAX_LINES
+def build_fix_context(
+    index: Dict[str, dict],
+    codes: List[Code],
+    filename: str,
+    line: Optional[int],
+    frames=(),
+    full_files=(),
+) -> str:
+    sources = {code.filename: code.code.replace("\\n", "\n").splitlines() for code in codes}
+    parts, total = [], 0
+    for other, symbol in related_symbols(index, filename, line, frames):
+        if other in full_files:
+            continue  # already sent in full
+        lines = sources.get(other, [])[symbol["start"] - 1:symbol["end"]]
+        if not lines or total + len(lines) > FIX_CONTEXT_MAX_LINES:
+            continue
+        total += len(lines)
+        parts.append(
+            f"# {other}, lines {symbol['start']}-{symbol['end']} ({symbol['name']})\n" + "\n".join(lines)
+        )
+    return "\n\n".join(parts)
@@ -0,0 +1,92 @@
+# agents/test_archive.py
+import os
+import shutil
+import zipfile
+import pytest
+from . import archive as archive_module
+from .archive import build_project_archive
+
+PROJECT = {
+    "main.py": "from app.calc import add\nprint(add(1, 2))\n",
+    "app/calc.py": "def add(a, b):\n    return a + b\n",
+    "app/__init__.py": "",
+    "requirements.txt": "flask==3.1.0\n",
+    "Dockerfile": "FROM python:3.12-slim\nCOPY . .\n",
+}
+EXCLUDED = {
+    "ui/app.py": "import gradio\n",
+    "build/lib/calc.py": "stale\n",
+    "dist/app.whl": "binary\n",
+    "__pycache__/main.cpython-312.pyc": "bytecode\n",
+    "app/__pycache__/calc.cpython-312.pyc": "bytecode\n",
+    "node_modules/left-pad/index.js": "module.exports = 1\n",
+    ".pytest_cache/v/cache/lastfailed": "{}\n",
+    "app/calc.pyc": "bytecode\n",
+    "main.py.tmp": "partial write\n",
+}
+
+
+@pytest.fixture
+def workspaces(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive_module, "get_workspace_dir", lambda run_id: str(tmp_path / run_id))
+    return tmp_path
+
+
+def write_project(src_dir, files: dict, mtime: float):
+    for path, content in files.items():
+        full_path = src_dir / path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        full_path.write_text(content)
+        os.utime(full_path, (mtime, mtime))
+
+
+def read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_archive_is_deterministic(workspaces):
+    # Same files written at other times and in another order give the same bytes and hash
+    write_project(workspaces / "run1" / "src", {**PROJECT, **EXCLUDED}, mtime=1_700_000_000)
+    reversed_project = dict(reversed(list({**PROJECT, **EXCLUDED}.items())))
+    write_project(workspaces / "run2" / "src", reversed_project, mtime=1_800_000_000)
+
+    first_hash, first_path = build_project_archive("run1")
+    second_hash, second_path = build_project_archive("run2")
+    assert first_hash == second_hash
+    assert os.path.basename(first_path) == f"{first_hash}.zip"
+    assert read_bytes(first_path) == read_bytes(second_path)
+
+    # Building again from scratch gives the same bytes too
+    original = read_bytes(first_path)
+    shutil.rmtree(os.path.dirname(first_path))
+    assert build_project_archive("run1") == (first_hash, first_path)
+    assert read_bytes(first_path) == original
+
+
+def test_archive_excludes_ui_build_and_cache_dirs(workspaces):
+    write_project(workspaces / "run1" / "src", {**PROJECT, **EXCLUDED}, mtime=1_700_000_000)
+    _, path = build_project_archive("run1")
+    with zipfile.ZipFile(path) as zf:
+        assert zf.namelist() == sorted(PROJECT)
+        assert zf.read("app/calc.py").decode() == PROJECT["app/calc.py"]
+        assert {info.date_time for info in zf.infolist()} == {archive_module.ZIP_DATE_TIME}
+
+
+def test_excluded_files_do_not_change_the_hash(workspaces):
+    write_project(workspaces / "run1" / "src", PROJECT, mtime=1_700_000_000)
+    write_project(workspaces / "run2" / "src", {**PROJECT, **EXCLUDED}, mtime=1_700_000_000)
+    assert build_project_archive("run1")[0] == build_project_archive("run2")[0]
+
+
+def test_changed_file_replaces_the_archive(workspaces):
+    src_dir = workspaces / "run1" / "src"
+    write_project(src_dir, PROJECT, mtime=1_700_000_000)
+    first_hash, first_path = build_project_archive("run1")
+    # Unchanged files reuse the archive
+    assert build_project_archive("run1") == (first_hash, first_path)
+
+    write_project(src_dir, {"main.py": "print('changed')\n"}, mtime=1_700_000_000)
+    second_hash, second_path = build_project_archive("run1")
+    assert second_hash != first_hash
+    assert os.listdir(os.path.dirname(second_path)) == [os.path.basename(second_path)]
@@ -0,0 +1,198 @@
+# agents/test_checkpointer.py
+import asyncio
+import operator
+import os
+import time
+from typing import Annotated, List, TypedDict
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.graph import END, StateGraph
+from . import checkpointer as checkpointer_module
+from .checkpointer import (
+    SqliteCheckpointSaver,
+    create_checkpointer,
+    entry_predecessors,
+    prepare_resume,
+)
+
+
+def config(thread_id: str, checkpoint_id=None) -> dict:
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+def checkpoint(values: dict) -> dict:
+    return {**empty_checkpoint(), "channel_values": values}
+
+
+# Stores checkpoints one after the other, each the parent of the next
+def put_chain(saver, thread_id: str, count: int) -> List[dict]:
+    configs, parent = [], config(thread_id)
+    for step in range(count):
+        parent = saver.put(parent, checkpoint({"step": step}), {"step": step}, {})
+        configs.append(parent)
+    return configs
+
+
+@pytest.fixture
+def saver(tmp_path):
+    return SqliteCheckpointSaver(str(tmp_path / "checkpoints.sqlite"))
+
+
+def test_put_and_get_tuple(saver):
+    first, second = put_chain(saver, "run1", 2)
+
+    latest = saver.get_tuple(config("run1"))
+    assert latest.config == second
+    assert latest.parent_config == first
+    assert latest.checkpoint["channel_values"] == {"step": 1}
+    assert latest.metadata == {"step": 1}
+    assert saver.get_tuple(first).checkpoint["channel_values"] == {"step": 0}
+    assert saver.get_tuple(first).parent_config is None
+    assert saver.get_tuple(config("run2")) is None
+
+
+def test_put_writes_are_returned_with_their_checkpoint(saver):
+    first, second = put_chain(saver, "run1", 2)
+    saver.put_writes(second, [("messages", ["hi"]), ("iterations", 1)], "task1")
+    saver.put_writes(second, [("error", None)], "task0")
+
+    assert saver.get_tuple(config("run1")).pending_writes == [
+        ("task0", "error", None),
+        ("task1", "messages", ["hi"]),
+        ("task1", "iterations", 1),
+    ]
+    assert saver.get_tuple(first).pending_writes == []
+
+
+def test_list(saver):
+    configs = put_chain(saver, "run1", 3)
+    put_chain(saver, "run2", 1)
+
+    listed = [t.config for t in saver.list(config("run1"))]
+    assert listed == configs[::-1]
+    assert [t.config for t in saver.list(config("run1"), before=configs[2])] == configs[1::-1]
+    assert [t.config for t in saver.list(config("run1"), limit=1)] == [configs[2]]
+    assert [t.metadata["step"] for t in saver.list(config("run1"), filter={"step": 1})] == [1]
+    assert len(list(saver.list(None))) == 4
+
+
+def test_prune_thread_keeps_the_latest_checkpoint(saver):
+    configs = put_chain(saver, "run1", 3)
+    saver.put_writes(configs[1], [("iterations", 1)], "task1")
+    saver.put_writes(configs[2], [("iterations", 2)], "task1")
+    put_chain(saver, "run2", 2)
+
+    saver.prune_thread("run1")
+    saver.prune_thread("missing")
+
+    assert [t.config for t in saver.list(config("run1"))] == [configs[2]]
+    assert saver.get_tuple(config("run1")).pending_writes == [("task1", "iterations", 2)]
+    assert len(list(saver.list(config("run2")))) == 2
+
+
+def test_delete_expired_drops_whole_runs(tmp_path, monkeypatch):
+    path = str(tmp_path / "checkpoints.sqlite")
+    saver = SqliteCheckpointSaver(path, max_age_seconds=3600)
+    now = time.time()
+    monkeypatch.setattr(checkpointer_module.time, "time", lambda: now - 7200)
+    old = put_chain(saver, "old", 2)
+    saver.put_writes(old[1], [("iterations", 1)], "task1")
+    put_chain(saver, "active", 1)
+    monkeypatch.setattr(checkpointer_module.time, "time", lambda: now)
+    # A run counts as active while its newest checkpoint is recent
+    put_chain(saver, "active", 1)
+
+    # Expired runs are also removed when the service starts
+    reopened = SqliteCheckpointSaver(path, max_age_seconds=3600)
+    assert reopened.get_tuple(config("old")) is None
+    assert len(list(reopened.list(config("active")))) == 2
+    assert reopened._conn.execute("SELECT COUNT(*) FROM writes").fetchone()[0] == 0
+
+
+def test_create_checkpointer(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpointer_module, "GENERATED_ROOT", str(tmp_path))
+    monkeypatch.delenv("CHECKPOINTS_PATH", raising=False)
+    monkeypatch.delenv("CHECKPOINTS_ENABLED", raising=False)
+    assert create_checkpointer().path == os.path.join(str(tmp_path), ".checkpoints.sqlite")
+
+    monkeypatch.setenv("CHECKPOINTS_PATH", str(tmp_path / "other.sqlite"))
+    assert create_checkpointer().path == str(tmp_path / "other.sqlite")
+
+    monkeypatch.setenv("CHECKPOINTS_ENABLED", "false")
+    assert create_checkpointer() is None
+
+
+class RunState(TypedDict):
+    iterations: int
+    visited: Annotated[List[str], operator.add]
+
+
+# generate -> execute -> readme, execute loops back to debug until it passes.
+# failing: nodes that raise once, like a run stopped by a crash or a restart.
+def workflow_for(failing: set):
+    def node(name):
+        def run(state: RunState):
+            if name in failing:
+                failing.discard(name)
+                raise RuntimeError(f"{name} crashed")
+            iterations = state["iterations"] + (name == "debug")
+            return {"visited": [name], "iterations": iterations}
+
+        return run
+
+    workflow = StateGraph(RunState)
+    for name in ("generate", "execute", "debug", "readme"):
+        workflow.add_node(name, node(name))
+    workflow.set_entry_point("generate")
+    workflow.add_edge("generate", "execute")
+    workflow.add_conditional_edges(
+        "execute", lambda state: "debug" if state["iterations"] < 1 else "readme"
+    )
+    workflow.add_edge("debug", "execute")
+    workflow.add_edge("readme", END)
+    return workflow
+
+
+def test_entry_predecessors():
+    # readme and debug are only reached through the conditional edge
+    assert entry_predecessors(workflow_for(set())) == {"execute": "debug"}
+
+
+def test_resume_continues_after_the_last_completed_node(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    failing = {"debug"}
+    workflow = workflow_for(failing)
+    run = config("run1")
+
+    async def crash_and_resume():
+        app = workflow.compile(checkpointer=SqliteCheckpointSaver(path))
+        with pytest.raises(RuntimeError):
+            await app.ainvoke({"iterations": 0, "visited": []}, config=run)
+        # A restarted service opens the same file
+        app = workflow.compile(checkpointer=SqliteCheckpointSaver(path))
+        assert (await app.aget_state(run)).next == ("debug",)
+        await prepare_resume(app, run, entry_predecessors(workflow))
+        return await app.ainvoke(None, config=run)
+
+    result = asyncio.run(crash_and_resume())
+    assert result["visited"] == ["generate", "execute", "debug", "execute", "readme"]
+
+
+def test_re_entering_a_finished_run(tmp_path):
+    workflow = workflow_for(set())
+    app = workflow.compile(checkpointer=SqliteCheckpointSaver(str(tmp_path / "checkpoints.sqlite")))
+    run = config("run1")
+
+    async def run_and_re_enter():
+        await app.ainvoke({"iterations": 0, "visited": []}, config=run)
+        assert (await app.aget_state(run)).next == ()
+        await prepare_resume(app, run, entry_predecessors(workflow), "execute")
+        return await app.ainvoke(None, config=run)
+
+    result = asyncio.run(run_and_re_enter())
+    # The debug budget starts again from 0, so the re-entered run debugs once more
+    assert result["visited"][5:] == ["execute", "debug", "execute", "readme"]
+    assert result["iterations"] == 1
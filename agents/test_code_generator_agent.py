@@ -0,0 +1,68 @@
+# agents/test_code_generator_agent.py
+import asyncio
+import importlib
+import pytest
+from schemas import Codes
+
+# agents/__init__.py re-exports the node function under the module's name
+agent_module = importlib.import_module("agents.code_generator_agent")
+
+FILES = [
+    {
+        "description": "entry point",
+        "filename": "main.py",
+        "executable_code": True,
+        "code": "from calc import add\nprint(add(1, 2))\n",
+        "programming_language": "python",
+    },
+    {
+        "description": "helpers",
+        "filename": "calc.py",
+        "executable_code": False,
+        "code": "def add(a, b):\n    return a + b\n",
+        "programming_language": "python",
+    },
+]
+COMPLETE = {"description": "calculator", "codes": FILES, "execution_command": "python main.py"}
+
+
+def fake_stream(*chunks):
+    async def astream_structured(model, schema, prompt):
+        for chunk in chunks:
+            yield chunk
+
+    return astream_structured
+
+
+@pytest.fixture
+def fallback_calls(monkeypatch):
+    calls = []
+
+    async def ainvoke_structured(model, schema, prompt):
+        calls.append(schema)
+        return Codes.parse_obj(COMPLETE)
+
+    monkeypatch.setattr(agent_module, "ainvoke_structured", ainvoke_structured)
+    return calls
+
+
+@pytest.mark.parametrize(
+    "chunks, expected_fallbacks",
+    [
+        pytest.param(
+            [{"description": "calculator", "codes": FILES[:1]}, COMPLETE],
+            0,
+            id="complete stream",
+        ),
+        pytest.param([], 1, id="no chunks"),
+        pytest.param([{}], 1, id="empty chunk"),
+        pytest.param([{"description": "calculator", "codes": FILES}], 1, id="truncated object"),
+    ],
+)
+def test_stream_code_files(tmp_path, monkeypatch, fallback_calls, chunks, expected_fallbacks):
+    monkeypatch.setattr(agent_module, "astream_structured", fake_stream(*chunks))
+    generated = asyncio.run(agent_module.stream_code_files(None, "prompt", str(tmp_path)))
+    assert generated == Codes.parse_obj(COMPLETE)
+    assert len(fallback_calls) == expected_fallbacks
+    for code in FILES:
+        assert (tmp_path / code["filename"]).read_text() == code["code"]
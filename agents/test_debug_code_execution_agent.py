@@ -0,0 +1,133 @@
+# agents/test_debug_code_execution_agent.py
+import importlib
+import pytest
+from schemas import Code, Codes, ErrorFrame, ErrorMessage
+from .symbol_index import build_symbol_index
+
+# agents/__init__.py re-exports the node function, the module is needed here
+agent_module = importlib.import_module("agents.debug_code_execution_agent")
+
+MAIN_PY = """from calc.ops import divide
+from report import show
+from .helpers import clamp
+
+
+def main():
+    show(clamp(divide(1, 0)))
+"""
+
+OPS_PY = """def divide(a, b):
+    return a / b
+"""
+
+REPORT_PY = """def show(value):
+    print(value)
+"""
+
+HELPERS_PY = """def clamp(value):
+    return max(0, value)
+"""
+
+SERVER_JS = """import { computeTotal } from './cart.js';
+const db = require('./db');
+
+export function handle(items) {
+  return computeTotal(db.load(items));
+}
+"""
+
+
+def code(filename: str, source: str) -> Code:
+    return Code(
+        description=filename,
+        filename=filename,
+        executable_code=False,
+        code=source,
+        programming_language="python" if filename.endswith(".py") else "javascript",
+    )
+
+
+PYTHON_CODES = [
+    code("main.py", MAIN_PY),
+    code("calc/ops.py", OPS_PY),
+    code("report.py", REPORT_PY),
+    code("helpers.py", HELPERS_PY),
+    code("requirements.txt", "httpx\n"),
+]
+JS_CODES = [
+    code("server.js", SERVER_JS),
+    code("cart.js", "export function total(items) {\n  return 0;\n}\n"),
+    code("db.js", "module.exports = { load: (items) => items };\n"),
+]
+
+
+def state_for(codes, error_file, line, details):
+    return {
+        "codes": Codes(description="calculator", codes=codes, execution_command=""),
+        "symbol_index": build_symbol_index(codes),
+        "error": ErrorMessage(
+            type="Execution Error",
+            details=details,
+            file=error_file,
+            line=line,
+            frames=[ErrorFrame(file=error_file, line=line)],
+        ),
+    }
+
+
+@pytest.mark.parametrize(
+    "details, expected",
+    [
+        pytest.param(
+            "ZeroDivisionError: division by zero",
+            ["main.py", "requirements.txt"],
+            id="runtime error",
+        ),
+        pytest.param(
+            "ImportError: cannot import name 'divide' from 'calc.ops' (/app/calc/ops.py)",
+            ["main.py", "calc/ops.py", "requirements.txt"],
+            id="cannot import name",
+        ),
+        pytest.param(
+            "ImportError: cannot import name 'clamp' from 'app.helpers'",
+            ["main.py", "helpers.py", "requirements.txt"],
+            id="relative import",
+        ),
+        pytest.param(
+            "ModuleNotFoundError: No module named 'httpx'",
+            ["main.py", "requirements.txt"],
+            id="missing package",
+        ),
+    ],
+)
+def test_fix_context_python(details, expected):
+    full_files, original_code = agent_module.fix_context(
+        state_for(PYTHON_CODES, "main.py", 7, details)
+    )
+    assert full_files == [c.filename for c in PYTHON_CODES if c.filename in expected]
+    # The imported functions the failing code uses are sent as read only excerpts
+    related = original_code.split("**Related code from other files (read only)**:")[1]
+    for filename in ("calc/ops.py", "report.py", "helpers.py"):
+        assert (f"# {filename}," in related) is (filename not in full_files)
+
+
+@pytest.mark.parametrize(
+    "details, expected",
+    [
+        pytest.param(
+            "SyntaxError: The requested module './cart.js' does not provide an export named "
+            "'computeTotal'",
+            ["server.js", "cart.js"],
+            id="missing export",
+        ),
+        pytest.param(
+            "Error: Cannot find module '/app/db' imported from /app/server.js",
+            ["server.js", "db.js"],
+            id="cannot find module",
+        ),
+        pytest.param("TypeError: items.map is not a function", ["server.js"], id="runtime error"),
+    ],
+)
+def test_fix_context_javascript(details, expected):
+    full_files, _ = agent_module.fix_context(state_for(JS_CODES, "server.js", 5, details))
+    assert full_files == expected
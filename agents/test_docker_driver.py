@@ -0,0 +1,126 @@
+# agents/test_docker_driver.py
+import asyncio
+import os
+import sys
+import time
+import pytest
+from .docker_driver import ComposeProject, run_command, start_process
+
+
+def python(code: str) -> list:
+    return [sys.executable, "-u", "-c", code]
+
+
+def is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A zombie of a child that has exited but not been reaped still has a pid
+    with open(f"/proc/{pid}/stat") as f:
+        return f.read().split(")")[-1].split()[0] != "Z"
+
+
+def test_run_command_streams_lines(tmp_path):
+    lines = []
+    result = asyncio.run(
+        run_command(
+            python("import os; print('one'); print(os.getcwd()); raise SystemExit(3)"),
+            cwd=str(tmp_path),
+            on_line=lines.append,
+        )
+    )
+    assert lines == ["one\n", f"{tmp_path}\n"]
+    assert (result.returncode, result.output, result.ok) == (3, "".join(lines), False)
+
+
+def test_run_command_merges_stderr():
+    result = asyncio.run(run_command(python("import sys; print('err', file=sys.stderr)")))
+    assert result.ok and result.output == "err\n"
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_run_command_timeout_stops_the_process():
+    pids = []
+    started = time.monotonic()
+    result = asyncio.run(
+        run_command(
+            python("import os, time; print(os.getpid()); time.sleep(30)"),
+            timeout=1,
+            on_line=lambda line: pids.append(int(line)),
+        )
+    )
+    assert result.timed_out and not result.ok
+    assert result.output == f"{pids[0]}\n"
+    assert time.monotonic() - started < 10
+    assert not is_running(pids[0])
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_cancelled_caller_stops_the_process():
+    pids = []
+
+    async def cancel_while_running():
+        task = asyncio.create_task(
+            run_command(
+                python("import os, time; print(os.getpid()); time.sleep(30)"),
+                timeout=None,
+                on_line=lambda line: pids.append(int(line)),
+            )
+        )
+        while not pids:
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_while_running())
+    assert not is_running(pids[0])
+
+
+def test_stop_kills_a_process_that_ignores_sigterm():
+    code = (
+        "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); "
+        "print('ready'); time.sleep(30)"
+    )
+
+    async def stop():
+        process = await start_process(python(code))
+        assert await process.readline(timeout=10) == "ready\n"
+        # Nothing more is printed
+        assert await process.readline(timeout=0.1) is None
+        started = time.monotonic()
+        await process.stop(grace_period=0.5)
+        return process.returncode, time.monotonic() - started
+
+    returncode, elapsed = asyncio.run(stop())
+    assert returncode == -9
+    assert elapsed < 5
+
+
+def test_compose_command():
+    project = ComposeProject("timeless-run1", "/tmp")
+    assert project.command("build", files=["compose.yaml", "/w/compose.cache.yaml"])[-7:] == [
+        "-p",
+        "timeless-run1",
+        "-f",
+        "compose.yaml",
+        "-f",
+        "/w/compose.cache.yaml",
+        "build",
+    ]
+
+
+def test_compose_command_with_run_compose_file():
+    project = ComposeProject("timeless-run1", "/w/src", "/w/compose.run.yaml")
+    assert project.command("up", files=["/w/compose.cache.yaml"])[-9:] == [
+        "-p",
+        "timeless-run1",
+        "-f",
+        "/w/compose.run.yaml",
+        "--project-directory",
+        "/w/src",
+        "-f",
+        "/w/compose.cache.yaml",
+        "up",
+    ]
@@ -0,0 +1,117 @@
+# agents/test_docker_image_cache.py
+import asyncio
+import itertools
+import pytest
+from . import docker_image_cache as cache_module
+from .docker_driver import CommandResult
+from .docker_image_cache import DockerImageCache, installs_dependencies_first
+
+COMPOSE = "services:\n  app:\n    build: .\n    image: calc-app\n"
+
+DEPENDENCIES_FIRST = """FROM python:3.11-slim
+WORKDIR /app
+COPY requirements.txt .
+RUN pip install -r requirements.txt
+COPY . .
+CMD ["python", "main.py"]
+"""
+
+
+def write_project(src_dir, dockerfile: str):
+    (src_dir / "Dockerfile").write_text(dockerfile)
+    (src_dir / "compose.yaml").write_text(COMPOSE)
+
+
+@pytest.mark.parametrize(
+    "dockerfile, expected",
+    [
+        pytest.param(DEPENDENCIES_FIRST, True, id="manifest before sources"),
+        pytest.param(
+            "FROM node:20\nWORKDIR /app\nCOPY package*.json ./\nRUN npm ci\nCOPY . .\n",
+            True,
+            id="manifest glob",
+        ),
+        pytest.param(
+            'FROM node:20\nCOPY --chown=node ["package.json", "package-lock.json", "./"]\n'
+            "RUN npm ci \\\n    && npm cache clean --force\nCOPY . .\n",
+            True,
+            id="json form with flags",
+        ),
+        pytest.param(
+            "FROM python:3.11\nWORKDIR /app\nCOPY . .\nRUN pip install -r requirements.txt\n",
+            False,
+            id="sources copied first",
+        ),
+        pytest.param(
+            "FROM python:3.11\nCOPY main.py .\nCOPY requirements.txt .\nRUN pip install -r requirements.txt\n",
+            False,
+            id="source file before manifest",
+        ),
+        pytest.param(
+            "FROM python:3.11\nCOPY requirements.txt .\nCOPY . .\nRUN pip install -r requirements.txt\n",
+            False,
+            id="install after sources",
+        ),
+        pytest.param(
+            "FROM golang:1.22 AS build\nCOPY go.mod go.sum ./\nRUN go mod download\nCOPY . .\n"
+            "RUN go build -o /app\nFROM alpine\nCOPY --from=build /app /app\n",
+            True,
+            id="builder stage",
+        ),
+        pytest.param("FROM python:3.11\nCMD [\"python\"]\n", False, id="no copy"),
+    ],
+)
+def test_installs_dependencies_first(tmp_path, dockerfile, expected):
+    (tmp_path / "Dockerfile").write_text(dockerfile)
+    assert installs_dependencies_first(str(tmp_path)) is expected
+
+
+def test_installs_dependencies_first_without_dockerfile(tmp_path):
+    assert installs_dependencies_first(str(tmp_path)) is False
+
+
+@pytest.fixture
+def docker_calls(monkeypatch):
+    calls = []
+
+    async def docker(*args, **kwargs):
+        calls.append(args)
+        return CommandResult(0, "")
+
+    monkeypatch.setattr(cache_module, "docker", docker)
+    return calls
+
+
+@pytest.mark.parametrize(
+    "dockerfile, cached",
+    [
+        pytest.param(DEPENDENCIES_FIRST, True, id="dependency layer"),
+        pytest.param(
+            "FROM python:3.11\nCOPY . .\nRUN pip install -r requirements.txt\n",
+            False,
+            id="no dependency layer",
+        ),
+    ],
+)
+def test_remember_build_tags_only_reusable_images(tmp_path, docker_calls, dockerfile, cached):
+    src_dir = tmp_path / "src"
+    src_dir.mkdir()
+    write_project(src_dir, dockerfile)
+    cache = DockerImageCache(str(tmp_path / "index.json"))
+
+    asyncio.run(cache.remember_build(str(src_dir), "abc123", "timeless-run1"))
+
+    tag = "timeless-deps:abc123-app"
+    assert (("tag", "calc-app", tag) in docker_calls) is cached
+    assert cache.contains(tag) is cached
+
+
+def test_touch_evicts_least_recently_used(tmp_path, monkeypatch):
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(cache_module.time, "time", lambda: float(next(ticks)))
+    cache = DockerImageCache(str(tmp_path / "index.json"), max_images=2)
+    assert cache.touch(["a"]) == []
+    assert cache.touch(["b"]) == []
+    assert cache.touch(["a"]) == []
+    assert cache.touch(["c"]) == ["b"]
+    assert [cache.contains(image) for image in "abc"] == [True, False, True]
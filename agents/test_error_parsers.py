@@ -0,0 +1,264 @@
+# agents/test_error_parsers.py
+import pytest
+from schemas import ErrorFrame, ErrorMessage
+from . import error_parsers
+from .error_parsers import (
+    ErrorParser,
+    ParsedError,
+    annotate_error,
+    is_error_start,
+    parse_error_log,
+    project_path,
+    register_parser,
+)
+
+PYTHON_TRACEBACK = """Starting calculator
+Traceback (most recent call last):
+  File "/app/main.py", line 12, in <module>
+    main()
+  File "/app/main.py", line 8, in main
+    print(divide(1, 0))
+  File "/app/calc/ops.py", line 3, in divide
+    return a / b
+  File "/usr/local/lib/python3.12/site-packages/decimal_helpers/core.py", line 40, in wrap
+    raise
+ZeroDivisionError: division by zero
+"""
+
+PYTHON_SYNTAX_ERROR = """  File "/app/main.py", line 4
+    print("total"
+         ^
+SyntaxError: '(' was never closed
+"""
+
+NODE_TRACEBACK = """/app/src/server.js:14
+    const total = items.reduce((a, b) => a + b.price, 0);
+                        ^
+
+TypeError: Cannot read properties of undefined (reading 'reduce')
+    at computeTotal (/app/src/server.js:14:25)
+    at Object.<anonymous> (/app/index.js:5:13)
+    at Module._compile (node:internal/modules/cjs/loader:1358:14)
+    at Object.Module._extensions..js (node:internal/modules/cjs/loader:1416:10)
+    at node:internal/main/run_main_module:28:49
+
+Node.js v20.15.0
+"""
+
+NODE_MODULES_TRACEBACK = """Error: connect ECONNREFUSED 127.0.0.1:5432
+    at TCPConnectWrap.afterConnect [as oncomplete] (node:net:1607:16)
+    at Client._connect (/app/node_modules/pg/lib/client.js:132:11)
+    at start (file:///app/db.mjs:8:3)
+"""
+
+JAVA_TRACEBACK = """Exception in thread "main" java.lang.IllegalStateException: Greeting failed
+\tat com.example.app.Main.main(Main.java:9)
+Caused by: java.lang.NullPointerException: Cannot invoke "String.length()" because "name" is null
+\tat com.example.app.Greeter.greet(Greeter.java:7)
+\tat com.example.app.Main.main(Main.java:5)
+\t... 1 more
+"""
+
+JAVA_COMPILE_ERROR = """/app/src/main/java/com/example/app/Main.java:5: error: cannot find symbol
+        System.out.println(greter.greet("x"));
+                           ^
+  symbol:   variable greter
+  location: class Main
+1 error
+"""
+
+GO_PANIC = """Listening on :8080
+panic: runtime error: index out of range [5] with length 3
+
+goroutine 1 [running]:
+main.lookup(...)
+\t/app/handlers.go:12
+main.main()
+\t/app/main.go:9 +0x1d
+exit status 2
+"""
+
+GO_COMPILE_ERROR = """# example.com/app
+./main.go:9:6: undefined: lookupp
+./handlers.go:4:2: "strings" imported and not used
+"""
+
+JAVA_FILES = [
+    "pom.xml",
+    "src/main/java/com/example/app/Main.java",
+    "src/main/java/com/example/app/Greeter.java",
+]
+
+
+def frames(*entries) -> list:
+    return [ErrorFrame(file=f, line=l, column=c, function=fn) for f, l, c, fn in entries]
+
+
+# (log, project files, language, error class, message, frames innermost first)
+LOG_CASES = [
+    pytest.param(
+        PYTHON_TRACEBACK,
+        ["main.py", "calc/ops.py"],
+        "python",
+        "ZeroDivisionError",
+        "division by zero",
+        frames(
+            ("calc/ops.py", 3, None, "divide"),
+            ("main.py", 8, None, "main"),
+            ("main.py", 12, None, "<module>"),
+        ),
+        id="python traceback",
+    ),
+    pytest.param(
+        PYTHON_SYNTAX_ERROR,
+        ["main.py"],
+        "python",
+        "SyntaxError",
+        "'(' was never closed",
+        frames(("main.py", 4, 6, None)),
+        id="python syntax error",
+    ),
+    pytest.param(
+        NODE_TRACEBACK,
+        ["index.js", "src/server.js"],
+        "javascript",
+        "TypeError",
+        "Cannot read properties of undefined (reading 'reduce')",
+        frames(
+            ("src/server.js", 14, 25, "computeTotal"),
+            ("index.js", 5, 13, "Object.<anonymous>"),
+        ),
+        id="node traceback",
+    ),
+    pytest.param(
+        NODE_MODULES_TRACEBACK,
+        ["db.mjs", "package.json"],
+        "javascript",
+        "Error",
+        "connect ECONNREFUSED 127.0.0.1:5432",
+        frames(("db.mjs", 8, 3, "start")),
+        id="node library frames",
+    ),
+    pytest.param(
+        JAVA_TRACEBACK,
+        JAVA_FILES,
+        "java",
+        "IllegalStateException",
+        "Greeting failed",
+        frames(
+            ("src/main/java/com/example/app/Main.java", 9, None, "com.example.app.Main.main"),
+            ("src/main/java/com/example/app/Greeter.java", 7, None, "com.example.app.Greeter.greet"),
+            ("src/main/java/com/example/app/Main.java", 5, None, "com.example.app.Main.main"),
+        ),
+        id="java exception with cause",
+    ),
+    pytest.param(
+        JAVA_COMPILE_ERROR,
+        JAVA_FILES,
+        "java",
+        "CompilationError",
+        "cannot find symbol",
+        frames(("src/main/java/com/example/app/Main.java", 5, None, None)),
+        id="javac error",
+    ),
+    pytest.param(
+        GO_PANIC,
+        ["main.go", "handlers.go", "go.mod"],
+        "go",
+        "panic",
+        "runtime error: index out of range [5] with length 3",
+        frames(("handlers.go", 12, None, "main.lookup"), ("main.go", 9, None, "main.main")),
+        id="go panic",
+    ),
+    pytest.param(
+        GO_COMPILE_ERROR,
+        ["main.go", "handlers.go", "go.mod"],
+        "go",
+        "compile error",
+        "undefined: lookupp",
+        frames(("main.go", 9, 6, None), ("handlers.go", 4, 2, None)),
+        id="go compile error",
+    ),
+]
+
+
+@pytest.mark.parametrize("log, files, language, error_class, message, expected", LOG_CASES)
+def test_parse_error_log(log, files, language, error_class, message, expected):
+    parsed = parse_error_log(log, files)
+    assert parsed is not None
+    assert (parsed.language, parsed.error_class, parsed.message) == (language, error_class, message)
+    assert parsed.frames == expected
+
+
+@pytest.mark.parametrize("log, files, language, error_class, message, expected", LOG_CASES)
+def test_annotate_error(log, files, language, error_class, message, expected):
+    error = ErrorMessage(type="Docker Execution Error", details=log)
+    assert annotate_error(error, files) is error
+    assert (error.file, error.line) == (expected[0].file, expected[0].line)
+    assert error.error_class == error_class
+    assert error.frames == expected
+
+
+def test_annotate_error_without_project_frames_keeps_the_error():
+    error = ErrorMessage(type="Docker Execution Error", details="Killed\n", file="main.py")
+    annotate_error(error, ["main.py"])
+    assert (error.file, error.line, error.error_class, error.frames) == ("main.py", None, None, [])
+
+
+@pytest.mark.parametrize(
+    "path, files, expected",
+    [
+        pytest.param("/app/main.py", None, "main.py", id="container root"),
+        pytest.param("/usr/src/app/lib/util.js", None, "lib/util.js", id="other container root"),
+        pytest.param("./main.go", ["main.go"], "main.go", id="relative"),
+        pytest.param("/usr/lib/python3.12/json/decoder.py", None, None, id="runtime"),
+        pytest.param("/app/node_modules/pg/lib/client.js", None, None, id="node_modules"),
+        pytest.param("node:internal/modules/cjs/loader", None, None, id="node internal"),
+        pytest.param("Main.java", ["src/Main.java", "test/Main.java"], None, id="ambiguous name"),
+    ],
+)
+def test_project_path(path, files, expected):
+    assert project_path(path, files) == expected
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("Traceback (most recent call last):\n", True),
+        ("TypeError: Cannot read properties of undefined\n", True),
+        ('Exception in thread "main" java.lang.NullPointerException\n', True),
+        ("panic: runtime error: index out of range\n", True),
+        ("./main.go:9:6: undefined: lookupp\n", True),
+        ("Server listening on port 8080\n", False),
+    ],
+)
+def test_is_error_start(line, expected):
+    assert is_error_start(line) is expected
+
+
+def test_register_parser(monkeypatch):
+    monkeypatch.setattr(error_parsers, "ERROR_PARSERS", list(error_parsers.ERROR_PARSERS))
+
+    class ElixirErrorParser(ErrorParser):
+        language = "elixir"
+        start_patterns = [r"^\*\* \("]
+
+        def parse(self, log, project_files=None):
+            if "** (" in log:
+                return ParsedError(self.language, "ArithmeticError", "bad argument")
+            return None
+
+    register_parser(ElixirErrorParser())
+    assert is_error_start("** (ArithmeticError) bad argument in arithmetic expression\n")
+    assert parse_error_log("** (ArithmeticError) bad argument\n").language == "elixir"
+
+
+def test_incomplete_parsers_are_rejected():
+    class IncompleteParser(ErrorParser):
+        language = "elixir"
+
+    with pytest.raises(TypeError):
+        IncompleteParser()
+    with pytest.raises(TypeError):
+        register_parser(IncompleteParser)
+
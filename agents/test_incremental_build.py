@@ -0,0 +1,164 @@
+# agents/test_incremental_build.py
+import pytest
+from .incremental_build import (
+    BIND_MOUNT,
+    FULL_BUILD,
+    REUSE_IMAGE,
+    SOURCE_REFRESH,
+    compiles_source,
+    context_destination,
+    plan_build,
+)
+
+PYTHON_DOCKERFILE = """FROM python:3.12-slim
+WORKDIR /app
+COPY requirements.txt .
+RUN pip install -r requirements.txt
+COPY . .
+CMD ["python", "main.py"]
+"""
+
+GO_DOCKERFILE = """FROM golang:1.22 AS build
+WORKDIR /src
+COPY go.mod go.sum ./
+RUN go mod download
+COPY . .
+RUN go build -o /out/app
+FROM alpine
+COPY --from=build /out/app /usr/local/bin/app
+CMD ["app"]
+"""
+
+JAVA_DOCKERFILE = """FROM maven:3.9-eclipse-temurin-21
+WORKDIR /app
+COPY pom.xml .
+RUN mvn dependency:go-offline
+COPY src ./src
+RUN mvn package -DskipTests
+CMD ["java", "-jar", "target/app.jar"]
+"""
+
+COMPOSE = "services:\n  app:\n    build: .\n    image: calc-app\n"
+BIND_MOUNT_COMPOSE = COMPOSE + "    volumes:\n      - .:/app\n"
+
+PREVIOUS = {
+    "Dockerfile": "d1",
+    "compose.yaml": "c1",
+    "requirements.txt": "r1",
+    "main.py": "m1",
+    "calc.py": "k1",
+}
+
+
+def write_project(src_dir, dockerfile: str = PYTHON_DOCKERFILE, compose: str = COMPOSE):
+    (src_dir / "Dockerfile").write_text(dockerfile)
+    (src_dir / "compose.yaml").write_text(compose)
+
+
+def changed(**files) -> dict:
+    return {**PREVIOUS, **files}
+
+
+@pytest.mark.parametrize(
+    "previous, current, dockerfile, compose, mode",
+    [
+        pytest.param(None, PREVIOUS, PYTHON_DOCKERFILE, COMPOSE, FULL_BUILD, id="first build"),
+        pytest.param(PREVIOUS, PREVIOUS, PYTHON_DOCKERFILE, COMPOSE, REUSE_IMAGE, id="nothing changed"),
+        pytest.param(
+            PREVIOUS, changed(**{"main.py": "m2"}), PYTHON_DOCKERFILE, COMPOSE, SOURCE_REFRESH,
+            id="source changed",
+        ),
+        pytest.param(
+            PREVIOUS, changed(**{"main.py": "m2"}), PYTHON_DOCKERFILE, BIND_MOUNT_COMPOSE, BIND_MOUNT,
+            id="source bind mounted",
+        ),
+        pytest.param(
+            PREVIOUS, changed(**{"requirements.txt": "r2"}), PYTHON_DOCKERFILE, COMPOSE, FULL_BUILD,
+            id="dependency manifest changed",
+        ),
+        pytest.param(
+            PREVIOUS, changed(Dockerfile="d2"), PYTHON_DOCKERFILE, COMPOSE, FULL_BUILD,
+            id="Dockerfile changed",
+        ),
+        pytest.param(
+            PREVIOUS,
+            {k: v for k, v in PREVIOUS.items() if k != "calc.py"},
+            PYTHON_DOCKERFILE,
+            COMPOSE,
+            FULL_BUILD,
+            id="file removed",
+        ),
+        pytest.param(
+            PREVIOUS, changed(**{"main.py": "m2"}), GO_DOCKERFILE, COMPOSE, FULL_BUILD,
+            id="go build after copy",
+        ),
+        pytest.param(
+            PREVIOUS, changed(**{"main.py": "m2"}), GO_DOCKERFILE, BIND_MOUNT_COMPOSE, FULL_BUILD,
+            id="compiled source is rebuilt even when bind mounted",
+        ),
+        pytest.param(
+            PREVIOUS, changed(**{"main.py": "m2"}), JAVA_DOCKERFILE, COMPOSE, FULL_BUILD,
+            id="mvn package after copy",
+        ),
+        pytest.param(
+            PREVIOUS,
+            changed(**{"main.py": "m2"}),
+            "FROM python:3.12-slim\nWORKDIR /app\nCOPY main.py calc.py ./\nCMD python main.py\n",
+            COMPOSE,
+            FULL_BUILD,
+            id="partial copy",
+        ),
+        pytest.param(
+            PREVIOUS,
+            changed(**{"main.py": "m2"}),
+            PYTHON_DOCKERFILE,
+            "services:\n  app:\n    image: python:3.12-slim\n",
+            FULL_BUILD,
+            id="no built service",
+        ),
+    ],
+)
+def test_plan_build(tmp_path, previous, current, dockerfile, compose, mode):
+    write_project(tmp_path, dockerfile, compose)
+    plan = plan_build(str(tmp_path), previous, current, "timeless-run1")
+    assert plan.mode == mode, plan.reason
+
+
+def test_plan_build_lists_changed_files(tmp_path):
+    write_project(tmp_path)
+    current = changed(**{"main.py": "m2", "calc.py": "k2", "utils.py": "u1"})
+    plan = plan_build(str(tmp_path), PREVIOUS, current, "timeless-run1")
+    assert plan.mode == SOURCE_REFRESH
+    assert plan.changed_files == ["calc.py", "main.py", "utils.py"]
+
+
+@pytest.mark.parametrize(
+    "dockerfile, expected",
+    [
+        pytest.param(PYTHON_DOCKERFILE, False, id="python"),
+        pytest.param(GO_DOCKERFILE, True, id="go builder stage"),
+        pytest.param(JAVA_DOCKERFILE, True, id="maven"),
+        pytest.param(
+            "FROM node:20\nWORKDIR /app\nCOPY package.json .\nRUN npm ci\nCOPY . .\nRUN npm run build\n",
+            True,
+            id="npm build",
+        ),
+        pytest.param("FROM alpine\nCMD [\"echo\", \"hi\"]\n", False, id="no copy"),
+    ],
+)
+def test_compiles_source(tmp_path, dockerfile, expected):
+    write_project(tmp_path, dockerfile)
+    assert compiles_source(str(tmp_path)) is expected
+
+
+@pytest.mark.parametrize(
+    "dockerfile, expected",
+    [
+        pytest.param(PYTHON_DOCKERFILE, "/app", id="workdir"),
+        pytest.param("FROM python:3.12\nWORKDIR /srv\nCOPY . ./code\n", "/srv/code", id="subfolder"),
+        pytest.param(GO_DOCKERFILE, None, id="last stage copies only build output"),
+    ],
+)
+def test_context_destination(tmp_path, dockerfile, expected):
+    write_project(tmp_path, dockerfile)
+    assert context_destination(str(tmp_path)) == expected
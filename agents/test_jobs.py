@@ -0,0 +1,149 @@
+# agents/test_jobs.py
+import asyncio
+import threading
+import pytest
+from jobs import JobActiveError, JobManager, QueueFullError
+from schemas import JobStatus
+
+TIMEOUT = 5
+
+
+class Runner:
+    """run_job of the tests: jobs named "hold*" wait for release(), the others finish at once."""
+
+    def __init__(self):
+        self.started = []
+        self._release = threading.Event()
+
+    async def __call__(self, job):
+        self.started.append(job.id)
+        if job.prompt == "fail":
+            job.error = "build failed"
+        elif job.prompt == "raise":
+            raise RuntimeError("boom")
+        elif job.prompt == "cancel":
+            raise asyncio.CancelledError()
+        elif job.id.startswith("hold"):
+            await asyncio.to_thread(self._release.wait, TIMEOUT)
+
+    def release(self):
+        self._release.set()
+
+
+@pytest.fixture
+def runner():
+    runner = Runner()
+    yield runner
+    runner.release()
+
+
+def start_manager(runner, **options) -> JobManager:
+    manager = JobManager(runner, **options)
+    manager.start()
+    return manager
+
+
+def finished(job):
+    return job.future.result(timeout=TIMEOUT)
+
+
+def wait_running(job):
+    while job.status != JobStatus.RUNNING:
+        threading.Event().wait(0.01)
+
+
+@pytest.mark.parametrize(
+    "prompt, status, error",
+    [
+        pytest.param("ok", JobStatus.SUCCEEDED, None, id="succeeded"),
+        pytest.param("fail", JobStatus.FAILED, "build failed", id="error result"),
+        pytest.param("raise", JobStatus.FAILED, "boom", id="exception"),
+        pytest.param("cancel", JobStatus.FAILED, "The run was cancelled.", id="cancelled run"),
+    ],
+)
+def test_job_outcome(runner, prompt, status, error):
+    manager = start_manager(runner, workers=1)
+    job = finished(manager.submit("job1", prompt))
+    assert (job.status, job.error) == (status, error)
+    assert job.started_at <= job.finished_at
+    assert manager.get("job1") is job
+
+
+def test_worker_survives_a_cancelled_run(runner):
+    manager = start_manager(runner, workers=1)
+    finished(manager.submit("job1", "cancel"))
+    # The only worker is still there for the next job
+    assert finished(manager.submit("job2", "ok")).status == JobStatus.SUCCEEDED
+
+
+def test_cancelled_worker_fails_its_job(runner):
+    manager = start_manager(runner, workers=1)
+    job = manager.submit("hold1", "x")
+    wait_running(job)
+
+    def cancel_workers():
+        for task in asyncio.all_tasks(manager.loop):
+            task.cancel()
+
+    manager.loop.call_soon_threadsafe(cancel_workers)
+    runner.release()
+    assert finished(job).status == JobStatus.FAILED
+
+
+def test_queue_full_rejects_the_job(runner):
+    manager = start_manager(runner, workers=1, max_queue=1)
+    running = manager.submit("hold1", "x")
+    wait_running(running)
+    manager.submit("hold2", "x")
+    assert manager.queue_size() == 1
+
+    with pytest.raises(QueueFullError):
+        manager.submit("hold3", "x")
+    assert manager.get("hold3") is None
+
+    runner.release()
+    assert finished(running).status == JobStatus.SUCCEEDED
+
+
+def test_queue_full_keeps_the_earlier_attempt(runner):
+    manager = start_manager(runner, workers=1, max_queue=1)
+    earlier = finished(manager.submit("job1", "fail"))
+    running = manager.submit("hold1", "x")
+    wait_running(running)
+    manager.submit("hold2", "x")
+
+    with pytest.raises(QueueFullError):
+        manager.submit("job1", "retry")
+    assert manager.get("job1") is earlier
+
+
+def test_active_job_cannot_be_submitted_again(runner):
+    manager = start_manager(runner, workers=1)
+    job = manager.submit("hold1", "x")
+    with pytest.raises(JobActiveError):
+        manager.submit("hold1", "x")
+
+    runner.release()
+    finished(job)
+    # A finished job can be run again under the same id
+    again = finished(manager.submit("hold1", "x"))
+    assert again is not job and manager.get("hold1") is again
+    assert runner.started == ["hold1", "hold1"]
+
+
+def test_history_evicts_the_oldest_finished_jobs(runner):
+    manager = start_manager(runner, workers=1, history_limit=2)
+    running = manager.submit("hold1", "x")
+    # hold1 runs, job1 and job2 wait behind it
+    manager.submit("job1", "ok")
+    manager.submit("job2", "ok")
+    # Unfinished jobs are never evicted
+    assert [manager.get(i) is not None for i in ("hold1", "job1", "job2")] == [True] * 3
+
+    runner.release()
+    finished(running)
+    finished(manager.get("job2"))
+    last = finished(manager.submit("job3", "ok"))
+    assert manager.get("hold1") is None
+    assert manager.get("job1") is None
+    assert manager.get("job2") is not None and manager.get("job3") is last
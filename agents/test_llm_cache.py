@@ -0,0 +1,138 @@
+# agents/test_llm_cache.py
+import itertools
+import pytest
+from schemas import DockerFile, Documentation
+from . import llm_cache as llm_cache_module
+from .llm_cache import LLMResponseCache, create_llm_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Every time.time() call in the cache moves one second forward, so the access order is exact
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(llm_cache_module.time, "time", lambda: float(next(ticks)))
+    return ticks
+
+
+def make_cache(tmp_path, **limits) -> LLMResponseCache:
+    return LLMResponseCache(str(tmp_path / "cache" / "llm.sqlite"), **limits)
+
+
+def doc(text: str) -> Documentation:
+    return Documentation(readme=text, developer="")
+
+
+def fill(cache: LLMResponseCache, *keys: str):
+    for key in keys:
+        cache.put(key, "gpt-4o-mini", Documentation, doc(key))
+
+
+def keys_in(cache: LLMResponseCache) -> set:
+    return {row[0] for row in cache._conn.execute("SELECT key FROM llm_cache")}
+
+
+def test_make_key_is_stable_for_the_same_prompt_and_schema():
+    first = LLMResponseCache.make_key("gpt-4o", "write a calculator", Documentation)
+    second = LLMResponseCache.make_key("gpt-4o", "write a calculator", Documentation)
+    assert first == second
+    assert len(first) == 64
+
+
+@pytest.mark.parametrize(
+    "model, prompt, schema",
+    [
+        pytest.param("gpt-4o-mini", "write a calculator", Documentation, id="model"),
+        pytest.param("gpt-4o", "write a calendar", Documentation, id="prompt"),
+        pytest.param("gpt-4o", "write a calculator", DockerFile, id="schema"),
+    ],
+)
+def test_make_key_changes_with_each_input(model, prompt, schema):
+    base = LLMResponseCache.make_key("gpt-4o", "write a calculator", Documentation)
+    assert LLMResponseCache.make_key(model, prompt, schema) != base
+
+
+def test_get_returns_the_stored_value(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    cache.put("k", "gpt-4o", Documentation, doc("hello"))
+    assert cache.get("k", Documentation) == doc("hello")
+    assert cache.get("missing", Documentation) is None
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+        "entries": 1,
+        "bytes": len(doc("hello").json()),
+    }
+
+
+def test_expired_entry_is_a_miss_and_an_eviction(tmp_path, clock):
+    cache = make_cache(tmp_path, max_age_seconds=5)
+    fill(cache, "old")
+    for _ in range(10):
+        next(clock)
+    assert cache.get("old", Documentation) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (0, 1, 1, 0)
+
+
+def test_put_drops_expired_entries(tmp_path, clock):
+    cache = make_cache(tmp_path, max_age_seconds=5)
+    fill(cache, "old")
+    for _ in range(10):
+        next(clock)
+    fill(cache, "new")
+    assert keys_in(cache) == {"new"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_count_limit_evicts_least_recently_used(tmp_path, clock):
+    cache = make_cache(tmp_path, max_entries=2)
+    fill(cache, "a", "b")
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a", Documentation) is not None
+    fill(cache, "c")
+    assert keys_in(cache) == {"a", "c"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_size_limit_evicts_least_recently_used(tmp_path, clock):
+    entry_size = len(doc("a").json())
+    cache = make_cache(tmp_path, max_bytes=2 * entry_size)
+    fill(cache, "a", "b")
+    assert cache.get("a", Documentation) is not None
+    fill(cache, "c")
+    assert keys_in(cache) == {"a", "c"}
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 2 * entry_size, 1)
+
+
+def test_create_llm_cache_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    assert llm_cache_module.create_llm_cache() is None
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "true")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm.sqlite"))
+    monkeypatch.setenv("LLM_CACHE_MAX_ENTRIES", "3")
+    cache = llm_cache_module.create_llm_cache()
+    assert cache is not None and cache.max_entries == 3
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        pytest.param("", "generated-root/.llm_cache.sqlite", id="under GENERATED_DIR"),
+        pytest.param("custom/llm.sqlite", "custom/llm.sqlite", id="LLM_CACHE_PATH"),
+    ],
+)
+def test_create_llm_cache_path(tmp_path, monkeypatch, path, expected):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(llm_cache_module, "GENERATED_ROOT", str(tmp_path / "generated-root"))
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "true")
+    monkeypatch.setenv("LLM_CACHE_PATH", path)
+    cache = create_llm_cache()
+    assert (tmp_path / expected).exists()
+    assert cache.stats()["entries"] == 0
+
+
+def test_cache_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    assert create_llm_cache() is None
@@ -0,0 +1,114 @@
+# agents/test_message_compaction.py
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from schemas import Code
+from . import message_compaction
+from .message_compaction import (
+    KEEP_RECENT_TURNS,
+    code_message,
+    compact_for_node,
+    compact_messages,
+    count_message_tokens,
+    node_budget,
+)
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # Token counts from the len // 4 estimate, whether tiktoken is installed or not
+    monkeypatch.setattr(message_compaction, "_get_encoding", lambda: None)
+
+
+def code(filename: str, source: str) -> AIMessage:
+    return code_message(
+        Code(
+            description=f"{filename} module",
+            filename=filename,
+            executable_code=filename == "main.py",
+            code=source,
+            programming_language="python",
+        )
+    )
+
+
+def history(turns: int = 0):
+    messages = [HumanMessage(content="Build a calculator")]
+    messages += [code("main.py", "import calc\nprint(calc.add(1, 2))\n" + "# v1\n" * 50)]
+    messages += [code("calc.py", "def add(a, b):\n    return a + b\n" + "# v1\n" * 200)]
+    messages += [AIMessage(content=f"Step {i}: " + "details " * 20) for i in range(turns)]
+    messages += [code("main.py", "import calc\nprint(calc.add(2, 3))\n")]
+    return messages
+
+
+def file_versions(messages):
+    return [(m.additional_kwargs["filename"], m.content) for m in messages if m.additional_kwargs]
+
+
+def test_under_budget_keeps_only_the_latest_file_versions():
+    messages = history(turns=2)
+    compacted = compact_messages(messages, budget=100_000)
+    assert compacted[0] is messages[0]
+    assert [name for name, _ in file_versions(compacted)] == ["calc.py", "main.py"]
+    assert "calc.add(2, 3)" in dict(file_versions(compacted))["main.py"]
+    assert [m.content for m in compacted if m.type == "ai" and not m.additional_kwargs] == [
+        m.content for m in messages[3:5]
+    ]
+
+
+def test_older_turns_are_folded_into_a_summary():
+    messages = history(turns=KEEP_RECENT_TURNS + 3)
+    latest_only = compact_messages(messages, budget=100_000)
+    compacted = compact_messages(messages, budget=count_message_tokens(latest_only) - 1)
+
+    assert compacted[0].content == "Build a calculator"
+    assert compacted[1].content.startswith("Summary of earlier steps:")
+    assert compacted[1].content.count("\n- ai: Step") == 3
+    kept_turns = [m.content for m in compacted[2:] if not m.additional_kwargs]
+    assert [turn.split(":")[0] for turn in kept_turns] == [
+        f"Step {i}" for i in range(3, KEEP_RECENT_TURNS + 3)
+    ]
+    # The file contents are still there
+    assert len(file_versions(compacted)) == 2
+
+
+def test_largest_files_are_replaced_by_the_manifest():
+    messages = history(turns=1)
+    latest_only = compact_messages(messages, budget=100_000)
+    calc_tokens = count_message_tokens(
+        [m for m in latest_only if m.additional_kwargs.get("filename") == "calc.py"]
+    )
+    budget = count_message_tokens(latest_only) - calc_tokens + 30
+    compacted = compact_messages(messages, budget=budget)
+
+    assert [name for name, _ in file_versions(compacted)] == ["main.py"]
+    manifest = next(m.content for m in compacted if m.content.startswith("Project files"))
+    assert "- calc.py (python): calc.py module" in manifest
+    assert "main.py" not in manifest
+    assert count_message_tokens(compacted) <= budget
+
+
+def test_manifest_lists_imports():
+    messages = [HumanMessage(content="Build a calculator"), code("main.py", "import calc\n" * 100)]
+    compacted = compact_messages(messages, budget=40)
+    assert compacted[0].content == "Build a calculator"
+    assert compacted[1].content.endswith("- main.py (python): main.py module Imports: calc")
+
+
+def test_compact_for_node_records_the_tokens_saved(monkeypatch):
+    monkeypatch.delenv("MESSAGE_TOKEN_BUDGET_DOCKERIZER", raising=False)
+    monkeypatch.setenv("MESSAGE_TOKEN_BUDGET_README", "400")
+    state = {"messages": history(turns=KEEP_RECENT_TURNS + 3)}
+
+    compacted = compact_for_node(state, "readme")
+    compact_for_node(state, "dockerizer")
+
+    readme, dockerizer = state["message_compaction"]
+    assert readme["node"] == "readme" and readme["budget"] == 400
+    assert readme["tokens_after"] == count_message_tokens(compacted) <= 400
+    assert readme["tokens_before"] == count_message_tokens(state["messages"])
+    assert readme["tokens_saved"] == readme["tokens_before"] - readme["tokens_after"] > 0
+    # Under the default budget only the older file versions are dropped
+    assert dockerizer["budget"] == node_budget("dockerizer")
+    assert 0 < dockerizer["tokens_saved"] < readme["tokens_saved"]
+    # The state keeps the full history
+    assert len(state["messages"]) == len(history(turns=KEEP_RECENT_TURNS + 3))
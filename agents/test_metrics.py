@@ -0,0 +1,75 @@
+# agents/test_metrics.py
+import asyncio
+import httpx
+import openai
+import pytest
+from . import metrics
+from .metrics import count_llm_retries, note_retryable_response, start_run
+
+COMPLETION = {
+    "id": "c1",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o-mini",
+    "choices": [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "ok"},
+            "finish_reason": "stop",
+        }
+    ],
+}
+
+
+# statuses: responses in order, the last one repeats
+def openai_client(statuses, max_retries=2):
+    responses = iter(statuses)
+    last = [None]
+
+    def handle(request):
+        last[0] = next(responses, last[0])
+        if last[0] == 200:
+            return httpx.Response(200, json=COMPLETION)
+        # retry-after-ms keeps the client's backoff short
+        return httpx.Response(last[0], json={"error": {}}, headers={"retry-after-ms": "1"})
+
+    http_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handle),
+        event_hooks={"request": [count_llm_retries], "response": [note_retryable_response]},
+    )
+    return openai.AsyncOpenAI(api_key="test", http_client=http_client, max_retries=max_retries)
+
+
+async def complete(client, prompt="hi"):
+    return await client.chat.completions.create(
+        model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}]
+    )
+
+
+@pytest.mark.parametrize(
+    "statuses, retries, succeeds",
+    [
+        pytest.param([200], 0, True, id="first attempt"),
+        pytest.param([429, 503, 200], 2, True, id="retried until it succeeds"),
+        pytest.param([429], 2, False, id="gives up"),
+        pytest.param([400], 0, False, id="not retryable"),
+    ],
+)
+def test_only_retried_attempts_are_counted(monkeypatch, statuses, retries, succeeds):
+    monkeypatch.setattr(metrics, "llm_retries", metrics.Counter("test_retries", ""))
+
+    async def call():
+        run = start_run("run1")
+        client = openai_client(statuses)
+        try:
+            await complete(client)
+        except openai.APIStatusError:
+            assert not succeeds
+        # A later call of the same task is not a retry of the failed one
+        client = openai_client([200])
+        await complete(client, "other")
+        return run
+
+    run = asyncio.run(call())
+    assert run.llm_retries == retries
+    assert sum(metrics.llm_retries.values.values()) == retries
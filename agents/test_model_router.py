@@ -0,0 +1,145 @@
+# agents/test_model_router.py
+import asyncio
+import importlib
+import pytest
+from schemas import Code, ErrorMessage, PlannedFile, ProjectPlan
+from . import model_router
+from .common import llm, llm_code
+from .model_router import choose_tier, route_model, settle_final_routes, settle_routes
+
+# agents/__init__.py re-exports the node functions under the module's name
+planner_module = importlib.import_module("agents.code_planner_agent")
+
+
+@pytest.fixture
+def thresholds(monkeypatch):
+    monkeypatch.setattr(model_router, "MODEL_ROUTING", True)
+    monkeypatch.setattr(model_router, "ROUTER_FAST_MAX_PROMPT_TOKENS", 1000)
+    monkeypatch.setattr(model_router, "ROUTER_FAST_MAX_FILES", 4)
+    monkeypatch.setattr(model_router, "ROUTER_ESCALATE_AFTER", 2)
+    monkeypatch.setattr(model_router, "ROUTER_SMALL_TASK_TOKENS", 0)
+    monkeypatch.setattr(model_router, "ROUTER_STRONG_ERROR_CLASSES", {"RecursionError"})
+
+
+# (node, prompt tokens, file count, error class, failed iterations) -> (tier, reason)
+TIER_CASES = [
+    pytest.param("debug_code", 100, 1, None, 0, ("fast", "default"), id="fast by default"),
+    pytest.param("programmer", 100, 1, None, 0, ("strong", "default"), id="generation is strong"),
+    pytest.param("debug_code", 1000, 4, None, 0, ("fast", "default"), id="at the limits"),
+    pytest.param("debug_code", 1001, 1, None, 0, ("strong", "prompt_tokens"), id="prompt too long"),
+    pytest.param("dockerizer", 100, 5, None, 0, ("strong", "file_count"), id="too many files"),
+    pytest.param("debug_code", 100, 1, "RecursionError", 0, ("strong", "error_class"), id="hard error"),
+    pytest.param("debug_code", 100, 1, "TypeError", 0, ("fast", "default"), id="other error"),
+    pytest.param("debug_code", 100, 1, None, 1, ("fast", "default"), id="one failure"),
+    pytest.param("debug_code", 100, 1, None, 2, ("strong", "escalated"), id="escalated"),
+    pytest.param("debug_code", 5000, 9, None, 2, ("strong", "escalated"), id="escalation first"),
+]
+
+
+@pytest.mark.parametrize("node, tokens, files, error_class, failures, expected", TIER_CASES)
+def test_choose_tier(thresholds, node, tokens, files, error_class, failures, expected):
+    assert choose_tier(node, tokens, files, error_class, failures) == expected
+
+
+def test_small_generation_task_goes_fast(thresholds, monkeypatch):
+    monkeypatch.setattr(model_router, "ROUTER_SMALL_TASK_TOKENS", 500)
+    assert choose_tier("programmer", 499, 1, None, 0) == ("fast", "small_task")
+    assert choose_tier("programmer", 500, 1, None, 0) == ("strong", "default")
+
+
+def test_routing_disabled_uses_the_defaults(thresholds, monkeypatch):
+    monkeypatch.setattr(model_router, "MODEL_ROUTING", False)
+    assert choose_tier("debug_code", 5000, 9, "RecursionError", 3) == ("fast", "default")
+    assert choose_tier("planner", 10, 1, None, 0) == ("strong", "default")
+
+
+def test_escalates_after_failed_executions(thresholds):
+    state = {"route_report": []}
+    error = ErrorMessage(type="Docker Execution Error", details="boom")
+    failed = {"error": error}
+
+    for _ in range(2):
+        assert route_model(state, "debug_code", "fix it", error=error) is llm
+        state.update(settle_routes(state, failed))
+    # ROUTER_ESCALATE_AFTER failed iterations of the node
+    assert route_model(state, "debug_code", "fix it", error=error) is llm_code
+    assert state["route_report"][-1]["reason"] == "escalated"
+    # Failures of other nodes don't count
+    assert route_model(state, "debug_docker", "fix it", error=error) is llm
+
+
+def test_settle_routes(thresholds):
+    state = {"route_report": []}
+    route_model(state, "programmer", "write it")
+    route_model(state, "dockerizer", "dockerize it")
+    update = settle_routes(state, {"error": None})
+    assert [entry["passed"] for entry in update["route_report"]] == [True, True]
+    state.update(update)
+
+    # Only open routes are settled, nothing open gives no update
+    assert settle_routes(state, {"error": ErrorMessage(type="x", details="y")}) == {}
+    route_model(state, "readme", "document it")
+    update = settle_routes(state, state)
+    assert [entry["passed"] for entry in update["route_report"]] == [True, True, True]
+
+
+@pytest.mark.parametrize(
+    "error, passed",
+    [
+        pytest.param(None, True, id="succeeded"),
+        pytest.param(ErrorMessage(type="x", details="y"), False, id="failed"),
+    ],
+)
+def test_settle_final_routes(thresholds, error, passed):
+    state = {"route_report": [], "error": error}
+    assert settle_final_routes(state) == []
+    route_model(state, "debug_code", "fix it")
+    state.update(settle_routes(state, {"error": None}))
+    route_model(state, "readme", "document it")
+
+    report = settle_final_routes(state)
+    assert [entry["passed"] for entry in report] == [True, passed]
+    # Settled routes are kept as they are
+    assert settle_final_routes({**state, "route_report": report}) == report
+
+
+def test_file_generation_routes_are_settled(thresholds, monkeypatch):
+    async def ainvoke_structured(model, schema, prompt):
+        return Code(
+            description="d", filename="x", executable_code=False, code="", programming_language="python"
+        )
+
+    monkeypatch.setattr(planner_module, "ainvoke_structured", ainvoke_structured)
+    plan = ProjectPlan(
+        description="calculator",
+        execution_command="python main.py",
+        files=[
+            PlannedFile(
+                filename=name,
+                executable_code=name == "main.py",
+                programming_language="python",
+                role="r",
+                interface="i",
+            )
+            for name in ("main.py", "calc.py")
+        ],
+    )
+    outputs = [
+        asyncio.run(
+            planner_module.file_generator_agent({"requirement": "calc", "plan": plan, "file": file})
+        )
+        for file in plan.files
+    ]
+    assert [output["file_routes"][0]["file"] for output in outputs] == ["main.py", "calc.py"]
+
+    state = {
+        "plan": plan,
+        "messages": [],
+        "route_report": [],
+        "generated_files": [code for output in outputs for code in output["generated_files"]],
+        "file_routes": [route for output in outputs for route in output["file_routes"]],
+    }
+    state = asyncio.run(planner_module.merge_generated_files_agent(state))
+    assert [entry["node"] for entry in state["route_report"]] == ["file_programmer"] * 2
+    update = settle_routes(state, {"error": None})
+    assert [entry["passed"] for entry in update["route_report"]] == [True, True]
@@ -0,0 +1,156 @@
+# agents/test_patching.py
+import pytest
+from schemas import CodePatch, PatchHunk, PatchSet
+from .patching import apply_hunk, apply_patch, apply_patch_set
+
+SOURCE = "def add(a, b):\n    return a - b\n\n\ndef sub(a, b):\n    return a - b\n"
+
+
+def hunk(search: str, replace: str) -> PatchHunk:
+    return PatchHunk(search=search, replace=replace)
+
+
+def patch(filename: str, *hunks: PatchHunk) -> CodePatch:
+    return CodePatch(description="fix", filename=filename, hunks=list(hunks))
+
+
+# (search, replace, expected code or None, expected reason)
+HUNK_CASES = [
+    pytest.param(
+        "def add(a, b):\n    return a - b\n",
+        "def add(a, b):\n    return a + b\n",
+        SOURCE.replace("return a - b", "return a + b", 1),
+        "",
+        id="exact match",
+    ),
+    pytest.param("    return a - b\n", "    return 0\n", None, "search text matches 2 places", id="ambiguous"),
+    pytest.param("", "x = 1\n", None, "empty search text", id="empty search"),
+    pytest.param("  \n\n", "x = 1\n", None, "empty search text", id="blank search"),
+    pytest.param("def mul(a, b):", "def mul(x, y):", None, "search text not found", id="not found"),
+    pytest.param(
+        "def sub(a, b):   \n    return a - b  ",
+        "def sub(a, b):\n    return b - a",
+        SOURCE[: SOURCE.rindex("return a - b")] + "return b - a\n",
+        "",
+        id="trailing whitespace fallback",
+    ),
+    pytest.param(
+        "def sub(a, b):\n    return a - b",
+        "",
+        SOURCE.replace("def sub(a, b):\n    return a - b", ""),
+        "",
+        id="delete lines",
+    ),
+    pytest.param(
+        "def add(a, b):\\n    return a - b",
+        "def add(a, b):\\n    return a + b",
+        SOURCE.replace("return a - b", "return a + b", 1),
+        "",
+        id="escaped newlines",
+    ),
+]
+
+
+@pytest.mark.parametrize("search, replace, expected, reason", HUNK_CASES)
+def test_apply_hunk(search, replace, expected, reason):
+    assert apply_hunk(SOURCE, hunk(search, replace)) == (expected, reason)
+
+
+def test_trailing_whitespace_fallback_keeps_final_newline():
+    code, reason = apply_hunk("x = 1 \ny = 2\n", hunk("x = 1\ny = 2", "x = 3\ny = 4"))
+    assert (code, reason) == ("x = 3\ny = 4\n", "")
+
+
+def test_apply_patch_applies_hunks_in_order():
+    result = apply_patch(
+        SOURCE,
+        patch(
+            "calc.py",
+            hunk("def add(a, b):\n    return a - b", "def add(a, b):\n    return a + b"),
+            hunk("return a + b", "return b + a"),
+        ),
+    )
+    assert result.ok
+    assert result.applied == [0, 1]
+    assert "return b + a" in result.code
+
+
+def test_apply_patch_is_all_or_nothing():
+    result = apply_patch(
+        SOURCE,
+        patch(
+            "calc.py",
+            hunk("def add(a, b):\n    return a - b", "def add(a, b):\n    return a + b"),
+            hunk("return a * b", "return 0"),
+        ),
+    )
+    assert not result.ok
+    assert result.code is None
+    assert result.applied == [0]
+    assert result.rejected == [(1, "search text not found")]
+    assert result.report()["fallback"] is True
+
+
+def test_apply_patch_without_hunks_is_rejected():
+    result = apply_patch(SOURCE, patch("calc.py"))
+    assert result.rejected == [(0, "no hunks")]
+
+
+SOURCES = {
+    "calc.py": SOURCE,
+    "main.py": "from calc import add\n\nprint(add(1, 2))\n",
+}
+
+# (patches, expected changed files or None, rejected reasons per file)
+PATCH_SET_CASES = [
+    pytest.param(
+        [
+            patch("calc.py", hunk("def add(a, b):\n    return a - b", "def add(a, b):\n    return a + b")),
+            patch("main.py", hunk("print(add(1, 2))", "print(add(2, 3))")),
+        ],
+        {
+            "calc.py": SOURCE.replace("return a - b", "return a + b", 1),
+            "main.py": "from calc import add\n\nprint(add(2, 3))\n",
+        },
+        {"calc.py": [], "main.py": []},
+        id="all files patched",
+    ),
+    pytest.param(
+        [
+            patch("calc.py", hunk("def add(a, b):\n    return a - b", "def add(a, b):\n    return a + b")),
+            patch("main.py", hunk("print(add(9, 9))", "print(add(2, 3))")),
+        ],
+        None,
+        {"calc.py": [], "main.py": [(0, "search text not found")]},
+        id="one rejected file rolls back the set",
+    ),
+    pytest.param(
+        [
+            patch("calc.py", hunk("def add(a, b):\n    return a - b", "def add(a, b):\n    return a + b")),
+            patch("utils.py", hunk("x = 1", "x = 2")),
+        ],
+        None,
+        {"calc.py": [], "utils.py": [(0, "file was not sent in full")]},
+        id="file not sent in full",
+    ),
+    pytest.param(
+        [
+            patch("calc.py", hunk("def add(a, b):\n    return a - b", "def add(a, b):\n    return a + b")),
+            patch("calc.py", hunk("def sub(a, b):\n    return a - b", "def sub(a, b):\n    return b - a")),
+        ],
+        {"calc.py": SOURCE.replace("return a - b", "return a + b", 1).replace("a - b", "b - a")},
+        {"calc.py": []},
+        id="two patches of one file",
+    ),
+    pytest.param([], None, {}, id="no patches"),
+]
+
+
+@pytest.mark.parametrize("patches, expected, rejected", PATCH_SET_CASES)
+def test_apply_patch_set(patches, expected, rejected):
+    sources = dict(SOURCES)
+    patched, results = apply_patch_set(sources, PatchSet(description="fix", patches=patches))
+    assert patched == expected
+    assert {result.filename: result.rejected for result in results} == rejected
+    # The sources are never modified, a rejected set leaves every file as it was
+    assert sources == SOURCES
@@ -0,0 +1,175 @@
+# agents/test_run_outcome.py
+import asyncio
+import pytest
+from . import run_outcome as run_outcome_module
+from .docker_driver import CommandResult, ComposeProject
+from .run_outcome import (
+    LogCollector,
+    _port_ready,
+    container_exit_codes,
+    published_ports,
+    wait_until_ready,
+)
+
+COMPOSE = """services:
+  web:
+    build: .
+    ports:
+      - "8080:80"
+    labels:
+      timeless.readiness: http
+  worker:
+    build: ./worker
+    ports: ["127.0.0.1:9000:9000/tcp"]
+    labels: ["timeless.readiness=tcp", "other=1"]
+  db:
+    image: postgres:16
+    ports:
+      - target: 5432
+        published: 5433
+  job:
+    build: ./job
+"""
+
+
+def test_published_ports_with_probe(tmp_path, monkeypatch):
+    (tmp_path / "compose.yaml").write_text(COMPOSE)
+    assert published_ports(str(tmp_path)) == {8080: "http", 9000: "tcp", 5433: "tcp"}
+
+    # Services without a label use READINESS_PROBE
+    monkeypatch.setattr(run_outcome_module, "READINESS_PROBE", "http")
+    assert published_ports(str(tmp_path))[5433] == "http"
+
+
+def test_published_ports_without_compose(tmp_path):
+    assert published_ports(str(tmp_path)) == {}
+
+
+# Server on a free local port, handle(reader, writer) serves each connection
+async def serve(handle):
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def hold_open(reader, writer):
+    # A raw TCP service (database, websocket-only app): accepts and waits for the client
+    await reader.read()
+    writer.close()
+
+
+async def close_at_once(reader, writer):
+    # What docker-proxy does while nothing listens inside the container yet
+    writer.close()
+
+
+async def answer_http(reader, writer):
+    await reader.readuntil(b"\r\n\r\n")
+    writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+    await writer.drain()
+    writer.close()
+
+
+@pytest.mark.parametrize(
+    "handle, probe, expected",
+    [
+        pytest.param(hold_open, "tcp", True, id="tcp service"),
+        pytest.param(hold_open, "http", False, id="tcp service probed with http"),
+        pytest.param(close_at_once, "tcp", False, id="connection closed at once"),
+        pytest.param(answer_http, "http", True, id="any http status"),
+        pytest.param(answer_http, "tcp", True, id="http service probed with tcp"),
+    ],
+)
+def test_port_ready(handle, probe, expected):
+    async def check():
+        server, port = await serve(handle)
+        async with server:
+            return await _port_ready(port, probe)
+
+    assert asyncio.run(check()) is expected
+
+
+def test_port_ready_without_listener():
+    async def check():
+        server, port = await serve(hold_open)
+        server.close()
+        await server.wait_closed()
+        return await _port_ready(port, "tcp")
+
+    assert asyncio.run(check()) is False
+
+
+def test_wait_until_ready_for_a_tcp_only_service():
+    async def wait():
+        server, port = await serve(hold_open)
+        async with server:
+            return await asyncio.wait_for(wait_until_ready({port: "tcp"}), 5)
+
+    assert asyncio.run(wait()) is True
+
+
+def test_wait_until_ready_waits_for_every_port():
+    async def wait():
+        server, port = await serve(hold_open)
+        closed, closed_port = await serve(hold_open)
+        closed.close()
+        await closed.wait_closed()
+        async with server:
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(wait_until_ready({port: "tcp", closed_port: "tcp"}), 1.5)
+
+    asyncio.run(wait())
+
+
+def test_container_exit_codes(monkeypatch):
+    commands = []
+
+    async def run_command(command, **kwargs):
+        commands.append(command)
+        return CommandResult(0, "c1\nc2\nc3\n")
+
+    async def docker(*args, **kwargs):
+        commands.append(list(args))
+        return CommandResult(
+            0, "/calc-app-run1 exited 1\n/calc-db-run1 running 0\n/calc-job-run1 exited 0\n"
+        )
+
+    monkeypatch.setattr(run_outcome_module, "run_command", run_command)
+    monkeypatch.setattr(run_outcome_module, "docker", docker)
+    project = ComposeProject("timeless-run1", "/tmp")
+
+    exit_codes = asyncio.run(container_exit_codes(project))
+    assert exit_codes == {"calc-app-run1": 1, "calc-db-run1": None, "calc-job-run1": 0}
+    assert commands[0][-3:] == ["ps", "-a", "-q"]
+    assert commands[1][-3:] == ["c1", "c2", "c3"]
+
+
+def test_container_exit_codes_without_containers(monkeypatch):
+    async def run_command(command, **kwargs):
+        return CommandResult(0, "")
+
+    monkeypatch.setattr(run_outcome_module, "run_command", run_command)
+    assert asyncio.run(container_exit_codes(ComposeProject("timeless-run1", "/tmp"))) == {}
+
+
+def test_log_collector_container_exits_after_an_error():
+    logs = LogCollector()
+    for line in [
+        "Starting calculator\n",
+        "Traceback (most recent call last):\n",
+        '  File "/app/main.py", line 1, in <module>\n',
+        "ZeroDivisionError: division by zero\n",
+    ]:
+        logs.feed(line)
+    # Error output counts only once the container has exited
+    assert logs.error_output == ""
+    logs.feed("app-1 exited with code 1\n")
+    assert logs.exited_with_error
+    assert logs.error_output.startswith("Traceback") and "ZeroDivisionError" in logs.error_output
+    assert logs.output.startswith("Starting calculator")
+
+
+def test_log_collector_clean_exit():
+    logs = LogCollector()
+    logs.feed("Result: 3\n")
+    logs.feed("app-1 exited with code 0\n")
+    assert not logs.exited_with_error and logs.error_output == ""
@@ -0,0 +1,170 @@
+# agents/test_runtime_pool.py
+import asyncio
+import time
+import pytest
+from . import runtime_pool as runtime_pool_module
+from .docker_driver import CommandResult
+from .runtime_pool import (
+    PYTHON_DEPS_DIR,
+    WORKSPACE,
+    PooledContainer,
+    RuntimePool,
+    TemplatePlan,
+    match_template,
+)
+
+COMPOSE = "services:\n  app:\n    build: .\n"
+
+
+def write_project(src_dir, dockerfile: str, compose: str = COMPOSE):
+    (src_dir / "Dockerfile").write_text(dockerfile)
+    (src_dir / "compose.yaml").write_text(compose)
+
+
+def test_template_is_matched(tmp_path):
+    write_project(
+        tmp_path,
+        "FROM python:3.12-slim\nWORKDIR /app\nENV MODE=test\nCOPY requirements.txt .\n"
+        "RUN pip install -r requirements.txt\nCOPY . .\nCMD [\"python\", \"main.py\"]\n",
+    )
+    plan = match_template(str(tmp_path))
+    assert plan is not None
+    assert plan.image == "python:3.12-slim"
+    assert plan.setup_commands == [
+        f"pip install -r requirements.txt --target {WORKSPACE}/{PYTHON_DEPS_DIR}"
+    ]
+    assert plan.command == "python main.py"
+    assert plan.environment == {"MODE": "test", "PYTHONPATH": f"{WORKSPACE}/{PYTHON_DEPS_DIR}"}
+
+
+@pytest.mark.parametrize(
+    "dockerfile",
+    [
+        pytest.param("FROM node:lts-slim\nWORKDIR /app\nCOPY . .\nCMD node index.js\n", id="workdir /app"),
+        pytest.param(
+            "FROM node:lts-slim\nWORKDIR /\nWORKDIR app\nCOPY . ./\nCMD node index.js\n",
+            id="relative workdir",
+        ),
+        pytest.param(
+            "FROM node:lts-slim\nWORKDIR /app\nCOPY . /app/\nCMD [\"node\", \"/app/index.js\"]\n",
+            id="absolute copy",
+        ),
+    ],
+)
+def test_workdir_app_is_accepted(tmp_path, dockerfile):
+    write_project(tmp_path, dockerfile)
+    assert match_template(str(tmp_path)) is not None
+
+
+@pytest.mark.parametrize(
+    "dockerfile, compose",
+    [
+        pytest.param(
+            "FROM node:lts-slim\nWORKDIR /usr/src/app\nCOPY . .\nCMD [\"node\", \"/usr/src/app/index.js\"]\n",
+            COMPOSE,
+            id="other workdir",
+        ),
+        pytest.param(
+            "FROM python:3.12-slim\nCOPY . .\nCMD python main.py\n",
+            COMPOSE,
+            id="no workdir",
+        ),
+        pytest.param(
+            "FROM python:3.12-slim\nWORKDIR /app\nCOPY . /srv\nCMD python /srv/main.py\n",
+            COMPOSE,
+            id="copy outside workdir",
+        ),
+        pytest.param(
+            "FROM python:3.12-slim\nWORKDIR /app\nCOPY . .\nCMD python main.py\n",
+            COMPOSE + "    working_dir: /srv\n",
+            id="compose working_dir",
+        ),
+        pytest.param(
+            "FROM python:3.12-slim\nWORKDIR /app\nCOPY . .\nCMD python main.py\n",
+            COMPOSE + "    ports:\n      - 8080:80\n",
+            id="service with ports",
+        ),
+        pytest.param(
+            "FROM python:3.12-slim\nWORKDIR /app\nCOPY . .\nRUN apt-get update\nCMD python main.py\n",
+            COMPOSE,
+            id="other RUN",
+        ),
+        pytest.param(
+            "FROM golang:1.22\nWORKDIR /app\nCOPY . .\nCMD go run .\n",
+            COMPOSE,
+            id="image not pooled",
+        ),
+        pytest.param(
+            "FROM python:3.12-slim AS base\nWORKDIR /app\nCOPY . .\nCMD python main.py\n",
+            COMPOSE,
+            id="multi-stage",
+        ),
+    ],
+)
+def test_non_templates_are_rejected(tmp_path, dockerfile, compose):
+    write_project(tmp_path, dockerfile, compose)
+    assert match_template(str(tmp_path)) is None
+
+
+@pytest.fixture
+def docker_calls(monkeypatch):
+    calls = []
+
+    async def docker(*args, **kwargs):
+        calls.append(args)
+        return CommandResult(0, "")
+
+    async def run_command(command, **kwargs):
+        calls.append(tuple(command))
+        return CommandResult(0, "")
+
+    monkeypatch.setattr(runtime_pool_module, "docker", docker)
+    monkeypatch.setattr(runtime_pool_module, "run_command", run_command)
+    return calls
+
+
+def test_sweep_removes_idle_containers(tmp_path, docker_calls):
+    image = "python:3.12-slim"
+    pool = RuntimePool([image], size=2, idle_timeout=0.05)
+
+    async def sweep():
+        idle = PooledContainer("idle", image, str(tmp_path / "idle"), last_used=time.time() - 1)
+        busy = PooledContainer("busy", image, str(tmp_path / "busy"), last_used=0, busy=True)
+        pool._containers[image] = [idle, busy]
+        # warm_up starts the sweep, the pool is already full so nothing else is started
+        await pool.warm_up()
+        await asyncio.sleep(0.2)
+        return pool._containers[image]
+
+    assert [c.name for c in asyncio.run(sweep())] == ["busy"]
+    assert docker_calls == [("rm", "-f", "idle")]
+
+
+@pytest.mark.parametrize(
+    "reset, same_dependencies, installs",
+    [
+        pytest.param("dependencies", True, False, id="unchanged dependencies are kept"),
+        pytest.param("dependencies", False, True, id="changed dependencies"),
+        pytest.param("full", True, True, id="full reset"),
+    ],
+)
+def test_run_resets_the_workspace(tmp_path, docker_calls, reset, same_dependencies, installs):
+    image = "python:3.12-slim"
+    pool = RuntimePool([image], size=1, idle_timeout=600, reset=reset)
+    plan = TemplatePlan(image, ["pip install -r requirements.txt"], "python main.py")
+    src_dir = tmp_path / "src"
+    src_dir.mkdir()
+    (src_dir / "requirements.txt").write_text("httpx\n")
+    container = PooledContainer("c1", image, str(tmp_path / "c1"))
+    if same_dependencies:
+        container.dependency_hash = runtime_pool_module._dependency_hash(str(src_dir), plan)
+    pool._containers[image] = [container]
+
+    result = asyncio.run(pool.run(plan, str(src_dir), timeout=5))
+    assert result.setup_ok and result.exit_code == 0
+    cleanup = next(call[-1] for call in docker_calls if "find" in call[-1])
+    assert (f"! -name {PYTHON_DEPS_DIR}" in cleanup) is (not installs)
+    assert any("pip install" in call[-1] for call in docker_calls) is installs
+    # The run's processes are killed when the container goes back to the pool
+    assert "kill -9 -1" in docker_calls[-1][-1] and not container.busy
+
@@ -0,0 +1,180 @@
+# agents/test_speculative_fix_agent.py
+import asyncio
+import importlib
+import pytest
+from schemas import Code, ErrorMessage
+from .common import llm, llm_code
+from .docker_driver import CommandResult
+from .run_outcome import published_ports
+from .workspace import write_compose_files
+
+# agents/__init__.py re-exports the node function, the module is needed here
+agent_module = importlib.import_module("agents.speculative_fix_agent")
+
+CODE = {
+    "description": "calculator",
+    "filename": "main.py",
+    "executable_code": True,
+    "code": "print(1 / 1)\n",
+    "programming_language": "python",
+}
+
+
+@pytest.mark.parametrize(
+    "base, tier, fix_models, expected_model",
+    [
+        pytest.param(llm, "fast", [], llm.model_name, id="fast route"),
+        pytest.param(llm_code, "strong", [], llm_code.model_name, id="escalated route"),
+        pytest.param(llm, "fast", ["gpt-4.1-mini"], "gpt-4.1-mini", id="configured models"),
+        pytest.param(llm_code, "strong", ["gpt-4.1-mini"], llm_code.model_name, id="strong keeps its model"),
+    ],
+)
+def test_candidate_model(monkeypatch, base, tier, fix_models, expected_model):
+    monkeypatch.setattr(agent_module, "SPECULATIVE_FIX_MODELS", fix_models)
+    monkeypatch.setattr(agent_module, "SPECULATIVE_FIX_TEMPERATURES", [0.0, 0.6])
+    models = [agent_module.candidate_model(i, base, tier) for i in range(3)]
+    assert [m.model_name for m in models] == [expected_model] * 3
+    assert [m.temperature for m in models] == [0.0, 0.6, 0.0]
+    assert models[0] is models[2]
+    assert models[0].callbacks == base.callbacks
+
+
+def route(node: str, passed) -> dict:
+    return {"node": node, "tier": "fast", "model": llm.model_name, "reason": "default", "passed": passed}
+
+
+@pytest.mark.parametrize(
+    "route_report, tier",
+    [
+        pytest.param([], "fast", id="first pass"),
+        pytest.param([route("debug_code", False)], "strong", id="after a failed fix"),
+    ],
+)
+def test_candidates_use_the_routed_model(monkeypatch, route_report, tier):
+    models = []
+
+    async def run_candidate(state, candidate, full_files, original_code):
+        models.append(candidate.model)
+        return candidate
+
+    async def cleanup_candidates(candidates):
+        pass
+
+    monkeypatch.setattr(agent_module, "SPECULATIVE_FIXES", 2)
+    monkeypatch.setattr(agent_module, "fix_context", lambda state: (["main.py"], "print(1 / 0)"))
+    monkeypatch.setattr(agent_module, "run_candidate", run_candidate)
+    monkeypatch.setattr(agent_module, "cleanup_candidates", cleanup_candidates)
+    state = {
+        "run_id": "run1",
+        "iterations": 1,
+        "error": ErrorMessage(type="Docker Execution Error", details="ZeroDivisionError"),
+        "route_report": list(route_report),
+    }
+
+    asyncio.run(agent_module.speculative_debug_code_agent(state))
+
+    expected = (llm_code if tier == "strong" else llm).model_name
+    assert [model.model_name for model in models] == [expected, expected]
+    # One route per pass, settled by the executor
+    assert len(state["route_report"]) == len(route_report) + 1
+    assert state["route_report"][-1]["node"] == "debug_code"
+    assert state["route_report"][-1]["tier"] == tier
+    assert state["route_report"][-1]["passed"] is None
+    # No candidate produced files, the route names the models they ran on
+    assert state["route_report"][-1]["model"] == expected
+
+
+def test_route_names_the_promoted_candidates_model(monkeypatch):
+    async def run_candidate(state, candidate, full_files, original_code):
+        candidate.updates = [Code(**CODE)]
+        # Only the second candidate's fix passes
+        candidate.result = {"error": None if candidate.index == 1 else "still failing"}
+        return candidate
+
+    async def cleanup_candidates(candidates):
+        pass
+
+    monkeypatch.setattr(agent_module, "SPECULATIVE_FIXES", 2)
+    monkeypatch.setattr(agent_module, "SPECULATIVE_FIX_MODELS", ["gpt-4.1-mini", "gpt-4.1-nano"])
+    monkeypatch.setattr(agent_module, "fix_context", lambda state: (["main.py"], "print(1 / 0)"))
+    monkeypatch.setattr(agent_module, "run_candidate", run_candidate)
+    monkeypatch.setattr(agent_module, "cleanup_candidates", cleanup_candidates)
+    monkeypatch.setattr(agent_module, "apply_fix", lambda state, updates: None)
+    monkeypatch.setattr(agent_module, "snapshot_hashes", lambda src_dir: {})
+    monkeypatch.setattr(agent_module, "get_src_dir", lambda state: "/tmp")
+    state = {
+        "run_id": "run1",
+        "iterations": 1,
+        "error": ErrorMessage(type="Docker Execution Error", details="ZeroDivisionError"),
+        "route_report": [],
+    }
+
+    asyncio.run(agent_module.speculative_debug_code_agent(state))
+
+    assert state["speculative_report"][-1]["winner"] == 1
+    assert state["route_report"][-1]["tier"] == "fast"
+    assert state["route_report"][-1]["model"] == "gpt-4.1-nano"
+
+
+def test_cleanup_removes_candidate_images(tmp_path, monkeypatch):
+    commands, docker_calls = [], []
+
+    async def run_command(command, **kwargs):
+        commands.append(command)
+        return CommandResult(0, "")
+
+    async def docker(*args, **kwargs):
+        docker_calls.append(args)
+        return CommandResult(0, "")
+
+    monkeypatch.setattr(agent_module, "run_command", run_command)
+    monkeypatch.setattr(agent_module, "docker", docker)
+    monkeypatch.setattr(agent_module, "get_workspace_dir", lambda run_id: str(tmp_path / run_id))
+
+    candidates = []
+    for index, started in enumerate((True, False)):
+        run_id = f"run1-cand{index}"
+        src_dir = tmp_path / run_id / "src"
+        src_dir.mkdir(parents=True)
+        write_compose_files(
+            str(src_dir),
+            "services:\n  app:\n    build: .\n    image: calc-app\n"
+            "  worker:\n    build: ./worker\n  db:\n    image: postgres:16\n",
+            run_id,
+        )
+        candidates.append(
+            agent_module.Candidate(index=index, run_id=run_id, model=llm, started_docker=started)
+        )
+
+    asyncio.run(agent_module.cleanup_candidates(candidates))
+
+    # Only the candidate that ran is brought down, its built images are removed by name
+    assert len(commands) == 1 and "down" in commands[0] and "--rmi" not in commands[0]
+    assert str(tmp_path / "run1-cand0" / "compose.run.yaml") in commands[0]
+    assert docker_calls == [
+        ("image", "rm", "calc-app-run1-cand0", "timeless-run1-cand0-worker"),
+    ]
+    assert not any(path.exists() for path in tmp_path.iterdir())
+
+
+def test_clone_workspace_scopes_the_compose_file_for_the_candidate(tmp_path, monkeypatch):
+    src_dir = tmp_path / "run1" / "src"
+    src_dir.mkdir(parents=True)
+    compose = 'services:\n  app:\n    build: .\n    container_name: calc\n    ports: ["8080:80"]\n'
+    write_compose_files(str(src_dir), compose, "run1")
+    (src_dir / "main.py").write_text("print(1)\n")
+
+    def ensure_workspace(run_id):
+        (tmp_path / run_id / "src").mkdir(parents=True)
+        return str(tmp_path / run_id / "src")
+
+    monkeypatch.setattr(agent_module, "get_src_dir", lambda state: str(src_dir))
+    monkeypatch.setattr(agent_module, "ensure_workspace", ensure_workspace)
+    candidate_src = agent_module.clone_workspace({"run_id": "run1"}, "run1-cand0")
+
+    assert (tmp_path / "run1-cand0" / "src" / "compose.yaml").read_text() == compose
+    assert (tmp_path / "run1-cand0" / "src" / "main.py").exists()
+    run_compose = (tmp_path / "run1-cand0" / "compose.run.yaml").read_text()
+    assert "container_name: calc-run1-cand0" in run_compose
+    assert published_ports(candidate_src).keys().isdisjoint(published_ports(str(src_dir)))
+
@@ -0,0 +1,238 @@
+# agents/test_symbol_index.py
+import pytest
+from schemas import Code, ErrorFrame
+from . import symbol_index as symbol_index_module
+from .symbol_index import (
+    build_fix_context,
+    build_symbol_index,
+    enclosing_symbol,
+    related_symbols,
+)
+
+MAIN_PY = """from calc.ops import divide, unused
+from report import show
+
+
+def main():
+    result = divide(1, 0)
+    show(result)
+
+
+if __name__ == "__main__":
+    main()
+"""
+
+OPS_PY = """import math
+
+
+def divide(a, b):
+    return a / b
+
+
+def unused():
+    return math.pi
+
+
+class Calculator:
+    @staticmethod
+    def run(a, b):
+        return divide(a, b)
+"""
+
+REPORT_PY = """def show(value):
+    print(f"Result: {value}")
+"""
+
+SERVER_JS = """import express from 'express';
+import { computeTotal, formatPrice as format } from './cart';
+const db = require('./db/index');
+
+export async function handleOrder(req, res) {
+  const items = await db.load(req.params.id);
+  const total = computeTotal(items);
+  res.send(format(total));
+}
+
+const ping = (req, res) => res.send('pong');
+"""
+
+CART_JS = """export function computeTotal(items) {
+  // Sum the prices: { not a block }
+  return items.reduce((a, b) => a + b.price, 0);
+}
+
+export const formatPrice = (value) => {
+  return `${value.toFixed(2)} EUR`;
+};
+
+export class Cart {
+  constructor(items) {
+    this.items = items;
+  }
+
+  total() {
+    return computeTotal(this.items);
+  }
+}
+"""
+
+DB_JS = """function load(id) {
+  return [];
+}
+
+module.exports = { load };
+"""
+
+
+def code(filename: str, source: str) -> Code:
+    return Code(
+        description=filename,
+        filename=filename,
+        executable_code=False,
+        code=source,
+        programming_language="python" if filename.endswith(".py") else "javascript",
+    )
+
+
+PYTHON_CODES = [code("main.py", MAIN_PY), code("calc/ops.py", OPS_PY), code("report.py", REPORT_PY)]
+JS_CODES = [code("server.js", SERVER_JS), code("cart.js", CART_JS), code("db/index.js", DB_JS)]
+
+
+def spans(index: dict, filename: str) -> dict:
+    return {s["name"]: (s["kind"], s["start"], s["end"]) for s in index[filename]["symbols"]}
+
+
+def names(related) -> list:
+    return [(filename, symbol["name"]) for filename, symbol in related]
+
+
+def test_python_index():
+    index = build_symbol_index(PYTHON_CODES)
+    assert spans(index, "calc/ops.py") == {
+        "divide": ("function", 4, 5),
+        "unused": ("function", 8, 9),
+        "Calculator": ("class", 12, 15),
+        "Calculator.run": ("function", 13, 15),  # decorator included
+    }
+    main = index["main.py"]
+    assert [(i["module"], i["source"], i["names"]) for i in main["imports"]] == [
+        ("calc.ops", "calc/ops.py", ["divide", "unused"]),
+        ("report", "report.py", ["show"]),
+    ]
+    assert main["symbols"][0]["calls"] == ["divide", "show"]
+    # Standard library imports have no project source
+    assert index["calc/ops.py"]["imports"][0]["source"] is None
+
+
+def test_python_syntax_error_gives_an_empty_index():
+    index = build_symbol_index([code("broken.py", "def broken(:\n    pass\n")])
+    assert index["broken.py"] == {"language": "python", "symbols": [], "imports": []}
+
+
+def test_javascript_index():
+    index = build_symbol_index(JS_CODES)
+    assert spans(index, "cart.js") == {
+        "computeTotal": ("function", 1, 4),
+        "formatPrice": ("function", 6, 8),
+        "Cart": ("class", 10, 18),
+        "Cart.constructor": ("function", 11, 13),
+        "Cart.total": ("function", 15, 17),
+    }
+    assert spans(index, "server.js") == {
+        "handleOrder": ("function", 5, 9),
+        "ping": ("function", 11, 11),
+    }
+    server = index["server.js"]
+    assert [(i["module"], i["source"], i["names"], i["aliases"]) for i in server["imports"]] == [
+        ("express", None, [], {}),
+        ("./cart", "cart.js", ["computeTotal", "formatPrice"], {"format": "formatPrice"}),
+        ("./db/index", "db/index.js", [], {}),
+    ]
+    assert server["symbols"][0]["calls"] == ["computeTotal", "format", "load", "send"]
+
+
+@pytest.mark.parametrize(
+    "filename, line, expected",
+    [
+        pytest.param("calc/ops.py", 5, "divide", id="function"),
+        pytest.param("calc/ops.py", 15, "Calculator.run", id="innermost"),
+        pytest.param("calc/ops.py", 1, None, id="module level"),
+        pytest.param("calc/ops.py", None, None, id="no line"),
+        pytest.param("missing.py", 1, None, id="unknown file"),
+    ],
+)
+def test_enclosing_symbol(filename, line, expected):
+    symbol = enclosing_symbol(build_symbol_index(PYTHON_CODES), filename, line)
+    assert (symbol["name"] if symbol else None) == expected
+
+
+def test_python_aliased_import_is_related():
+    codes = [
+        code("main.py", "from report import show as display\n\n\ndef main():\n    display(1)\n"),
+        code("report.py", REPORT_PY),
+    ]
+    index = build_symbol_index(codes)
+    assert index["main.py"]["imports"][0]["aliases"] == {"display": "show"}
+    assert names(related_symbols(index, "main.py", 5)) == [("report.py", "show")]
+
+
+def test_javascript_require_destructuring():
+    codes = [
+        code("app.js", "const { load: fetchAll } = require('./db');\nfunction run() {\n  fetchAll(1);\n}\n"),
+        code("db.js", DB_JS),
+    ]
+    index = build_symbol_index(codes)
+    assert index["app.js"]["imports"][0]["aliases"] == {"fetchAll": "load"}
+    assert names(related_symbols(index, "app.js", 3)) == [("db.js", "load")]
+
+
+def test_python_related_symbols():
+    index = build_symbol_index(PYTHON_CODES)
+    # Failing in main(): the imported definitions it calls, not the unused import
+    assert names(related_symbols(index, "main.py", 6)) == [
+        ("calc/ops.py", "divide"),
+        ("report.py", "show"),
+    ]
+    # Failing in divide(): its callers in other files and the outer stack frames
+    frames = [ErrorFrame(file="calc/ops.py", line=5), ErrorFrame(file="main.py", line=11)]
+    assert names(related_symbols(index, "calc/ops.py", 5, frames)) == [("main.py", "main")]
+
+
+def test_javascript_related_symbols():
+    index = build_symbol_index(JS_CODES)
+    assert names(related_symbols(index, "server.js", 7)) == [
+        ("cart.js", "computeTotal"),
+        ("cart.js", "formatPrice"),
+        ("db/index.js", "load"),
+    ]
+    assert names(related_symbols(index, "cart.js", 3)) == [("server.js", "handleOrder")]
+
+
+def test_build_fix_context():
+    index = build_symbol_index(PYTHON_CODES)
+    context = build_fix_context(index, PYTHON_CODES, "main.py", 6)
+    assert context == (
+        "# calc/ops.py, lines 4-5 (divide)\ndef divide(a, b):\n    return a / b\n\n"
+        '# report.py, lines 1-2 (show)\ndef show(value):\n    print(f"Result: {value}")'
+    )
+    # Files sent in full are not repeated
+    context = build_fix_context(index, PYTHON_CODES, "main.py", 6, full_files=["calc/ops.py"])
+    assert context.startswith("# report.py")
+
+
+@pytest.mark.parametrize(
+    "max_lines, expected",
+    [
+        pytest.param(300, ["computeTotal", "formatPrice", "load"], id="all fit"),
+        pytest.param(10, ["computeTotal", "formatPrice", "load"], id="exactly at the cap"),
+        pytest.param(9, ["computeTotal", "formatPrice"], id="last slice dropped"),
+        pytest.param(3, ["formatPrice"], id="too long first slice skipped"),
+        pytest.param(2, [], id="nothing fits"),
+    ],
+)
+def test_build_fix_context_line_cap(monkeypatch, max_lines, expected):
+    monkeypatch.setattr(symbol_index_module, "FIX_CONTEXT_MAX_LINES", max_lines)
+    context = build_fix_context(build_symbol_index(JS_CODES), JS_CODES, "server.js", 7)
+    headers = [line for line in context.splitlines() if line.startswith("# ")]
+    assert [header.split("(")[-1].rstrip(")") for header in headers] == expected
+    assert len(context.splitlines()) - len(headers) - max(len(headers) - 1, 0) <= max_lines
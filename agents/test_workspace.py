@@ -0,0 +1,106 @@
+# agents/test_workspace.py
+import pytest
+import yaml
+from .run_outcome import published_ports
+from .workspace import compose_file_of, scope_compose_file, scope_host_ports, write_compose_files
+
+COMPOSE = """services:
+  web:
+    build: .
+    image: calc-web
+    container_name: "calc-web"
+    ports:
+      - "8080:80"   # the UI
+      - 127.0.0.1:9090:90/tcp
+      - "3000"
+    environment:
+      - "PORT=80"
+  db:
+    image: postgres:16
+    ports:
+      - target: 5432
+        published: 5432
+"""
+
+
+def service_ports(compose_text: str) -> dict:
+    compose = yaml.safe_load(compose_text)
+    return {name: service.get("ports") for name, service in compose["services"].items()}
+
+
+def host_port(entry: str) -> int:
+    return int(entry.split("/")[0].split(":")[-2])
+
+
+def test_scope_compose_file_scopes_names_and_ports():
+    scoped = scope_compose_file(COMPOSE, "run1")
+    compose = yaml.safe_load(scoped)
+    web = compose["services"]["web"]
+    assert web["image"] == "calc-web-run1"
+    assert web["container_name"] == "calc-web-run1"
+    # Pulled images keep their name
+    assert compose["services"]["db"]["image"] == "postgres:16"
+    assert web["environment"] == ["PORT=80"]
+    assert "# the UI" in scoped
+
+    first, second, third = web["ports"]
+    assert first.endswith(":80") and host_port(first) != 8080
+    assert first.count(":") == 1
+    assert second.startswith("127.0.0.1:") and second.endswith(":90/tcp")
+    assert third.endswith(":3000") and third.count(":") == 1
+    db_port = compose["services"]["db"]["ports"][0]
+    assert db_port["target"] == 5432 and db_port["published"] != 5432
+
+
+def test_write_compose_files_keeps_the_project_compose(tmp_path):
+    src_dir = tmp_path / "run1" / "src"
+    src_dir.mkdir(parents=True)
+    assert compose_file_of(str(src_dir)) == str(src_dir / "compose.yaml")
+
+    write_compose_files(str(src_dir), COMPOSE, "run1")
+    # The delivered project keeps the names and ports its README talks about
+    assert (src_dir / "compose.yaml").read_text() == COMPOSE
+    run_compose = tmp_path / "run1" / "compose.run.yaml"
+    assert compose_file_of(str(src_dir)) == str(run_compose)
+    web = yaml.safe_load(run_compose.read_text())["services"]["web"]
+    assert web["container_name"] == "calc-web-run1"
+    assert 8080 not in published_ports(str(src_dir))
+
+
+def test_two_runs_get_different_host_ports(tmp_path):
+    ports = []
+    for run_id in ("run1", "run2"):
+        src_dir = tmp_path / run_id / "src"
+        src_dir.mkdir(parents=True)
+        write_compose_files(str(src_dir), COMPOSE, run_id)
+        ports.append(published_ports(str(src_dir)))
+    assert len(ports[0]) == len(ports[1]) == 4
+    assert not set(ports[0]) & set(ports[1])
+
+
+def test_scope_host_ports_flow_list():
+    compose_text = 'services:\n  app:\n    ports: ["8080:80", \'9090:90\']\n'
+    ports = service_ports(scope_host_ports(compose_text))["app"]
+    assert [entry.split(":")[1] for entry in ports] == ["80", "90"]
+    assert host_port(ports[0]) != 8080 and host_port(ports[1]) != 9090
+
+
+def test_scope_host_ports_list_on_key_indent():
+    compose_text = "services:\n  app:\n    ports:\n    - 8080:80\n    command: run 8080:80\n"
+    scoped = yaml.safe_load(scope_host_ports(compose_text))["services"]["app"]
+    assert host_port(scoped["ports"][0]) != 8080
+    # The block ends at the next key
+    assert scoped["command"] == "run 8080:80"
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        pytest.param("8000-8001:8000-8001", id="range"),
+        pytest.param("${PORT}:80", id="variable"),
+        pytest.param("[::1]:8080:80", id="ipv6"),
+    ],
+)
+def test_scope_host_ports_leaves_unknown_formats(entry):
+    compose_text = f'services:\n  app:\n    ports:\n      - "{entry}"\n'
+    assert scope_host_ports(compose_text) == compose_text
@@ -0,0 +1,283 @@
+import os
+import re
+import json
+import uuid
+import shutil
+import socket
+import hashlib
+import threading
+from collections import deque
+from typing import Dict, List
+import yaml
+from schemas import GraphState
+
+# Every graph run gets its own folder under generated/<run_id>/ so concurrent
+# runs never share files, compose projects or container names.
+GENERATED_ROOT = os.path.abspath(os.getenv("GENERATED_DIR", "generated"))
+
+# Run-scoped copy of the project's compose.yaml, kept next to src/ like the image cache
+# override: generated/<run_id>/compose.run.yaml. docker runs this copy (see scope_compose_file),
+# compose.yaml in src/ stays as the LLM wrote it, so the delivered project and its README
+# name the same ports.
+RUN_COMPOSE_NAME = "compose.run.yaml"
+
+# Content hash of every code file written to src/, kept next to src/ so it is not part of
+# the docker build context: generated/<run_id>/.timeless_manifest.json
+MANIFEST_NAME = ".timeless_manifest.json"
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def get_workspace_dir(run_id: str) -> str:
+    return os.path.join(GENERATED_ROOT, run_id)
+
+
+# Folder where the generated project (code, Dockerfile, compose.yaml, docs) lives
+def get_src_dir(state: GraphState) -> str:
+    return os.path.join(get_workspace_dir(state["run_id"]), "src")
+
+
+def ensure_workspace(run_id: str) -> str:
+    src_dir = os.path.join(get_workspace_dir(run_id), "src")
+    os.makedirs(src_dir, exist_ok=True)
+    os.makedirs(os.path.join(get_workspace_dir(run_id), "test"), exist_ok=True)
+    return src_dir
+
+
+# Deletes all files and subdirectories of the run's src folder except the "ui" folder
+def reset_src_dir(state: GraphState) -> str:
+    src_folder = get_src_dir(state)
+    if os.path.exists(src_folder):
+        for item in os.listdir(src_folder):
+            item_path = os.path.join(src_folder, item)
+            if item != "ui":  # Preserve the UI folder
+                if os.path.isdir(item_path):
+                    shutil.rmtree(item_path)
+                else:
+                    os.remove(item_path)
+    os.makedirs(src_folder, exist_ok=True)
+    save_manifest(src_folder, {})
+    return src_folder
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Relative paths of the project files, the ui folder is not part of the project
+def list_project_files(src_dir: str) -> List[str]:
+    paths = []
+    for root, dirs, files in os.walk(src_dir):
+        if root == src_dir:
+            dirs[:] = [d for d in dirs if d != "ui"]
+        for name in files:
+            paths.append(os.path.relpath(os.path.join(root, name), src_dir).replace(os.sep, "/"))
+    return paths
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def manifest_path(src_dir: str) -> str:
+    return os.path.join(os.path.dirname(src_dir), MANIFEST_NAME)
+
+
+# filename -> content hash of the code files last written to src_dir
+def load_manifest(src_dir: str) -> Dict[str, str]:
+    try:
+        with open(manifest_path(src_dir), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(src_dir: str, manifest: Dict[str, str]):
+    path = manifest_path(src_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+# Writes several project files so that either all or none of them change: every file is
+# written to a temporary file first and only then renamed over the original.
+# The manifest is updated, so the saver knows the files are current.
+def write_files_atomically(src_dir: str, files: Dict[str, str]):
+    temporary = []
+    try:
+        for filename, content in files.items():
+            path = os.path.join(src_dir, filename)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.tmp", "w") as f:
+                f.write(content)
+            temporary.append((f"{path}.tmp", path))
+    except OSError:
+        for tmp_path, _ in temporary:
+            os.remove(tmp_path)
+        raise
+    for tmp_path, path in temporary:
+        os.replace(tmp_path, path)
+
+    manifest = load_manifest(src_dir)
+    manifest.update({filename: content_hash(content) for filename, content in files.items()})
+    save_manifest(src_dir, manifest)
+
+
+# Content hash of every project file (relative path -> sha256)
+def snapshot_hashes(src_dir: str) -> Dict[str, str]:
+    return {path: hash_file(os.path.join(src_dir, path)) for path in list_project_files(src_dir)}
+
+
+# docker-compose derives the project name from the folder name ("src" for every run),
+# so we give each run its own project name.
+def compose_project_name(state: GraphState) -> str:
+    return f"timeless-{state['run_id']}"
+
+
+def scoped_name(name: str, run_id: str) -> str:
+    if not name or name.endswith(f"-{run_id}"):
+        return name
+    return f"{name}-{run_id}"
+
+
+def _scoped_image(image: str, run_id: str) -> str:
+    # my-app:1.0 -> my-app-<run_id>:1.0 (a ':' before the last '/' is a registry port)
+    repository, sep, tag = image.rpartition(":")
+    if not sep or "/" in tag:
+        return scoped_name(image, run_id)
+    return f"{scoped_name(repository, run_id)}:{tag}"
+
+
+# Host ports handed out recently, so two runs in this process never get the same one
+_recent_host_ports = deque(maxlen=1024)
+_host_port_lock = threading.Lock()
+
+
+# A host port nothing listens on right now, chosen by the OS
+def allocate_host_port() -> int:
+    with _host_port_lock:
+        while True:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.bind(("", 0))
+                port = sock.getsockname()[1]
+            if port not in _recent_host_ports:
+                _recent_host_ports.append(port)
+                return port
+
+
+# "8080:80" -> "<free port>:80", "127.0.0.1:8080:80/tcp" -> "127.0.0.1:<free port>:80/tcp".
+# A bare container port ("80") gets a host port too, so the published port is known.
+# Ranges and IPv6 addresses are left as they are.
+def _scoped_port(port: str) -> str:
+    mapping, sep, protocol = port.partition("/")
+    parts = mapping.split(":")
+    if "[" in mapping or len(parts) > 3 or not all(p.isdigit() for p in parts[-2:] if p):
+        return port
+    host_ip = f"{parts[0]}:" if len(parts) == 3 else ""
+    return f"{host_ip}{allocate_host_port()}:{parts[-1]}{sep}{protocol}"
+
+
+# Gives every published port in compose.yaml its own free host port. Without this two runs
+# of similar projects publish the same host port: the second one can't start, or the
+# readiness probe of one run reaches the other run's service.
+def scope_host_ports(compose_text: str) -> str:
+    lines = []
+    ports_indent = None
+    for line in compose_text.splitlines(keepends=True):
+        indent = len(line) - len(line.lstrip())
+        stripped = line.strip()
+        if ports_indent is not None and stripped and not stripped.startswith("#"):
+            # The block ends at the next key on the same or a lower level
+            if indent < ports_indent or (indent == ports_indent and not stripped.startswith("-")):
+                ports_indent = None
+
+        match = re.match(r"^(\s*ports:\s*)(\[.*\])(.*)$", line, flags=re.DOTALL)
+        if match:
+            # ports: ["8080:80", "9090:90"]
+            items = re.sub(
+                r"([\"']?)([^\"',\s\[\]]+)\1",
+                lambda m: f"{m.group(1)}{_scoped_port(m.group(2))}{m.group(1)}",
+                match.group(2),
+            )
+            line = f"{match.group(1)}{items}{match.group(3)}"
+        elif re.match(r"^\s*ports:\s*(#.*)?$", line):
+            ports_indent = indent
+        elif ports_indent is not None:
+            line = re.sub(
+                r"^(\s*-\s*)([\"']?)([^\"'\s#]+)\2(?=\s|$)",
+                lambda m: f"{m.group(1)}{m.group(2)}{_scoped_port(m.group(3))}{m.group(2)}",
+                line,
+            )
+            # Long syntax: "- target: 80" followed by "published: 8080"
+            line = re.sub(
+                r"^(\s*(?:-\s*)?published:\s*)([\"']?)(\d+)\2",
+                lambda m: f"{m.group(1)}{m.group(2)}{allocate_host_port()}{m.group(2)}",
+                line,
+            )
+        lines.append(line)
+    return "".join(lines)
+
+
+# Makes container names, locally built image names and published host ports in
+# compose.yaml unique for the run.
+# Lines are rewritten in place so comments written by the LLM are preserved.
+def scope_compose_file(compose_text: str, run_id: str) -> str:
+    built_images = set()
+    try:
+        compose = yaml.safe_load(compose_text) or {}
+        for service in (compose.get("services") or {}).values():
+            if isinstance(service, dict) and "build" in service and service.get("image"):
+                built_images.add(str(service["image"]))
+    except yaml.YAMLError:
+        pass
+
+    def replace_container(match):
+        quote = match.group(2)
+        return f"{match.group(1)}{quote}{scoped_name(match.group(3), run_id)}{quote}"
+
+    def replace_image(match):
+        image = match.group(3)
+        if image not in built_images:
+            return match.group(0)
+        quote = match.group(2)
+        return f"{match.group(1)}{quote}{_scoped_image(image, run_id)}{quote}"
+
+    compose_text = re.sub(
+        r"^(\s*container_name:\s*)([\"']?)([^\"'\s#]+)\2",
+        replace_container,
+        compose_text,
+        flags=re.MULTILINE,
+    )
+    compose_text = re.sub(
+        r"^(\s*image:\s*)([\"']?)([^\"'\s#]+)\2",
+        replace_image,
+        compose_text,
+        flags=re.MULTILINE,
+    )
+    return scope_host_ports(compose_text)
+
+
+def run_compose_path(src_dir: str) -> str:
+    return os.path.join(os.path.dirname(src_dir), RUN_COMPOSE_NAME)
+
+
+# The compose file docker runs for the project in src_dir: the run-scoped copy, or the
+# project's own compose.yaml when there is no copy
+def compose_file_of(src_dir: str) -> str:
+    path = run_compose_path(src_dir)
+    return path if os.path.exists(path) else os.path.join(src_dir, "compose.yaml")
+
+
+# Writes compose.yaml to src/ as given and its copy scoped to the run next to src/
+def write_compose_files(src_dir: str, compose_text: str, run_id: str):
+    with open(os.path.join(src_dir, "compose.yaml"), "w", encoding="utf-8") as f:
+        f.write(compose_text)
+    with open(run_compose_path(src_dir), "w", encoding="utf-8") as f:
+        f.write(scope_compose_file(compose_text, run_id))
@@ -1,21 +1,72 @@
 import os
-from schemas import GraphState
+from typing import List
+from schemas import GraphState, Code
+from .workspace import (
+    get_src_dir,
+    content_hash,
+    load_manifest,
+    save_manifest,
+    write_files_atomically,
+)
+from .symbol_index import build_symbol_index, index_file
 
 # Save generated code to file
+# Only files whose content changed since the last save are written (the manifest holds the
+# hash of every written file), files dropped from the codes are deleted. Unchanged files
+# keep their mtime, so docker can reuse the COPY layers.
 def write_code_to_file_agent(state: GraphState):
     print("\n**WRITE CODE TO FILE**")
+    src_dir = get_src_dir(state)
 
+    files = {}
     for code in state["codes"].codes:
         if code.executable_code:
             state["executable_file_name"] = code.filename
+        files[code.filename] = code.code.replace("\\n", "\n")
 
-        full_file_path = os.path.join("generated/src", code.filename)
-        directory = os.path.dirname(full_file_path)
-        if not os.path.exists(directory):
-            os.makedirs(directory)
+    manifest = load_manifest(src_dir)
+    changed = [
+        filename
+        for filename, content in files.items()
+        if manifest.get(filename) != content_hash(content)
+        or not os.path.exists(os.path.join(src_dir, filename))
+    ]
+    removed = [filename for filename in manifest if filename not in files]
+    added = [filename for filename in changed if filename not in manifest]
 
-        formatted_code = code.code.replace("\\n", "\n")
-        with open(full_file_path, "w") as f:
-            f.write(formatted_code)
+    if changed:
+        write_files_atomically(src_dir, {filename: files[filename] for filename in changed})
+    if removed:
+        for filename in removed:
+            path = os.path.join(src_dir, filename)
+            if os.path.exists(path):
+                os.remove(path)
+        manifest = load_manifest(src_dir)
+        save_manifest(src_dir, {f: h for f, h in manifest.items() if f not in removed})
+    print(f"Saved {len(changed)} changed files, {len(files) - len(changed)} unchanged, {len(removed)} removed")
 
-    return state
\ No newline at end of file
+    # Files written or deleted by this save, for the nodes after it
+    state["changed_files"] = sorted(changed + removed)
+
+    # Function/class spans and imports, used to send the fixer only the code it needs
+    update_symbol_index(state, changed, structure_changed=bool(added or removed))
+    return state
+
+
+# Re-indexes only the changed files. Adding or removing files can change where the imports
+# of other files point to, then the whole project is indexed again.
+def update_symbol_index(state: GraphState, changed: List[str], structure_changed: bool):
+    symbol_index = state.get("symbol_index")
+    codes = state["codes"].codes
+    if symbol_index is None or structure_changed:
+        state["symbol_index"] = build_symbol_index(codes)
+        return
+    files = [code.filename for code in codes]
+    for code in codes:
+        if code.filename in changed:
+            index_file(symbol_index, code.filename, code.code, files)
+
+
+# Write a single code file into the project folder
+def write_code_file(src_dir: str, code: Code):
+    write_files_atomically(src_dir, {code.filename: code.code.replace("\\n", "\n")})
@@ -0,0 +1,110 @@
+# benchmarks/fake_docker.py
+# Local stand-in for the docker and docker-compose CLIs, used through DOCKER_BIN and
+# DOCKER_COMPOSE_BIN:
+#   DOCKER_BIN="python benchmarks/fake_docker.py docker"
+#   DOCKER_COMPOSE_BIN="python benchmarks/fake_docker.py compose"
+# Latency (seconds):  FAKE_DOCKER_BUILD_SECONDS, FAKE_DOCKER_RUN_SECONDS, FAKE_DOCKER_COMMAND_SECONDS
+# Failure script:     FAKE_DOCKER_FAIL="build:1,run:2" fails the first build and the first two
+#                     runs of every compose project. Counters live in FAKE_DOCKER_STATE_DIR.
+import os
+import re
+import sys
+import time
+
+BUILD_SECONDS = float(os.getenv("FAKE_DOCKER_BUILD_SECONDS", 0.2))
+RUN_SECONDS = float(os.getenv("FAKE_DOCKER_RUN_SECONDS", 0.1))
+COMMAND_SECONDS = float(os.getenv("FAKE_DOCKER_COMMAND_SECONDS", 0.01))
+STATE_DIR = os.getenv("FAKE_DOCKER_STATE_DIR", os.path.join("generated", ".fake_docker"))
+
+
+def failures_planned(phase: str) -> int:
+    for entry in os.getenv("FAKE_DOCKER_FAIL", "").split(","):
+        name, _, count = entry.strip().partition(":")
+        if name == phase and count.isdigit():
+            return int(count)
+    return 0
+
+
+def _state_file(project: str, name: str) -> str:
+    os.makedirs(STATE_DIR, exist_ok=True)
+    return os.path.join(STATE_DIR, f"{project}.{name}")
+
+
+def _read(project: str, name: str, default: str = "0") -> str:
+    try:
+        with open(_state_file(project, name), encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+def _write(project: str, name: str, value: str):
+    with open(_state_file(project, name), "w", encoding="utf-8") as f:
+        f.write(value)
+
+
+# True while the project still has planned failures for the phase. Speculative fix
+# candidates (<project>-cand<i>) count as attempts of their run's project.
+def should_fail(project: str, phase: str) -> bool:
+    project = re.sub(r"-cand\d+$", "", project)
+    attempts = int(_read(project, phase)) + 1
+    _write(project, phase, str(attempts))
+    return attempts <= failures_planned(phase)
+
+
+def compose(args):
+    project = "default"
+    while args and args[0] in ("-p", "-f", "--project-directory"):
+        if args[0] == "-p":
+            project = args[1]
+        args = args[2:]
+    command = args[0] if args else ""
+
+    if command == "build":
+        time.sleep(BUILD_SECONDS)
+        if should_fail(project, "build"):
+            print("ERROR: failed to solve: process \"/bin/sh -c pip install\" did not complete")
+            return 1
+        print(f"Successfully built {project}-app")
+        return 0
+
+    if command == "up":
+        if "-d" in args:
+            time.sleep(BUILD_SECONDS if "--build" in args else COMMAND_SECONDS)
+            print(f"Container {project}-app-1 Started")
+            return 0
+        time.sleep(RUN_SECONDS)
+        print("Hello from the benchmark project", flush=True)
+        if should_fail(project, "run"):
+            print("Traceback (most recent call last):")
+            print('  File "/app/main.py", line 1, in <module>')
+            print("NameError: name 'undefined_name' is not defined")
+            print("app-1 exited with code 1")
+            _write(project, "exit_code", "1")
+            return 1
+        print("app-1 exited with code 0")
+        _write(project, "exit_code", "0")
+        return 0
+
+    time.sleep(COMMAND_SECONDS)
+    if command == "ps":
+        print(f"cid-{project}")
+    return 0
+
+
+def docker(args):
+    time.sleep(BUILD_SECONDS if args[:1] == ["build"] else COMMAND_SECONDS)
+    if args[:1] == ["inspect"]:
+        # inspect -f '{{.Name}} {{.State.Status}} {{.State.ExitCode}}' cid-<project> ...
+        for container_id in args[3:]:
+            project = container_id[len("cid-"):]
+            print(f"/{project}-app-1 exited {_read(project, 'exit_code')}")
+        return 0
+    if args[:1] == ["logs"]:
+        print("Hello from the benchmark project")
+    return 0
+
+
+if __name__ == "__main__":
+    mode, arguments = sys.argv[1], sys.argv[2:]
+    sys.exit(compose(arguments) if mode == "compose" else docker(arguments))
@@ -0,0 +1,42 @@
+# benchmarks/fake_frontend.py
+# Local stand-in for the download service (frontend/app.py), answers the health check and
+# the registration call of agents/gradio_agent.py so the benchmark never builds the real one.
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeFrontendHandler(BaseHTTPRequestHandler):
+    projects = {}
+
+    def _reply(self, status: int, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/api/health":
+            self._reply(200, {"status": "ok", "projects": len(self.projects)})
+        else:
+            self._reply(404, {"detail": "Not Found"})
+
+    def do_POST(self):
+        if self.path != "/api/projects":
+            return self._reply(404, {"detail": "Not Found"})
+        length = int(self.headers.get("Content-Length", 0))
+        project = json.loads(self.rfile.read(length) or b"{}")
+        self.projects[project["run_id"]] = project
+        self._reply(201, {**project, "url": f"/projects/{project['run_id']}"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Serves on a free local port in a daemon thread, returns the base URL
+def start_fake_frontend() -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeFrontendHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
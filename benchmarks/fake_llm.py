@@ -0,0 +1,198 @@
+# benchmarks/fake_llm.py
+# Deterministic stand-in for ChatOpenAI. with_structured_output(schema) returns a canned
+# instance of the schema after a fixed latency, so the whole graph can run offline.
+# Token usage is reported like the real model, so the metrics see prompt/completion tokens.
+# Cached tokens follow the provider's prefix cache: the longest prefix shared with an earlier
+# prompt, counted in 128 token blocks once it is at least 1024 tokens long.
+import sys
+import json
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+CACHE_MIN_TOKENS = 1024
+CACHE_BLOCK_TOKENS = 128
+# Prompts seen so far (rendered), shared by every fake model like the provider's cache
+_seen_prompts: List[str] = []
+
+
+def cached_prompt_tokens(prompt: str) -> int:
+    shared = 0
+    for previous in _seen_prompts:
+        length = min(len(prompt), len(previous))
+        i = 0
+        while i < length and prompt[i] == previous[i]:
+            i += 1
+        shared = max(shared, i)
+    _seen_prompts.append(prompt)
+    del _seen_prompts[:-256]
+    tokens = shared // 4
+    if tokens < CACHE_MIN_TOKENS:
+        return 0
+    return tokens // CACHE_BLOCK_TOKENS * CACHE_BLOCK_TOKENS
+
+
+MAIN_PY = 'print("Hello from the benchmark project")\n'
+
+CANNED_RESPONSES: Dict[str, dict] = {
+    "Codes": {
+        "description": "Small python program used by the benchmark",
+        "codes": [
+            {
+                "description": "Entry point",
+                "filename": "main.py",
+                "executable_code": True,
+                "code": MAIN_PY,
+                "programming_language": "python",
+            },
+            {
+                "description": "Dependencies",
+                "filename": "requirements.txt",
+                "executable_code": False,
+                "code": "requests\n",
+                "programming_language": "text",
+            },
+        ],
+        "execution_command": "python main.py",
+    },
+    "ProjectPlan": {
+        "description": "Small python program used by the benchmark",
+        "files": [
+            {
+                "filename": "main.py",
+                "role": "Entry point",
+                "interface": "none",
+                "executable_code": True,
+                "programming_language": "python",
+            },
+            {
+                "filename": "requirements.txt",
+                "role": "Dependencies",
+                "interface": "none",
+                "executable_code": False,
+                "programming_language": "text",
+            },
+        ],
+        "execution_command": "python main.py",
+    },
+    # Generated files (parallel generation)
+    "Code": {
+        "description": "Entry point",
+        "filename": "main.py",
+        "executable_code": True,
+        "code": MAIN_PY,
+        "programming_language": "python",
+    },
+    # Patch fixes (debug code), applies to MAIN_PY
+    "PatchSet": {
+        "description": "Fixed the greeting",
+        "patches": [
+            {
+                "description": "Fixed the greeting",
+                "filename": "main.py",
+                "hunks": [
+                    {
+                        "search": 'print("Hello from the benchmark project")',
+                        "replace": 'print("Hello from the benchmark project!")',
+                    }
+                ],
+            }
+        ],
+    },
+    # Full-file fixes (debug code with PATCH_FIXES=false)
+    "FixedCodes": {
+        "description": "Fixed the greeting",
+        "codes": [
+            {
+                "description": "Entry point",
+                "filename": "main.py",
+                "executable_code": True,
+                "code": MAIN_PY,
+                "programming_language": "python",
+            }
+        ],
+    },
+    "DockerFile": {
+        "description": "Runs main.py with python",
+        "dockerfile": (
+            "FROM python:3.12-slim\n"
+            "WORKDIR /app\n"
+            "COPY requirements.txt .\n"
+            "RUN pip install -r requirements.txt\n"
+            "COPY . .\n"
+            'CMD ["python", "main.py"]\n'
+        ),
+        "docker_compose": "services:\n  app:\n    build: .\n    container_name: bench-app\n",
+        "docker_image_name": "bench-app",
+        "docker_container_name": "bench-app",
+    },
+    "Documentation": {
+        "readme": "# Benchmark project\n",
+        "developer": "# Developer notes\n",
+    },
+}
+
+
+class FakeStructuredChatModel(BaseChatModel):
+    model_name: str = "fake-model"
+    temperature: float = 0.0
+    # Seconds every call takes
+    latency: float = 0.0
+    responses: Dict[str, dict] = CANNED_RESPONSES
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-structured"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name}
+
+    def with_structured_output(self, schema, **kwargs):
+        return self.bind(schema_name=schema.__name__) | RunnableLambda(
+            lambda message: schema.parse_raw(message.content)
+        )
+
+    def _result(self, messages: List[BaseMessage], schema_name: Optional[str]) -> ChatResult:
+        content = json.dumps(self.responses.get(schema_name, {}))
+        prompt = "".join(f"<{m.type}>{m.content}" for m in messages)
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "prompt_tokens_details": {"cached_tokens": cached_prompt_tokens(prompt)},
+            "completion_tokens": len(content) // 4,
+        }
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=content))],
+            llm_output={"token_usage": usage, "model_name": self.model_name},
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, schema_name=None, **kwargs):
+        time.sleep(self.latency)
+        return self._result(messages, schema_name)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, schema_name=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._result(messages, schema_name)
+
+
+# Replaces llm / llm_code in every agent module (they are imported by name)
+def install_fake_llms(llm_latency: float, llm_code_latency: float):
+    from agents import common
+
+    fakes = {
+        "llm": (common.llm, FakeStructuredChatModel(model_name="fake-llm", latency=llm_latency)),
+        "llm_code": (
+            common.llm_code,
+            FakeStructuredChatModel(model_name="fake-llm-code", latency=llm_code_latency),
+        ),
+    }
+    for name, module in list(sys.modules.items()):
+        if not name.startswith("agents") or module is None:
+            continue
+        for attribute, (original, fake) in fakes.items():
+            if getattr(module, attribute, None) is original:
+                setattr(module, attribute, fake)
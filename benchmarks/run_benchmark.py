@@ -0,0 +1,216 @@
+# benchmarks/run_benchmark.py
+# Offline end-to-end benchmark: drives the compiled graph from main.py with a fake LLM
+# (benchmarks/fake_llm.py), a fake docker CLI (benchmarks/fake_docker.py) and a fake download
+# service (benchmarks/fake_frontend.py) at several concurrency levels and reports throughput,
+# p50/p95 run latency and time per node.
+#
+#   python benchmarks/run_benchmark.py                       # 1, 8 and 64 concurrent runs
+#   python benchmarks/run_benchmark.py --save-baseline benchmarks/baseline.json
+#   python benchmarks/run_benchmark.py --baseline benchmarks/baseline.json   # exit 1 on regression
+import os
+import io
+import sys
+import json
+import math
+import time
+import shlex
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_DOCKER = os.path.join(REPO_ROOT, "benchmarks", "fake_docker.py")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the graph")
+    parser.add_argument("--concurrency", default="1,8,64", help="Comma separated levels")
+    parser.add_argument("--runs", type=int, default=0, help="Runs per level (default 2x level, min 8)")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--llm-code-latency", type=float, default=0.2)
+    parser.add_argument("--build-seconds", type=float, default=0.2)
+    parser.add_argument("--run-seconds", type=float, default=0.1)
+    parser.add_argument("--fail", default="", help='Fake docker failure script, e.g. "run:1"')
+    parser.add_argument("--docker-slots", type=int, default=0, help="MAX_CONCURRENT_DOCKER_BUILDS")
+    parser.add_argument("--parallel-codegen", action="store_true")
+    parser.add_argument("--speculative-fixes", type=int, default=0, help="SPECULATIVE_FIXES")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against this results file")
+    parser.add_argument("--save-baseline", help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression (0.25 = 25%%)")
+    parser.add_argument("--verbose", action="store_true", help="Show the agents' output")
+    return parser.parse_args()
+
+
+# Must run before main.py (and so the agents) are imported, they read the env at import time
+def configure_environment(args, work_dir: str):
+    fake = f"{shlex.quote(sys.executable)} {shlex.quote(FAKE_DOCKER)}"
+    os.environ.update(
+        {
+            "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "benchmark",
+            "DOCKER_BIN": f"{fake} docker",
+            "DOCKER_COMPOSE_BIN": f"{fake} compose",
+            "FAKE_DOCKER_BUILD_SECONDS": str(args.build_seconds),
+            "FAKE_DOCKER_RUN_SECONDS": str(args.run_seconds),
+            "FAKE_DOCKER_FAIL": args.fail,
+            "FAKE_DOCKER_STATE_DIR": os.path.join(work_dir, "fake_docker"),
+            "GENERATED_DIR": os.path.join(work_dir, "generated"),
+            "DRAW_GRAPH": "false",
+            "LLM_CACHE_ENABLED": "false",
+            "RUNTIME_POOL_ENABLED": "false",
+            "PARALLEL_CODE_GENERATION": "true" if args.parallel_codegen else "false",
+            "SPECULATIVE_FIXES": str(args.speculative_fixes),
+        }
+    )
+    if args.docker_slots:
+        os.environ["MAX_CONCURRENT_DOCKER_BUILDS"] = str(args.docker_slots)
+
+    # llm_models reads config.ini from the working directory
+    with open(os.path.join(work_dir, "config.ini"), "w", encoding="utf-8") as f:
+        f.write("[LLM]\nmodel=gpt-4o-mini\n")
+    os.chdir(work_dir)
+    sys.path.insert(0, REPO_ROOT)
+
+    # Projects are published to a local fake of the download service
+    from benchmarks.fake_frontend import start_fake_frontend
+
+    os.environ["FRONTEND_URL"] = start_fake_frontend()
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+async def run_level(main, concurrency: int, runs: int, verbose: bool) -> Dict:
+    from jobs import Job
+
+    slots = asyncio.Semaphore(concurrency)
+    jobs = [Job(id=f"bench-c{concurrency}-{i}", prompt="Make a hello world program") for i in range(runs)]
+    latencies = []
+
+    async def one(job):
+        async with slots:
+            started = time.monotonic()
+            try:
+                await main.run_graph(job)
+            except Exception as e:
+                job.error = job.error or str(e)
+            latencies.append(time.monotonic() - started)
+
+    output = io.StringIO()
+    started = time.monotonic()
+    with contextlib.nullcontext() if verbose else contextlib.redirect_stdout(output):
+        await asyncio.gather(*(one(job) for job in jobs))
+    elapsed = time.monotonic() - started
+
+    # Mean seconds per run spent in each node
+    nodes: Dict[str, float] = {}
+    for job in jobs:
+        for node, seconds in job.timings.get("nodes", {}).items():
+            nodes[node] = nodes.get(node, 0) + seconds / runs
+    # Share of the prompt tokens served from the (fake) provider's prefix cache
+    prompt_tokens = cached_tokens = 0
+    for job in jobs:
+        for totals in job.timings.get("llm", {}).values():
+            prompt_tokens += totals.get("prompt_tokens", 0)
+            cached_tokens += totals.get("cached_tokens", 0)
+    return {
+        "concurrency": concurrency,
+        "runs": runs,
+        "failed": sum(1 for job in jobs if job.error),
+        "seconds": round(elapsed, 3),
+        "throughput": round(runs / elapsed, 3),
+        "p50": round(percentile(latencies, 50), 3),
+        "p95": round(percentile(latencies, 95), 3),
+        "mean_iterations": round(sum(job.iterations for job in jobs) / runs, 2),
+        "cached_prompt_share": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else 0.0,
+        "nodes": {node: round(seconds, 3) for node, seconds in sorted(nodes.items())},
+    }
+
+
+def print_report(results: List[Dict]):
+    print(
+        f"{'concurrency':>11} {'runs':>5} {'failed':>6} {'runs/s':>8} {'p50 s':>7} {'p95 s':>7} {'cached':>7}"
+    )
+    for r in results:
+        print(
+            f"{r['concurrency']:>11} {r['runs']:>5} {r['failed']:>6} "
+            f"{r['throughput']:>8.2f} {r['p50']:>7.2f} {r['p95']:>7.2f} "
+            f"{r.get('cached_prompt_share', 0):>7.1%}"
+        )
+    for r in results:
+        breakdown = ", ".join(f"{node} {seconds:.2f}s" for node, seconds in r["nodes"].items())
+        print(f"concurrency {r['concurrency']}: {breakdown}")
+
+
+# Regressions against the baseline: lower throughput or higher p95 beyond the tolerance
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    previous = {r["concurrency"]: r for r in baseline}
+    regressions = []
+    for r in results:
+        base = previous.get(r["concurrency"])
+        if base is None:
+            continue
+        if r["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"concurrency {r['concurrency']}: throughput {r['throughput']} runs/s, "
+                f"baseline {base['throughput']}"
+            )
+        if r["p95"] > base["p95"] * (1 + tolerance):
+            regressions.append(
+                f"concurrency {r['concurrency']}: p95 {r['p95']}s, baseline {base['p95']}s"
+            )
+        if r["failed"] > base["failed"]:
+            regressions.append(
+                f"concurrency {r['concurrency']}: {r['failed']} failed runs, baseline {base['failed']}"
+            )
+    return regressions
+
+
+async def run_benchmark(args) -> List[Dict]:
+    import main
+    from benchmarks.fake_llm import install_fake_llms
+
+    install_fake_llms(args.llm_latency, args.llm_code_latency)
+    results = []
+    for level in [int(c) for c in args.concurrency.split(",")]:
+        runs = args.runs or max(8, level * 2)
+        print(f"Running {runs} runs at concurrency {level}...", file=sys.stderr)
+        results.append(await run_level(main, level, runs, args.verbose))
+    return results
+
+
+def main():
+    args = parse_args()
+    # Paths are relative to where the benchmark was started, the runs use a scratch directory
+    for name in ("output", "baseline", "save_baseline"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    work_dir = tempfile.mkdtemp(prefix="timeless-bench-")
+    configure_environment(args, work_dir)
+
+    # One event loop for every level, like the job workers
+    results = asyncio.run(run_benchmark(args))
+    print_report(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Performance regressions:\n" + "\n".join(regressions))
+            sys.exit(1)
+        print("No performance regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
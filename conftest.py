@@ -0,0 +1,6 @@
+# conftest.py
+# Importing the agents package creates the OpenAI clients, which need an API key even
+# though the tests never call them
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
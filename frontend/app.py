@@ -0,0 +1,227 @@
+# frontend/app.py
+# One long-lived download service for every generated project. Projects are published by
+# the graph with a registration call (POST /api/projects), no image build per run:
+#   /                          list of published projects
+#   /projects/<run_id>         Gradio page of one project (README, DEVELOPER, ZIP download)
+#   /projects/<run_id>/download  the project as a ZIP file
+# The generated/ folder of the host is mounted read-only at GENERATED_DIR. The ZIP file is
+# built by the graph when the run succeeds (agents/archive.py) and named by its content
+# hash, the service only streams it and answers repeat downloads with 304 Not Modified.
+import os
+import re
+import html
+import json
+import base64
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+import gradio as gr
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse, Response
+from pydantic import BaseModel
+
+GENERATED_DIR = os.getenv("GENERATED_DIR", "/app/generated")
+DATA_DIR = os.getenv("DATA_DIR", "/app/data")
+LOGO_PATH = os.getenv("LOGO_PATH", "/app/images/gptlab_sjk_logo.png")
+PORT = int(os.getenv("GRADIO_SERVER_PORT", 7860))
+
+# Run ids are folder names under generated/, nothing else may be served
+RUN_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+ARCHIVE_PATTERN = re.compile(r"^[0-9a-f]{16,64}$")
+
+
+class Registration(BaseModel):
+    run_id: str
+    title: str = ""
+    archive: str  # Content hash of generated/<run_id>/archive/<archive>.zip
+
+
+# Published projects, persisted in DATA_DIR so a restart of the service keeps them
+class ProjectRegistry:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._projects: Dict[str, dict] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._projects = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def register(self, run_id: str, title: str, archive: str) -> dict:
+        project = {
+            "run_id": run_id,
+            "title": title,
+            "archive": archive,
+            "published_at": datetime.utcnow().isoformat(),
+        }
+        with self._lock:
+            self._projects[run_id] = project
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(self._projects, f, indent=2)
+            os.replace(f"{self.path}.tmp", self.path)
+        return project
+
+    def get(self, run_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._projects.get(run_id)
+
+    def all(self):
+        with self._lock:
+            return sorted(self._projects.values(), key=lambda p: p["published_at"], reverse=True)
+
+
+registry = ProjectRegistry(os.path.join(DATA_DIR, "projects.json"))
+
+
+def src_dir(run_id: str) -> str:
+    return os.path.join(GENERATED_DIR, run_id, "src")
+
+
+def archive_path(run_id: str, archive: str) -> str:
+    return os.path.join(GENERATED_DIR, run_id, "archive", f"{archive}.zip")
+
+
+def published_project(run_id: str) -> dict:
+    project = registry.get(run_id) if RUN_ID_PATTERN.match(run_id or "") else None
+    if project is None:
+        raise HTTPException(status_code=404, detail=f"Project {run_id} not found")
+    return project
+
+
+def read_file(run_id: str, filename: str) -> str:
+    path = os.path.join(src_dir(run_id), filename)
+    if not os.path.exists(path):
+        return f"{filename} not found."
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    return content if content.strip() else f"{filename} is empty."
+
+
+def get_logo_html() -> str:
+    if not os.path.exists(LOGO_PATH):
+        return '<div style="text-align: center; padding: 20px; color: gray;">Logo not found</div>'
+    with open(LOGO_PATH, "rb") as f:
+        img_data = base64.b64encode(f.read()).decode()
+    return (
+        '<div style="text-align: center; padding: 20px;">'
+        f'<img src="data:image/png;base64,{img_data}" alt="GPT Lab Logo" '
+        'style="max-width: 300px; max-height: 300px; object-fit: contain; border-radius: 8px;">'
+        "</div>"
+    )
+
+
+app = FastAPI(title="Timeless projects")
+
+
+@app.get("/api/health")
+def health():
+    return {"status": "ok", "projects": len(registry.all())}
+
+
+@app.post("/api/projects", status_code=201)
+def register_project(registration: Registration):
+    if not RUN_ID_PATTERN.match(registration.run_id):
+        raise HTTPException(status_code=400, detail="Invalid run id")
+    if not ARCHIVE_PATTERN.match(registration.archive):
+        raise HTTPException(status_code=400, detail="Invalid archive hash")
+    if not os.path.isfile(archive_path(registration.run_id, registration.archive)):
+        raise HTTPException(status_code=404, detail=f"No archive for project {registration.run_id}")
+    project = registry.register(registration.run_id, registration.title, registration.archive)
+    return {**project, "url": f"/projects/{registration.run_id}"}
+
+
+@app.get("/api/projects")
+def list_projects():
+    return registry.all()
+
+
+# Titles are the users' prompts, everything from the registry is escaped
+@app.get("/", response_class=HTMLResponse)
+def index():
+    items = "".join(
+        f'<li><a href="/projects/{html.escape(p["run_id"])}">{html.escape(p["title"] or p["run_id"])}</a>'
+        f' ({html.escape(p["published_at"])})</li>'
+        for p in registry.all()
+    )
+    return f"<h1>TIMELESS</h1><ul>{items or '<li>No projects yet</li>'}</ul>"
+
+
+@app.get("/projects/{run_id}")
+def project_page(run_id: str):
+    published_project(run_id)
+    return RedirectResponse(f"/ui/?project={run_id}")
+
+
+# The archive's content hash is its ETag, a client that already has it gets 304
+@app.get("/projects/{run_id}/download")
+def download_project(run_id: str, request: Request):
+    archive = published_project(run_id).get("archive")
+    if not archive:
+        raise HTTPException(status_code=404, detail=f"Project {run_id} has no archive")
+    etag = f'"{archive}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    path = archive_path(run_id, archive)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"Archive of project {run_id} not found")
+    return FileResponse(
+        path, media_type="application/zip", filename=f"timeless-{run_id}.zip", headers=headers
+    )
+
+
+# One Gradio page for all projects, the project comes from the ?project= query parameter
+def load_project(request: gr.Request):
+    run_id = request.query_params.get("project", "")
+    if not RUN_ID_PATTERN.match(run_id) or registry.get(run_id) is None:
+        return "## Project not found", "", "", ""
+    # Escaped so the prompt is shown as text, not rendered as Markdown/HTML
+    title = html.escape(registry.get(run_id)["title"] or run_id)
+    title = re.sub(r"([\\`*_{}\[\]()#+\-.!|>~])", r"\\\1", " ".join(title.split()))
+    return (
+        f"## {title}",
+        read_file(run_id, "README.md"),
+        read_file(run_id, "DEVELOPER.md"),
+        f'<a href="/projects/{run_id}/download" download '
+        'style="display: inline-block; padding: 12px 24px; border-radius: 8px; '
+        'background: #f97316; color: white; text-decoration: none; font-weight: 600;">'
+        "Download ZIP</a>",
+    )
+
+
+with gr.Blocks(title="Timeless", theme=gr.themes.Soft()) as demo:
+    gr.Markdown("# TIMELESS")
+
+    with gr.Row():
+        with gr.Column(scale=1):
+            gr.HTML(get_logo_html())
+
+        with gr.Column(scale=2):
+            project_title = gr.Markdown()
+            gr.Markdown("Click the button below to download all generated files as a ZIP package.")
+            download_link = gr.HTML()
+
+    gr.Markdown("---")
+    gr.Markdown("### Documentation")
+
+    with gr.Row():
+        with gr.Column():
+            readme_text = gr.Textbox(
+                label="README.md", lines=20, max_lines=30, interactive=False, show_copy_button=True
+            )
+        with gr.Column():
+            dev_text = gr.Textbox(
+                label="DEVELOPER.md", lines=20, max_lines=30, interactive=False, show_copy_button=True
+            )
+
+    demo.load(load_project, outputs=[project_title, readme_text, dev_text, download_link])
+
+app = gr.mount_gradio_app(app, demo, path="/ui")
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=PORT)
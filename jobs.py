@@ -0,0 +1,176 @@
+# jobs.py
+# Background job queue for graph runs. POST /jobs only enqueues the run and returns at once,
+# a fixed number of workers running on one background event loop drain the queue.
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from schemas import JobStatus
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobActiveError(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    prompt: str
+    status: JobStatus = JobStatus.QUEUED
+    # Continue the run from its checkpoint instead of starting it, optionally at this node
+    resume: bool = False
+    entry_node: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    frontend_url: Optional[str] = None
+    archive_hash: Optional[str] = None
+    error: Optional[Any] = None
+    iterations: int = 0
+    build_report: List[Dict[str, Any]] = field(default_factory=list)
+    # Applied/rejected hunks of the patch fixes
+    patch_report: List[Dict[str, Any]] = field(default_factory=list)
+    # Candidates and winner of the speculative debug passes (SPECULATIVE_FIXES)
+    speculative_report: List[Dict[str, Any]] = field(default_factory=list)
+    # Model route of every LLM call and its outcome (agents/model_router.py)
+    route_report: List[Dict[str, Any]] = field(default_factory=list)
+    # Per-node, LLM and docker timings of the run
+    timings: Dict[str, Any] = field(default_factory=dict)
+    # Resolved when the job has finished, lets synchronous callers wait for the result
+    future: Future = field(default_factory=Future, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status.value,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": {
+                "frontend_url": self.frontend_url,
+                "archive_hash": self.archive_hash,
+                "error": self.error,
+                "iterations": self.iterations,
+                "build_report": self.build_report,
+                "patch_report": self.patch_report,
+                "speculative_report": self.speculative_report,
+                "route_report": self.route_report,
+                "timings": self.timings,
+            },
+        }
+
+
+class JobManager:
+    def __init__(
+        self,
+        run_job: Callable[[Job], Awaitable[None]],
+        workers: int = 4,
+        max_queue: int = 100,
+        history_limit: int = 1000,
+    ):
+        # run_job fills in the result fields of the job, exceptions mark the job failed
+        self._run_job = run_job
+        self._workers = workers
+        self._max_queue = max_queue
+        self._history_limit = history_limit
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._ready = threading.Event()
+
+    def start(self):
+        if self._loop is not None:
+            return
+        thread = threading.Thread(target=self._run_loop, name="job-workers", daemon=True)
+        thread.start()
+        self._ready.wait()
+
+    # Event loop shared by all graph runs
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue(maxsize=self._max_queue)
+        for i in range(self._workers):
+            self._loop.create_task(self._worker(i))
+        self._ready.set()
+        self._loop.run_forever()
+
+    def submit(self, job_id: str, prompt: str, **options) -> Job:
+        job = Job(id=job_id, prompt=prompt, **options)
+        with self._lock:
+            previous = self._jobs.get(job.id)
+            if previous is not None and previous.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+                raise JobActiveError(f"Job {job.id} is still {previous.status.value}.")
+            self._jobs[job.id] = job
+            self._evict_finished()
+        try:
+            asyncio.run_coroutine_threadsafe(self._enqueue(job), self._loop).result()
+        except asyncio.QueueFull:
+            with self._lock:
+                if previous is not None:
+                    self._jobs[job.id] = previous  # Keep the result of the earlier attempt
+                else:
+                    self._jobs.pop(job.id, None)
+            raise QueueFullError(
+                f"Job queue is full ({self._max_queue} jobs waiting), try again later."
+            )
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queue_size(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _enqueue(self, job: Job):
+        self._queue.put_nowait(job)
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            job.status = JobStatus.RUNNING
+            job.started_at = time.time()
+            print(f"\nWorker {worker_id} started job {job.id}")
+            try:
+                await self._run_job(job)
+                job.status = JobStatus.FAILED if job.error else JobStatus.SUCCEEDED
+            except asyncio.CancelledError:
+                # A run cancelled from the inside fails only its job, a cancelled worker stops
+                job.status = JobStatus.FAILED
+                job.error = job.error or "The run was cancelled."
+                if asyncio.current_task().cancelling():
+                    raise
+            except Exception as e:
+                print(f"Job {job.id} failed: {e}")
+                job.status = JobStatus.FAILED
+                job.error = job.error or str(e)
+            finally:
+                job.finished_at = time.time()
+                job.future.set_result(job)
+                self._queue.task_done()
+
+    # Keep memory bounded: forget the oldest finished jobs
+    def _evict_finished(self):
+        overflow = len(self._jobs) - self._history_limit
+        if overflow <= 0:
+            return
+        for job_id in list(self._jobs):
+            if overflow <= 0:
+                break
+            if self._jobs[job_id].status in (JobStatus.SUCCEEDED, JobStatus.FAILED):
+                del self._jobs[job_id]
+                overflow -= 1
@@ -1,47 +1,66 @@
 # RUN PROGRAM -> flask --app main run --no-reload
 import os
-from flask import Flask, request, jsonify
+import asyncio
+from flask import Flask, Response, request, jsonify
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
+from langgraph.constants import Send
 from langgraph.pregel import GraphRecursionError
 
 # own imports
 from llm_models.openai_models import get_openai_llm
 from agents import (
     code_generator_agent,
+    project_planner_agent,
+    file_generator_agent,
+    merge_generated_files_agent,
     write_code_to_file_agent,
     debug_code_agent,
     read_me_agent,
     dockerizer_agent,
     debug_code_execution_agent,
+    speculative_debug_code_agent,
     debug_docker_execution_agent,
     start_docker_container_agent,
     start_gradio_frontend_agent,
 )
-from schemas import GraphState
+from agents.workspace import GENERATED_ROOT, new_run_id, ensure_workspace
+from agents.runtime_pool import runtime_pool
+from agents.speculative_fix_agent import SPECULATIVE_FIXES
+from agents.common import llm_cache
+from agents.checkpointer import create_checkpointer, entry_predecessors, prepare_resume
+from agents.model_router import settle_final_routes
+from agents.metrics import registry, instrument_node, start_run, finish_run
+from schemas import GraphState, JobStatus
+from jobs import Job, JobManager, QueueFullError, JobActiveError
 
 load_dotenv()
 llm = get_openai_llm()
 
-# Määritellään hakupolut
-search_path = os.path.join(os.getcwd(), "generated")
-file_path = os.path.join(search_path, "src")
-test_file = os.path.join(search_path, "test")
-
 # how many times we try to fix the error
 MAX_ITERATIONS = int(os.getenv("MAX_ITERATIONS", 3))
 
-if not os.path.exists(search_path):
-    os.mkdir(search_path)
-    os.mkdir(os.path.join(search_path, "src"))
-    os.mkdir(os.path.join(search_path, "test"))
+# Plan the files first and generate every file with its own concurrent LLM call
+PARALLEL_CODE_GENERATION = os.getenv("PARALLEL_CODE_GENERATION", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Every run gets its own workspace generated/<run_id>/src
+os.makedirs(GENERATED_ROOT, exist_ok=True)
 
 workflow = StateGraph(GraphState)
 
 
+# Every node is timed, see /metrics and the "timings" of a job result
+def add_node(name: str, node):
+    workflow.add_node(name, instrument_node(name, node))
+
+
 def decide_to_end(state: GraphState):
     # Debugging function to decide which debugging approach to take
     # If no error -> Proceed to generate README files
@@ -68,19 +87,42 @@ def decide_to_end(state: GraphState):
         return "readme"
 
 
-workflow.add_node("programmer", code_generator_agent)  # Create code files
-workflow.add_node("saver", write_code_to_file_agent)  # Save code files
-workflow.add_node("dockerizer", dockerizer_agent)  # Create Docker files (DockerF
-workflow.add_node("executer_docker", start_docker_container_agent)  # Run code
-workflow.add_node("debug_docker", debug_docker_execution_agent)  # Debug docker
-workflow.add_node("debug_code", debug_code_execution_agent)  # Debug code
-workflow.add_node("debugger", debug_code_agent)  # Debug something else
-workflow.add_node("readme", read_me_agent)  # Create README # DEVELOPER files
-workflow.add_node(
-    "gradio_ui", start_gradio_frontend_agent
-)  # create gradio UI for sharing the files
+def fan_out_files(state: GraphState):
+    # One file_programmer run per planned file, LangGraph runs them in parallel
+    requirement = state["messages"][0].content
+    return [
+        Send(
+            "file_programmer",
+            {"requirement": requirement, "plan": state["plan"], "file": planned_file},
+        )
+        for planned_file in state["plan"].files
+    ]
+
+
+if PARALLEL_CODE_GENERATION:
+    add_node("planner", project_planner_agent)  # Plan the files
+    add_node("file_programmer", file_generator_agent)  # Create one file
+    add_node("merger", merge_generated_files_agent)  # Collect the files
+else:
+    add_node("programmer", code_generator_agent)  # Create code files
+add_node("saver", write_code_to_file_agent)  # Save code files
+add_node("dockerizer", dockerizer_agent)  # Create Docker files (DockerF
+add_node("executer_docker", start_docker_container_agent)  # Run code
+add_node("debug_docker", debug_docker_execution_agent)  # Debug docker
+if SPECULATIVE_FIXES > 1:
+    add_node("debug_code", speculative_debug_code_agent)  # Debug code, K candidates in parallel
+else:
+    add_node("debug_code", debug_code_execution_agent)  # Debug code
+add_node("debugger", debug_code_agent)  # Debug something else
+add_node("readme", read_me_agent)  # Create README # DEVELOPER files
+add_node("gradio_ui", start_gradio_frontend_agent)  # create gradio UI for sharing the files
 
-workflow.add_edge("programmer", "saver")
+if PARALLEL_CODE_GENERATION:
+    workflow.add_conditional_edges("planner", fan_out_files, ["file_programmer"])
+    workflow.add_edge("file_programmer", "merger")
+    workflow.add_edge("merger", "saver")
+else:
+    workflow.add_edge("programmer", "saver")
 workflow.add_edge("saver", "dockerizer")
 workflow.add_edge("dockerizer", "executer_docker")  # executer_docker -> conditional
 workflow.add_edge("debugger", "saver")
@@ -101,33 +143,175 @@ workflow.add_conditional_edges(
     },
 )
 
-workflow.set_entry_point("programmer")
-app = workflow.compile()
-app.get_graph().draw_mermaid_png(output_file_path="images/graphs/graph_flow.png")
+workflow.set_entry_point("planner" if PARALLEL_CODE_GENERATION else "programmer")
+
+# The state after every node is stored in SQLite under the run id (thread_id), so runs can
+# be resumed after a restart or a GraphRecursionError. None when CHECKPOINTS_ENABLED=false.
+checkpointer = create_checkpointer()
+app = workflow.compile(checkpointer=checkpointer)
+
+# Nodes a run can be re-entered at (not the ones only reached through decide_to_end)
+ENTRY_PREDECESSORS = entry_predecessors(workflow)
+# The benchmark and other offline runs skip drawing (it calls the mermaid.ink web service)
+if os.getenv("DRAW_GRAPH", "true").lower() in ("1", "true", "yes"):
+    app.get_graph().draw_mermaid_png(output_file_path="images/graphs/graph_flow.png")
 
 flask_app = Flask(__name__)
 
 
+# Runs one graph run for a queued job, executed by the job workers
+async def run_graph(job: Job):
+    config = RunnableConfig(recursion_limit=20, configurable={"thread_id": job.id})
+    ensure_workspace(job.id)
+    run_metrics = start_run(job.id)
+    status = "failed"
+
+    try:
+        try:
+            if job.resume:
+                # None as input continues from the last checkpoint of the run
+                await prepare_resume(app, config, ENTRY_PREDECESSORS, job.entry_node)
+                graph_input = None
+            else:
+                graph_input = {
+                    "run_id": job.id,
+                    "messages": [HumanMessage(content=job.prompt)],
+                    "iterations": 0,
+                }
+            res = await app.ainvoke(graph_input, config=config)
+        except GraphRecursionError as e:
+            print(f"GraphRecursionError: {e}")
+            job.error = str(e)
+            return
+
+        job.frontend_url = res.get("frontend_url", None)
+        job.archive_hash = res.get("archive_hash")
+        job.iterations = res.get("iterations", 0)
+        job.build_report = res.get("build_report") or []
+        job.patch_report = res.get("patch_report") or []
+        job.speculative_report = res.get("speculative_report") or []
+        job.route_report = settle_final_routes(res)
+        if res.get("error"):
+            job.error = res["error"].dict()
+        else:
+            status = "succeeded"
+        job.timings["message_tokens_saved"] = sum(
+            entry["tokens_saved"] for entry in res.get("message_compaction") or []
+        )
+    finally:
+        # Where the run spent its time: graph nodes, LLM calls per model and docker phases
+        job.timings.update(run_metrics.summary(), iterations=job.iterations)
+        finish_run(status, job.iterations)
+        if checkpointer is not None:
+            await asyncio.to_thread(checkpointer.prune_thread, job.id)
+
+
+# How many graph runs are executed in parallel and how many may wait in the queue
+job_manager = JobManager(
+    run_job=run_graph,
+    workers=int(os.getenv("JOB_WORKERS", 4)),
+    max_queue=int(os.getenv("JOB_QUEUE_SIZE", 100)),
+)
+job_manager.start()
+
+# Pre-start the warm runtime containers on the loop the graph runs use
+if runtime_pool is not None:
+    asyncio.run_coroutine_threadsafe(runtime_pool.warm_up(), job_manager.loop)
+
+
+def submit_job(user_input: str) -> Job:
+    print(f"User input: {user_input}")
+    return job_manager.submit(new_run_id(), user_input)
+
+
+# Returns the job id at once, the result is polled from GET /jobs/<id>
+@flask_app.route("/jobs", methods=["POST"])
+def create_job():
+    user_input = request.json.get("prompt", "")
+    try:
+        job = submit_job(user_input)
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 429
+    return jsonify(job.to_dict()), 202
+
+
+def collect_gauges():
+    job_queue_size.set(job_manager.queue_size())
+    if llm_cache is not None:
+        for name, value in llm_cache.stats().items():
+            llm_cache_stats.set(value, stat=name)
+
+
+job_queue_size = registry.gauge("timeless_job_queue_size", "Jobs waiting for a worker")
+llm_cache_stats = registry.gauge("timeless_llm_cache", "LLM response cache hits, misses and size")
+registry.collectors.append(collect_gauges)
+
+
+# Prometheus text format
+@flask_app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@flask_app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return jsonify(job.to_dict())
+
+
+# Continues a run from its checkpoint, also after a restart of the service.
+# {"node": "executer_docker"} re-enters the run at that node, e.g. to retry the
+# container with the existing code; without a node the run continues where it stopped.
+@flask_app.route("/jobs/<job_id>/resume", methods=["POST"])
+def resume_job(job_id):
+    if checkpointer is None:
+        return jsonify({"error": "Checkpoints are disabled (CHECKPOINTS_ENABLED=false)"}), 400
+    entry_node = (request.get_json(silent=True) or {}).get("node")
+    if entry_node and entry_node not in ENTRY_PREDECESSORS:
+        return jsonify(
+            {"error": f"Can't re-enter at {entry_node}, choose one of {sorted(ENTRY_PREDECESSORS)}"}
+        ), 400
+
+    config = RunnableConfig(configurable={"thread_id": job_id})
+    if checkpointer.get_tuple(config) is None:
+        return jsonify({"error": f"No checkpoint for job {job_id}"}), 404
+    snapshot = asyncio.run_coroutine_threadsafe(app.aget_state(config), job_manager.loop).result()
+    if not snapshot.next and not entry_node:
+        return jsonify({"error": f"Job {job_id} already finished, choose a node to re-enter"}), 409
+
+    prompt = snapshot.values["messages"][0].content
+    try:
+        job = job_manager.submit(job_id, prompt, resume=True, entry_node=entry_node)
+    except JobActiveError as e:
+        return jsonify({"error": str(e)}), 409
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 429
+    return jsonify(job.to_dict()), 202
+
+
+# Old blocking endpoint, kept for existing clients. Runs through the same worker pool.
 @flask_app.route("/prompt", methods=["POST"])
 async def main():
     user_input = request.json.get("prompt", "")
-    print(f"User input: {user_input}")
-    config = RunnableConfig(recursion_limit=20)
-
     try:
-        # app.invoke muuttuu app.ainvoke, koska se on asynkroninen
-        res = await app.ainvoke(
-            {
-                "messages": [HumanMessage(content=user_input)],
-                "iterations": 0,
-            },
-            config=config,
-        )
-    except GraphRecursionError as e:
-        print(f"GraphRecursionError: {e}")
-        return jsonify({"error": str(e)}), 500
+        job = submit_job(user_input)
+    except QueueFullError as e:
+        return jsonify({"error": str(e)}), 429
+
+    await asyncio.wrap_future(job.future)
+
+    if job.status == JobStatus.FAILED:
+        return jsonify({"error": job.error, "run_id": job.id}), 500
 
-    return jsonify({"message": "done!", "frontend_url": res.get("frontend_url", None)})
+    return jsonify(
+        {
+            "message": "done!",
+            "run_id": job.id,
+            "frontend_url": job.frontend_url,
+        }
+    )
 
 
 # Get Flask configurations from .env
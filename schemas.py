@@ -1,4 +1,4 @@
-from typing import List, TypedDict, Optional
+from typing import Annotated, List, TypedDict, Optional
 from langchain_core.pydantic_v1 import BaseModel, Field, Extra, validator
 from enum import Enum
 
@@ -51,6 +51,56 @@ class Codes(BaseModel):
     )
 
 
+# Schema for one file in the project plan (used before the files are generated in parallel)
+class PlannedFile(BaseModel):
+    """
+    Represents one file that will be generated as part of a programming project.
+    """
+
+    filename: str = Field(
+        description="The name of the file, including its relative path in the project."
+    )
+    role: str = Field(
+        description="What this file is responsible for and how it is used by the other files."
+    )
+    interface: str = Field(
+        description=(
+            "The exact public interface of this file that other files rely on: exported or "
+            "imported names, function and class signatures, CLI arguments or config keys. "
+            "Write 'none' if other files do not use it."
+        )
+    )
+    executable_code: bool = Field(
+        description=(
+            "Indicates whether this file is the main executable file required for the "
+            "program to run. There should only be one executable file in the project structure."
+        )
+    )
+    programming_language: str = Field(
+        description="The programming language (or file format) of this file."
+    )
+
+
+# Schema for the file manifest of a whole project
+class ProjectPlan(BaseModel):
+    """
+    Represents the planned file structure of a programming project.
+    """
+
+    description: str = Field(
+        description=(
+            "A detailed description of the entire project, how the files work together "
+            "and any relationships or dependencies between them."
+        )
+    )
+    files: List[PlannedFile] = Field(
+        description="Every file of the project, including dependency files such as requirements.txt or package.json."
+    )
+    execution_command: str = Field(
+        description="The command used to execute the main executable file in the project."
+    )
+
+
 class FixedCode(BaseModel):
     """
     Represents an individual piece of code generated as part of a programming project.
@@ -75,6 +125,54 @@ class FixedCode(BaseModel):
     )
 
 
+# Schema for one search/replace edit of a file
+class PatchHunk(BaseModel):
+    search: str = Field(
+        description=(
+            "The exact lines of the current file to replace, copied verbatim including indentation. "
+            "Include enough surrounding lines that they appear only once in the file."
+        )
+    )
+    replace: str = Field(description="The lines that replace the searched lines.")
+
+
+# Schema for a fix as a patch instead of the complete file
+class CodePatch(BaseModel):
+    """
+    Represents a fix of one code file as search/replace hunks.
+    """
+
+    description: str = Field(
+        description="A detailed description of what was fixed in this specific code and its purpose."
+    )
+    filename: str = Field(description="The original filename of the file to patch.")
+    hunks: List[PatchHunk] = Field(
+        description="The edits to apply to the file, in the order they appear in the file."
+    )
+
+
+# Schema for a fix that spans several files, applied all at once
+class PatchSet(BaseModel):
+    """
+    Represents a fix of one or more code files as search/replace hunks.
+    """
+
+    description: str = Field(description="A detailed description of the root cause and the fix.")
+    patches: List[CodePatch] = Field(
+        description="One patch per file that has to change, e.g. the caller and the file missing an export."
+    )
+
+
+# Schema for a fix that spans several files, as complete files
+class FixedCodes(BaseModel):
+    """
+    Represents the complete fixed content of one or more code files.
+    """
+
+    description: str = Field(description="A detailed description of the root cause and the fix.")
+    codes: List[FixedCode] = Field(description="Every file that has to change, each one complete.")
+
+
 # Schema for generated project Readme.md and Developer.md files
 class Documentation(BaseModel):
     """
@@ -117,6 +215,13 @@ class DockerFile(BaseModel):
     )
 
 
+class ErrorFrame(BaseModel):
+    file: str = Field(description="Project file of the stack frame, relative to the project root.")
+    line: Optional[int] = Field(default=None, description="Line number in the file.")
+    column: Optional[int] = Field(default=None, description="Column number in the line.")
+    function: Optional[str] = Field(default=None, description="Function or method of the frame.")
+
+
 class ErrorMessage(BaseModel):
     type: str = Field(
         description="The type of error (e.g., 'Internal Code Error', 'Dependency Error', 'Execution Error')."
@@ -136,6 +241,14 @@ class ErrorMessage(BaseModel):
         default=None,
         description="An optional reference to the part of the code (e.g., function name, line number) where the error occurred.",
     )
+    error_class: Optional[str] = Field(
+        default=None,
+        description="The class of the error parsed from the log (e.g., 'TypeError', 'NullPointerException', 'panic').",
+    )
+    frames: List[ErrorFrame] = Field(
+        default_factory=list,
+        description="Stack frames in project files parsed from the log, the innermost frame first.",
+    )
 
 
 # include texts from Dockerfile and compose.yaml
@@ -153,8 +266,33 @@ class ProceedOption(str, Enum):
     FIX = "fix"
 
 
+# Status of a queued graph run (see jobs.py)
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+# Reducer for files generated in parallel: the latest version of each filename wins.
+# Merging a list with itself is a no-op, so agents can keep returning the whole state.
+def merge_code_files(left: Optional[List[Code]], right: Optional[List[Code]]) -> List[Code]:
+    merged = {code.filename: code for code in (left or [])}
+    merged.update({code.filename: code for code in (right or [])})
+    return list(merged.values())
+
+
+# Reducer for the model routes of files generated in parallel, one route per filename.
+# Like merge_code_files, merging a list with itself is a no-op.
+def merge_file_routes(left: Optional[List[dict]], right: Optional[List[dict]]) -> List[dict]:
+    merged = {route["file"]: route for route in (left or [])}
+    merged.update({route["file"]: route for route in (right or [])})
+    return list(merged.values())
+
+
 # State of the graph (agents)
 class GraphState(TypedDict):
+    run_id: str  # Id of the graph run, names the workspace folder generated/<run_id>
     error: ErrorMessage  # error messages
     messages: List  # all messages
     codes: Codes  # A collection of code files
@@ -166,3 +304,16 @@ class GraphState(TypedDict):
     docker_output: str  # What running code in docker container outputs
     proceed: ProceedOption  # Enum
     frontend_url: str  # URL for the frontend
+    archive_hash: str  # Content hash (and file name) of the project's ZIP archive
+    plan: ProjectPlan  # File manifest when files are generated in parallel
+    generated_files: Annotated[List[Code], merge_code_files]  # Files from parallel generation
+    file_routes: Annotated[List[dict], merge_file_routes]  # Model routes of parallel generation
+    build_hashes: dict  # Content hash of every project file at the last successful build
+    build_report: List[dict]  # Build mode, duration and full-rebuild reason per iteration
+    changed_files: List[str]  # Files written or deleted by the last save
+    symbol_index: dict  # Function/class spans and imports per file, see agents/symbol_index.py
+    patch_report: List[dict]  # Applied and rejected hunks of every patch fix
+    speculative_report: List[dict]  # Candidates and winner of every speculative debug pass
+    route_report: List[dict]  # Model chosen per LLM call and whether the next execution passed
+    validated_run: dict  # File hashes and outcome of a fix candidate that already ran
+    message_compaction: List[dict]  # Tokens before/after compacting the history, per LLM call